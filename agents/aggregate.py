@@ -0,0 +1,151 @@
+# agents/aggregate.py
+from __future__ import annotations
+import os, threading, time, uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage.records import AlertRec
+from agents.detect import event_template
+
+# Key fields are read from the event; "template" is the normalized event text
+# (see detect.event_template), so "failed login #41" and "#42" share a group.
+DEFAULT_KEY = ("src_ip", "user", "template")
+
+class _Group:
+    __slots__ = ("event_id", "alert", "count", "last_seen", "expires")
+
+    def __init__(self, event_id: str, now: float, expires: float):
+        self.event_id = event_id
+        self.alert: AlertRec | None = None  # set once the first event clears the pipeline
+        self.count = 1
+        self.last_seen = now
+        self.expires = expires
+
+class Aggregator:
+    """
+    Collapses repeats of an event into the alert of the first one, per time window.
+
+    admit() is called before detect: the first event of a group goes through
+    the full pipeline and attach()es its alert; later events within the window
+    only bump count/last_seen on that alert. "tumbling" windows close `window`
+    seconds after the first event, "sliding" ones `window` seconds after the
+    latest. At most max_groups groups are held; past that, the group due to
+    close soonest is evicted: the oldest in tumbling mode, the least recently
+    active in sliding mode. Expired groups are swept on every admit(). Closed groups that saw
+    repeats are returned once by take_closed() so the final count can be re-persisted.
+    """
+
+    def __init__(self, window: float, mode: str = "tumbling", max_groups: int = 50_000,
+                 key_fields: Tuple[str, ...] = DEFAULT_KEY, clock: Callable[[], float] = time.time):
+        if mode not in ("tumbling", "sliding"):
+            raise ValueError(f"unknown window mode: {mode!r}")
+        self.window = window
+        self.mode = mode
+        self.max_groups = max_groups
+        self.key_fields = key_fields
+        self.clock = clock
+        self._groups: "OrderedDict[str, _Group]" = OrderedDict()
+        self._closed: List[AlertRec] = []
+        self._lock = threading.Lock()
+        self.admitted = self.suppressed = self.expired = self.evicted = 0
+
+    def key(self, event: Dict[str, Any], event_json: str) -> str:
+        parts = [event_template(event_json) if f == "template" else str(event.get(f, ""))
+                 for f in self.key_fields]
+        return "\x1f".join(parts)
+
+    def admit(self, key: str) -> Tuple[str, Optional[AlertRec], bool]:
+        """
+        -> (event_id, alert, first). first=True means run the pipeline with event_id;
+        otherwise the event was folded into the group and alert is a snapshot of
+        its alert (None while the first event is still in flight).
+        """
+        now = self.clock()
+        with self._lock:
+            self._sweep(now)
+            g = self._groups.get(key)
+            if g is None:
+                g = _Group(str(uuid.uuid4()), now, now + self.window)
+                self._groups[key] = g
+                while len(self._groups) > self.max_groups:
+                    self._close(self._groups.popitem(last=False)[1])
+                    self.evicted += 1
+                self.admitted += 1
+                return g.event_id, None, True
+            g.count += 1
+            g.last_seen = now
+            if self.mode == "sliding":
+                g.expires = now + self.window
+                self._groups.move_to_end(key)
+            self.suppressed += 1
+            if g.alert is None:
+                return g.event_id, None, False
+            self._stamp(g)
+            return g.event_id, g.alert.copy(), False
+
+    def attach(self, key: str, event_id: str, alert: AlertRec) -> None:
+        """Register the first event's finished alert; repeats seen meanwhile are applied to it."""
+        with self._lock:
+            g = self._groups.get(key)
+            if g is None or g.event_id != event_id:
+                return  # the window closed while the first event was in flight
+            g.alert = alert
+            if g.count > 1:
+                self._stamp(g)
+
+    def take_closed(self) -> List[AlertRec]:
+        with self._lock:
+            self._sweep(self.clock())
+            closed, self._closed = self._closed, []
+        return closed
+
+    def flush(self) -> List[AlertRec]:
+        """Close every open group (shutdown); returns the alerts whose count changed."""
+        with self._lock:
+            while self._groups:
+                self._close(self._groups.popitem(last=False)[1])
+            closed, self._closed = self._closed, []
+        return closed
+
+    def _sweep(self, now: float) -> None:
+        # both modes keep groups in expiry order, so expired ones are at the front
+        while self._groups:
+            g = next(iter(self._groups.values()))
+            if g.expires > now:
+                break
+            self._groups.popitem(last=False)
+            self._close(g)
+            self.expired += 1
+
+    def _close(self, g: _Group) -> None:
+        if g.alert is not None and g.count > 1:
+            self._closed.append(g.alert)
+
+    @staticmethod
+    def _stamp(g: _Group) -> None:
+        g.alert.count = g.count
+        g.alert.last_seen = datetime.utcfromtimestamp(g.last_seen)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "groups": len(self._groups),
+            "max_groups": self.max_groups,
+            "window_s": self.window,
+            "mode": self.mode,
+            "admitted": self.admitted,
+            "suppressed": self.suppressed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+def aggregator_from_env() -> Aggregator | None:
+    """AGG_WINDOW seconds > 0 turns aggregation on; AGG_MODE, AGG_MAX_GROUPS, AGG_KEY tune it."""
+    window = float(os.getenv("AGG_WINDOW", "0"))
+    if window <= 0:
+        return None
+    key = tuple(f.strip() for f in os.getenv("AGG_KEY", ",".join(DEFAULT_KEY)).split(",") if f.strip())
+    return Aggregator(window, mode=os.getenv("AGG_MODE", "tumbling"),
+                      max_groups=int(os.getenv("AGG_MAX_GROUPS", "50000")), key_fields=key)
+
+AGGREGATOR = aggregator_from_env()
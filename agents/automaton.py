@@ -0,0 +1,68 @@
+# agents/automaton.py
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick matcher over a fixed set of keywords (case-insensitive).
+    matches() walks the text once and returns the index of every keyword that
+    occurs in it, so cost depends on text length, not on how many keywords there are.
+    """
+    __slots__ = ("keywords", "_goto", "_fail", "_out")
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(k.lower() for k in keywords if k))
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[int, ...]] = [()]
+        for idx, kw in enumerate(self.keywords):
+            s = 0
+            for ch in kw:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                s = nxt
+            out[s] += (idx,)
+
+        # breadth-first failure links; each state also reports its suffix states' keywords
+        fail = [0] * len(goto)
+        q = deque(goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, nxt in goto[s].items():
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+                q.append(nxt)
+
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def state(self) -> tuple:
+        """Plain-container form for storage/artifacts.py; from_state() undoes it."""
+        return self.keywords, self._goto, self._fail, self._out
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "KeywordAutomaton":
+        self = cls.__new__(cls)
+        self.keywords, self._goto, self._fail, self._out = state
+        return self
+
+    def matches(self, text: str) -> Set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        s = 0
+        for ch in text.lower():
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                found.update(out[s])
+        return found
@@ -0,0 +1,176 @@
+# agents/compact.py
+from __future__ import annotations
+import json, os, re
+from typing import Any, Callable, Dict, List, Tuple
+
+# Shrinks an event before detect puts it in a prompt, so a verbose EDR record or
+# an embedded payload costs a bounded number of tokens:
+#   - fields ranked by security relevance; blob-like fields go first when over budget
+#   - long strings keep their head and tail ("...[+N chars]..." in between)
+#   - lists collapse exact repeats and keep only their first and last items
+#   - the result is cut to a hard token budget, dropping lowest-ranked fields first
+# Keys come out in a fixed order (by rank, listed ones first), so events of the same kind
+# serialize with a common prefix after the static instructions: friendlier to
+# provider-side prefix caching than the producer's arbitrary key order.
+#
+# DETECT_PROMPT_BUDGET (tokens for the event, default 512; 0 disables),
+# DETECT_VALUE_CHARS (default 256), DETECT_LIST_ITEMS (default 6),
+# DETECT_TOKENIZER=tiktoken counts with tiktoken's cl100k_base when it loads.
+
+BUDGET = int(os.getenv("DETECT_PROMPT_BUDGET", "512"))
+VALUE_CHARS = int(os.getenv("DETECT_VALUE_CHARS", "256"))
+LIST_ITEMS = int(os.getenv("DETECT_LIST_ITEMS", "6"))
+MAX_DEPTH = 4
+
+# Rank 0 fields are what an analyst reads first; rank 3 are the bulky ones
+# that rarely decide a verdict. Unknown fields rank 2, after the listed ones.
+_ORDER: Dict[str, Tuple[int, int]] = {}
+for _rank, _names in enumerate((
+    ("event", "action", "event_type", "message", "msg", "outcome", "status", "result", "severity",
+     "category", "rule", "signature", "technique",
+     "src_ip", "source_ip", "client_ip", "remote_ip", "dst_ip", "destination_ip", "ip",
+     "user", "username", "account", "target_user", "src_user", "dst_user",
+     "process", "process_name", "image", "cmdline", "command_line", "commandline",
+     "parent", "parent_process", "parent_image", "parent_cmdline", "parent_command_line",
+     "url", "urls", "domain", "query", "file", "file_path", "path", "attachment",
+     "md5", "sha1", "sha256", "hash", "parent_sha256", "registry_key", "reg_key",
+     "bytes_out", "bytes_in", "dst_port", "port", "protocol", "service",
+     "from", "to", "subject", "sender", "recipient"),
+    ("host", "hostname", "app", "pid", "ppid", "method", "status_code", "user_agent",
+     "country", "asn", "session", "logon_type", "integrity_level"),
+    ("ts", "timestamp", "@timestamp", "time", "event_id", "id", "n"),
+    ("body", "raw", "payload", "data", "content", "html", "headers", "env", "environment",
+     "modules", "loaded_modules", "stack", "stacktrace", "trace", "description", "log", "dump"),
+)):
+    for _pos, _name in enumerate(_names):
+        _ORDER[_name] = (_rank, _pos)
+
+def rank(key: str) -> int:
+    return _ORDER.get(key.lower(), (2,))[0]
+
+def _order(key: str) -> Tuple[int, int, str]:
+    r, pos = _ORDER.get(key.lower(), (2, 1 << 16))
+    return r, pos, key
+
+# ---- token counting ----
+# No tokenizer by default: BPE vocabularies keep common words whole, split long
+# or random letter runs every few characters, digits in threes, and give most
+# punctuation its own token. A rough count; DETECT_TOKENIZER=tiktoken for an exact one.
+_TOKEN_RE = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]")
+
+def estimate_tokens(s: str) -> int:
+    return len(_TOKEN_RE.findall(s))
+
+def _tokenizer() -> Callable[[str], int]:
+    if os.getenv("DETECT_TOKENIZER", "").lower() == "tiktoken":
+        try:
+            import tiktoken
+            enc = tiktoken.get_encoding("cl100k_base")
+            return lambda s: len(enc.encode(s, disallowed_special=()))
+        except Exception:  # not installed, or no network for the vocabulary
+            pass
+    return estimate_tokens
+
+count_tokens = _tokenizer()
+
+# ---- shrinking ----
+
+def _cut(s: str, limit: int) -> str:
+    if len(s) <= limit:
+        return s
+    head = limit * 2 // 3
+    tail = limit - head
+    return f"{s[:head]}...[+{len(s) - limit} chars]...{s[-tail:] if tail else ''}"
+
+def _shrink(v: Any, limit: int, items: int, depth: int = 0) -> Any:
+    if isinstance(v, str):
+        return _cut(v, limit)
+    if isinstance(v, dict):
+        if depth >= MAX_DEPTH:
+            return _cut(json.dumps(v, separators=(",", ":")), limit)
+        keys = sorted(v, key=_order)
+        out = {k: _shrink(v[k], limit, items, depth + 1) for k in keys[:items * 4]}
+        if len(keys) > items * 4:  # e.g. a whole environment block
+            out["..."] = f"+{len(keys) - items * 4} more keys"
+        return out
+    if isinstance(v, list):
+        # exact repeats become one item plus a count, keeping first-seen order
+        seen: Dict[str, int] = {}
+        uniq: List[Any] = []
+        for x in v:
+            key = json.dumps(x, sort_keys=True) if isinstance(x, (dict, list)) else repr(x)
+            if key in seen:
+                seen[key] += 1
+            else:
+                seen[key] = 1
+                uniq.append((key, x))
+        out = [_shrink(x, limit, items, depth + 1) if seen[key] == 1
+               else {"item": _shrink(x, limit, items, depth + 1), "repeated": seen[key]}
+               for key, x in uniq]
+        if len(out) > items:
+            keep = max(1, items - 1)
+            out = out[:keep] + [f"...[+{len(out) - keep - 1} more items]..."] + out[-1:]
+        return out
+    return v
+
+def _hard_cut(s: str, budget: int) -> Tuple[str, int]:
+    n = budget * 3
+    while True:
+        out = _cut(s, n)
+        after = count_tokens(out)
+        if after <= budget or n <= 16:
+            return out, after
+        n = n * 3 // 4
+
+def _dumps(d: Dict[str, Any]) -> str:
+    return json.dumps(d, ensure_ascii=False, separators=(",", ":"))
+
+def compact(event_json: str, budget: int | None = None, value_chars: int | None = None,
+            list_items: int | None = None) -> Tuple[str, int, int]:
+    """(prompt-ready event JSON, tokens before, tokens after). Defaults from the env
+    settings above, read per call; budget <= 0 returns the event unchanged."""
+    budget = BUDGET if budget is None else budget
+    value_chars = VALUE_CHARS if value_chars is None else value_chars
+    list_items = LIST_ITEMS if list_items is None else list_items
+    before = count_tokens(event_json)
+    if budget <= 0:
+        return event_json, before, before
+    try:
+        event = json.loads(event_json)
+    except (json.JSONDecodeError, TypeError):
+        event = None
+    if not isinstance(event, dict):
+        if before <= budget:
+            return event_json, before, before
+        out, after = _hard_cut(event_json, budget)
+        return out, before, after
+
+    out = _dumps(_shrink(event, value_chars, list_items))
+    after = count_tokens(out)
+    limit, items = value_chars, list_items
+    keys = sorted(event, key=_order)
+    # bulky fields go first (largest first), then every value gets shorter,
+    # then the other fields from the bottom rank up
+    bulky = sorted((k for k in keys if rank(k) >= 3), key=lambda k: -len(json.dumps(event[k])))
+    rest = [k for k in reversed(keys) if rank(k) < 3]
+    omitted: List[str] = []
+    while after > budget:
+        if bulky:
+            omitted.append(bulky.pop(0))
+        elif limit > 48:
+            limit, items = limit // 2, max(2, items - 1)
+        elif len(rest) > 1:
+            omitted.append(rest.pop(0))
+        else:
+            break
+        d = _shrink({k: event[k] for k in keys if k not in omitted}, limit, items)
+        d["_omitted"] = sorted(omitted)
+        out = _dumps(d)
+        after = count_tokens(out)
+        if after > budget:  # the names themselves don't fit: just say how many
+            d["_omitted"] = len(omitted)
+            out = _dumps(d)
+            after = count_tokens(out)
+    if after > budget:  # one field alone over budget: cut the text (no longer valid JSON)
+        out, after = _hard_cut(out, budget)
+    return out, before, after
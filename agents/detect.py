@@ -1,63 +1,577 @@
 # agents/detect.py
 from storage.schema import Detection
-from langchain_core.prompts import PromptTemplate
-import json, re, os
+import asyncio, hashlib, json, re, os, threading, time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from storage.artifacts import load_or_build
+from storage.cache import TTLCache
+from agents.automaton import KeywordAutomaton
+from agents.compact import compact
+from agents.scheduler import AdmissionQueue
+from agents.window_stats import THRESHOLDS as WINDOW_THRESHOLDS
+from metrics import LLM_CALLS, LLM_ERRORS, LLM_LATENCY, PROMPT_TOKENS
 from dotenv import load_dotenv
 load_dotenv() 
 
-# Providers (optional imports guarded)
-PROVIDER = None
-llm = None
-try:
-    if os.getenv("GROQ_API_KEY"):
+# Provider picked from the environment now; the client (and its LangChain
+# package, ~0.5 s of imports) only on first use, see get_llm().
+PROVIDER = "groq" if os.getenv("GROQ_API_KEY") else "openai" if os.getenv("OPENAI_API_KEY") else None
+llm = None  # the chat model once built; bench/fake_llm.py assigns a stand-in
+_llm_lock = threading.Lock()
+
+def _make_llm():
+    if PROVIDER == "groq":
         from langchain_groq import ChatGroq
-        llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)  # fast + cheap
-        PROVIDER = "groq"
-    elif os.getenv("OPENAI_API_KEY"):
-        from langchain_openai import ChatOpenAI
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-        PROVIDER = "openai"
-except Exception:
-    llm = None
-
-PROMPT = PromptTemplate.from_template(
-    """You are a SOC analyst.
+        return ChatGroq(model="llama-3.1-8b-instant", temperature=0)  # fast + cheap
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+def get_llm():
+    """The chat model, built on the first call; None when no provider is configured or usable."""
+    global llm, PROVIDER
+    if llm is None and PROVIDER is not None:
+        with _llm_lock:
+            if llm is None and PROVIDER is not None:
+                try:
+                    llm = _make_llm()
+                except Exception:
+                    PROVIDER = None  # missing package or bad config: heuristic only, as before
+    return llm
+
+# WARMUP_LLM_PING=1: warm_llm() also sends one tiny request, so the first event
+# doesn't pay for the TLS handshake either. A failed ping is kept in PING_ERROR,
+# not raised: the client is built, and events fall back to the heuristic until
+# the provider answers, same as without the ping.
+WARMUP_PING = os.getenv("WARMUP_LLM_PING", "").lower() in {"1", "true", "yes"}
+PING_ERROR: Optional[str] = None
+
+def warm_llm(ping: Optional[bool] = None) -> Optional[str]:
+    """Build the client now instead of on the first event; returns the provider."""
+    global PING_ERROR
+    model = get_llm()
+    if model is not None and (WARMUP_PING if ping is None else ping):
+        try:
+            _invoke("Reply with OK.", "warmup")
+            PING_ERROR = None
+        except Exception as e:
+            PING_ERROR = repr(e)
+    return PROVIDER
+
+# Plain str.format templates (doubled braces are literal). Everything before the
+# events is fixed text, so providers that cache prompt prefixes can reuse it;
+# the events themselves go through agents/compact.py first.
+PROMPT = """You are a SOC analyst.
 Classify the event as benign, suspicious, or malicious.
 Return STRICT JSON: {{"label": "...", "reason": "...", "confidence": 0.0}}.
+Long values may be shortened ("...[+N chars]...") and minor fields listed in "_omitted".
 
 Event JSON:
 {event_json}
 """.strip()
+
+BATCH_PROMPT = """You are a SOC analyst.
+Classify each of the {n} events below as benign, suspicious, or malicious.
+Return a STRICT JSON array with exactly {n} objects, one per event, in the same order:
+[{{"id": 0, "label": "...", "reason": "...", "confidence": 0.0}}, ...]
+Long values may be shortened ("...[+N chars]...") and minor fields listed in "_omitted".
+
+Events (one per line, "<id>: <event JSON>"):
+{events}
+""".strip()
+
+# Micro-batching for adetect(): events arriving within BATCH_WAIT_MS of each other,
+# up to BATCH_SIZE of them, share one BATCH_PROMPT call. BATCH_SIZE <= 1 disables it.
+BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", "1"))
+BATCH_WAIT_MS = float(os.getenv("DETECT_BATCH_WAIT_MS", "20"))
+
+# Admission control for adetect(): at most DETECT_MAX_INFLIGHT events in front of the
+# model, up to DETECT_QUEUE_DEPTH more waiting, best prescore() first. Past that,
+# events of DETECT_SHED_CLASSES get the heuristic verdict instead of waiting.
+# DETECT_PRIORITY_BANDS splits prescores into low / normal / high. 0 disables.
+MAX_INFLIGHT = int(os.getenv("DETECT_MAX_INFLIGHT", "0"))
+QUEUE_DEPTH = int(os.getenv("DETECT_QUEUE_DEPTH", "256"))
+PRIORITY_BANDS: Tuple[float, float] = tuple(float(x) for x in os.getenv("DETECT_PRIORITY_BANDS", "0.3,0.75").split(","))
+SHED_CLASSES = frozenset(c.strip() for c in os.getenv("DETECT_SHED_CLASSES", "low,normal").split(",") if c.strip())
+
+# Verdict cache keyed on the event's template (see event_template), so repeats of the
+# same event shape skip the LLM. DETECT_CACHE_SIZE=0 disables; DETECT_CACHE_DB adds a
+# SQLite tier shared across restarts and sibling workers.
+_cache_size = int(os.getenv("DETECT_CACHE_SIZE", "10000"))
+verdict_cache: TTLCache[Detection] | None = TTLCache(
+    maxsize=_cache_size,
+    ttl=float(os.getenv("DETECT_CACHE_TTL", "3600")),
+    sqlite_path=os.getenv("DETECT_CACHE_DB") or None,
+    table="verdicts",
+    dumps=lambda d: d.model_dump_json(),
+    loads=Detection.model_validate_json,
+) if _cache_size > 0 else None
+
+# Field names whose values are identities/times, masked regardless of content.
+_USER_KEYS = {"user", "username", "user_name", "account", "login", "src_user", "dst_user", "target_user"}
+_TS_KEYS = {"ts", "timestamp", "@timestamp", "time", "event_time", "date"}
+# One pass over each string value; earlier groups win (an IP isn't also four numbers).
+_MASK_RE = re.compile(
+    r"(?P<ts>\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)"
+    r"|(?P<email>\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b)"
+    r"|(?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}\b)"
+    r"|(?P<uuid>\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b)"
+    r"|(?P<hash>\b[0-9a-f]{32,128}\b)"
+    r"|(?P<num>\b\d+(?:\.\d+)?\b)",
+    re.I,
 )
 
+def _mask(v: Any) -> Any:
+    if isinstance(v, dict):
+        return {k: ("<user>" if k.lower() in _USER_KEYS else
+                    "<ts>" if k.lower() in _TS_KEYS else _mask(x))
+                for k, x in v.items()}
+    if isinstance(v, list):
+        return [_mask(x) for x in v]
+    if isinstance(v, str):
+        return _MASK_RE.sub(lambda m: f"<{m.lastgroup}>", v)
+    if isinstance(v, bool) or v is None:
+        return v
+    if isinstance(v, (int, float)):
+        return "<num>"
+    return v
+
+def event_template(event_json: str) -> str:
+    """
+    Normalized shape of an event: IPs, timestamps, users, emails, hashes and
+    numbers masked out, keys sorted. Events differing only in those share a template.
+    """
+    try:
+        return json.dumps(_mask(json.loads(event_json)), sort_keys=True, separators=(",", ":"))
+    except (json.JSONDecodeError, TypeError):
+        return _mask(event_json)
+
+def _cache_key(event_json: str) -> str:
+    return hashlib.blake2b(event_template(event_json).encode(), digest_size=16).hexdigest()
+
+CACHED_NOTE = " (cached verdict of a similar event)"
+
+def _cached(event_json: str) -> Optional[Detection]:
+    # the LLM's reason was written for another event of the template: say so
+    det = verdict_cache.get(_cache_key(event_json)) if verdict_cache is not None else None
+    if det is None:
+        return None
+    return Detection(label=det.label, reason=det.reason + CACHED_NOTE, confidence=det.confidence)
+
+def _remember(event_json: str, det: Detection) -> None:
+    # only LLM verdicts are cached; heuristic fallbacks are cheap and may be degraded
+    if verdict_cache is not None:
+        verdict_cache.set(_cache_key(event_json), det)
+
+# ---- local keyword tier ----
+# Rules file: {"rules": [{"label", "confidence", "reason", "keywords": [...]}, ...]}.
+# The built-in rules below are used when the file is missing.
+RULES_FILE = os.getenv("DETECT_RULES_FILE",
+                       os.path.join(os.path.dirname(__file__), "..", "rules", "detect_keywords.json"))
+_DEFAULT_KEYWORD_RULES = [
+    {"label": "malicious", "confidence": 0.75, "reason": "repeated failed logins/brute-force pattern",
+     "keywords": ["failed login", "multiple failed", "brute"]},
+    {"label": "suspicious", "confidence": 0.6, "reason": "suspicious keywords",
+     "keywords": ["phish", "suspicious", "malware", "exfil", "c2"]},
+]
+_SEVERITY = {"benign": 0, "suspicious": 1, "malicious": 2}
+
+# Tiered mode: events the keyword tier scores outside TIER_BAND are resolved locally,
+# only the ones inside it go to the LLM. Score = P(malicious)-ish: malicious -> confidence,
+# benign -> 1 - confidence, suspicious / conflicting labels -> 0.5.
+TIERED = os.getenv("DETECT_TIERED", "").lower() in {"1", "true", "yes"}
+TIER_BAND: Tuple[float, float] = tuple(float(x) for x in os.getenv("DETECT_TIER_BAND", "0.3,0.7").split(","))
+
+# How many events each tier resolved: keyword, cache, llm, fallback (LLM failed -> heuristic),
+# shed (LLM queue full -> heuristic, see prescore()).
+TIER_COUNTS: Counter = Counter()
+
+_kw_rules: List[dict] = []
+_kw_owner: List[int] = []  # keyword index -> rule index
+_kw_automaton = KeywordAutomaton([])
+
+def _compile_keyword_rules(rules: List[dict]) -> Tuple[List[dict], List[int], KeywordAutomaton]:
+    keywords, owner = [], []
+    for r_idx, r in enumerate(rules):
+        for kw in r["keywords"]:
+            keywords.append(kw); owner.append(r_idx)
+    automaton = KeywordAutomaton(keywords)
+    # the automaton drops duplicate keywords; map each surviving one to its first rule
+    first = {}
+    for kw, r_idx in zip(keywords, owner):
+        first.setdefault(kw.lower(), r_idx)
+    return rules, [first[k] for k in automaton.keywords], automaton
+
+def _read_keyword_rules(path: str) -> Tuple[List[dict], List[int], KeywordAutomaton]:
+    with open(path, encoding="utf-8") as f:
+        return _compile_keyword_rules(json.load(f)["rules"])
+
+def load_keyword_rules(path: str | None = None) -> int:
+    """(Re)load and compile the keyword rules; returns the number of keywords."""
+    global _kw_rules, _kw_owner, _kw_automaton
+    path = path or RULES_FILE
+    try:
+        # compiled form cached on disk, see storage/artifacts.py
+        compiled = load_or_build("detect-keywords", 1, path, lambda: _read_keyword_rules(path),
+                                 lambda c: (c[0], c[1], c[2].state()),
+                                 lambda s: (s[0], s[1], KeywordAutomaton.from_state(s[2])))
+    except FileNotFoundError:
+        compiled = _compile_keyword_rules(_DEFAULT_KEYWORD_RULES)
+    # swap in one assignment so concurrent readers never see a half-built set
+    _kw_rules, _kw_owner, _kw_automaton = compiled
+    return len(_kw_automaton)
+
+load_keyword_rules()
+
+def _keyword_verdict(event_json: str) -> Tuple[Detection, bool]:
+    """Verdict of the keyword tier and whether matched rules disagree on the label."""
+    rules, owner = _kw_rules, _kw_owner
+    hit = {owner[i] for i in _kw_automaton.matches(event_json)}
+    if not hit:
+        return Detection(label="benign", reason="Heuristic: no suspicious signals", confidence=0.55), False
+    labels = {rules[r]["label"] for r in hit}
+    top = max(labels, key=_SEVERITY.__getitem__)
+    best = max((rules[r] for r in hit if rules[r]["label"] == top), key=lambda r: r["confidence"])
+    return Detection(label=top, reason=f"Heuristic: {best['reason']}", confidence=best["confidence"]), len(labels) > 1
+
 def _heuristic_detect(event_json: str) -> Detection:
-    t = event_json.lower()
-    if "failed login" in t or "multiple failed" in t or "brute" in t:
-        return Detection(label="malicious",
-                         reason="Heuristic: repeated failed logins/brute-force pattern",
-                         confidence=0.75)
-    if any(k in t for k in ["phish", "suspicious", "malware", "exfil", "c2"]):
-        return Detection(label="suspicious",
-                         reason="Heuristic: suspicious keywords",
-                         confidence=0.6)
-    return Detection(label="benign", reason="Heuristic: no suspicious signals", confidence=0.55)
+    return _keyword_verdict(event_json)[0]
 
-def detect(event_json: str) -> Detection:
-    if llm is None:
+# ---- cross-event signals ----
+_WINDOW_REASONS = {
+    "failed_logins": "brute force, {n} failed logins from this source",
+    "distinct_users": "password spray, failed logins for {n} users from this source",
+    "bytes_out": "large outbound volume, {n} bytes from this source",
+}
+
+def apply_window_signals(det: Detection, signals: Dict[str, int]) -> Detection:
+    """Escalate a per-event verdict when agents.window_stats counters cross their thresholds."""
+    hits = [_WINDOW_REASONS[k].format(n=signals[k]) for k in _WINDOW_REASONS
+            if signals.get(k, 0) > WINDOW_THRESHOLDS[k]]
+    if not hits:
+        return det
+    return Detection(label="malicious", reason=f"{det.reason}; Window: {'; '.join(hits)}",
+                     confidence=max(det.confidence, 0.8))
+
+def _tier_score(det: Detection, ambiguous: bool) -> float:
+    if ambiguous or det.label == "suspicious":
+        return 0.5
+    return det.confidence if det.label == "malicious" else 1.0 - det.confidence
+
+def _resolve_cheap(event_json: str) -> Optional[Detection]:
+    """Answer from the keyword tier or the verdict cache if possible, else None (-> LLM)."""
+    if get_llm() is None:
+        TIER_COUNTS["keyword"] += 1
         return _heuristic_detect(event_json)
+    if TIERED:
+        det, ambiguous = _keyword_verdict(event_json)
+        score = _tier_score(det, ambiguous)
+        if score <= TIER_BAND[0] or score >= TIER_BAND[1]:
+            TIER_COUNTS["keyword"] += 1
+            return det
+    cached = _cached(event_json)
+    if cached is not None:
+        TIER_COUNTS["cache"] += 1
+    return cached
+
+def tier_stats() -> Dict[str, Any]:
+    total = sum(TIER_COUNTS.values())
+    return {
+        "total": total,
+        "counts": dict(TIER_COUNTS),
+        "share": {k: round(v / total, 4) for k, v in TIER_COUNTS.items()} if total else {},
+        "scheduler": scheduler.stats() if scheduler is not None else None,
+        "cache": cache_stats(),
+    }
+
+def cache_stats() -> Optional[Dict[str, Any]]:
+    """Verdict cache hits, misses, evictions and size; None when it is disabled."""
+    return verdict_cache.stats() if verdict_cache is not None else None
+
+def _parse_response(resp: str) -> Optional[Detection]:
     try:
-        resp = llm.invoke(PROMPT.format(event_json=event_json)).content
+        data = json.loads(resp)
+    except json.JSONDecodeError:
+        m = re.search(r"\{.*\}", resp, re.S)
+        data = json.loads(m.group(0)) if m else {}
+    if not data:
+        return None
+    return Detection(
+        label=data.get("label", "suspicious"),
+        reason=data.get("reason", f"{PROVIDER} parsed with defaults"),
+        confidence=float(data.get("confidence", 0.5)),
+    )
+
+def _prompt_event(event_json: str) -> str:
+    """The event as it goes into a prompt: compacted to DETECT_PROMPT_BUDGET tokens."""
+    out, before, after = compact(event_json)
+    PROMPT_TOKENS.observe(before, "before")
+    PROMPT_TOKENS.observe(after, "after")
+    return out
+
+def _invoke(prompt: str, kind: str) -> str:
+    """llm.invoke(...).content, counted and timed per provider in metrics."""
+    LLM_CALLS.inc(PROVIDER, kind)
+    t0 = time.perf_counter()
+    try:
+        return llm.invoke(prompt).content
+    except Exception:
+        LLM_ERRORS.inc(PROVIDER, kind)
+        raise
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - t0, PROVIDER, kind)
+
+async def _ainvoke(prompt: str, kind: str) -> str:
+    LLM_CALLS.inc(PROVIDER, kind)
+    t0 = time.perf_counter()
+    try:
+        return (await llm.ainvoke(prompt)).content
+    except Exception:
+        LLM_ERRORS.inc(PROVIDER, kind)
+        raise
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - t0, PROVIDER, kind)
+
+def detect(event_json: str) -> Detection:
+    cheap = _resolve_cheap(event_json)
+    if cheap is not None:
+        return cheap
+    return _detect_one(event_json)
+
+def _detect_one(event_json: str) -> Detection:
+    try:
+        det = _parse_response(_invoke(PROMPT.format(event_json=_prompt_event(event_json)), "single"))
+    except Exception:
+        det = None
+    return _finish([event_json], [det])[0]
+
+async def adetect(event_json: str) -> Detection:
+    """Same as detect(), but awaits the chat model so the event loop stays free."""
+    cheap = _resolve_cheap(event_json)
+    if cheap is not None:
+        return cheap
+    if scheduler is not None:
+        return await scheduler.run(prescore(event_json), lambda: _adetect_llm(event_json),
+                                   lambda: _shed(event_json))
+    return await _adetect_llm(event_json)
+
+async def _adetect_llm(event_json: str) -> Detection:
+    if BATCH_SIZE > 1:
+        return await _get_batcher().submit(event_json)
+    return await _adetect_one(event_json)
+
+async def _adetect_one(event_json: str) -> Detection:
+    try:
+        det = _parse_response(await _ainvoke(PROMPT.format(event_json=_prompt_event(event_json)), "single"))
+    except Exception:
+        det = None
+    return _finish([event_json], [det])[0]
+
+def _parse_batch_response(resp: str, n: int) -> List[Optional[Detection]]:
+    """Route each verdict of a batch reply to its event; None where it can't be parsed."""
+    try:
+        data = json.loads(resp)
+    except json.JSONDecodeError:
+        m = re.search(r"\[.*\]", resp, re.S)
         try:
-            data = json.loads(resp)
+            data = json.loads(m.group(0)) if m else []
         except json.JSONDecodeError:
-            m = re.search(r"\{.*\}", resp, re.S)
-            data = json.loads(m.group(0)) if m else {}
-        if not data:
-            return _heuristic_detect(event_json)
-        return Detection(
-            label=data.get("label", "suspicious"),
-            reason=data.get("reason", f"{PROVIDER} parsed with defaults"),
-            confidence=float(data.get("confidence", 0.5)),
-        )
+            data = []
+    if isinstance(data, dict):  # some models wrap the array: {"results": [...]}
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+
+    by_id: dict[int, dict] = {}
+    if isinstance(data, list):
+        ids_ok = all(isinstance(d, dict) and isinstance(d.get("id"), int) for d in data)
+        for pos, d in enumerate(data):
+            if isinstance(d, dict):
+                by_id[d["id"] if ids_ok else pos] = d
+
+    out: List[Optional[Detection]] = []
+    for i in range(n):
+        d = by_id.get(i)
+        try:
+            out.append(Detection(
+                label=d.get("label", "suspicious"),
+                reason=d.get("reason", f"{PROVIDER} parsed with defaults"),
+                confidence=float(d.get("confidence", 0.5)),
+            ) if d else None)
+        except Exception:
+            out.append(None)
+    return out
+
+def _batch_prompt(event_jsons: List[str]) -> str:
+    return BATCH_PROMPT.format(n=len(event_jsons),
+                               events="\n".join(f"{i}: {_prompt_event(e)}" for i, e in enumerate(event_jsons)))
+
+def _finish(event_jsons: List[str], verdicts: List[Optional[Detection]]) -> List[Detection]:
+    # cache what the LLM answered, fall back per event for the rest
+    out: List[Detection] = []
+    for e, det in zip(event_jsons, verdicts):
+        if det is None:
+            TIER_COUNTS["fallback"] += 1
+            out.append(_heuristic_detect(e))
+        else:
+            TIER_COUNTS["llm"] += 1
+            _remember(e, det)
+            out.append(det)
+    return out
+
+def _classify(event_jsons: List[str]) -> List[Detection]:
+    if len(event_jsons) == 1:
+        return [_detect_one(event_jsons[0])]
+    try:
+        verdicts = _parse_batch_response(_invoke(_batch_prompt(event_jsons), "batch"), len(event_jsons))
     except Exception:
-        return _heuristic_detect(event_json)
+        verdicts = [None] * len(event_jsons)
+    return _finish(event_jsons, verdicts)
+
+async def _aclassify(event_jsons: List[str]) -> List[Detection]:
+    if len(event_jsons) == 1:
+        return [await _adetect_one(event_jsons[0])]
+    try:
+        resp = await _ainvoke(_batch_prompt(event_jsons), "batch")
+        verdicts = _parse_batch_response(resp, len(event_jsons))
+    except Exception:
+        verdicts = [None] * len(event_jsons)
+    return _finish(event_jsons, verdicts)
+
+def _split_cheap(event_jsons: List[str]) -> tuple[List[Optional[Detection]], List[int]]:
+    out = [_resolve_cheap(e) for e in event_jsons]
+    return out, [i for i, d in enumerate(out) if d is None]
+
+def detect_batch(event_jsons: List[str]) -> List[Detection]:
+    """One LLM call for several events; locally resolved and cached ones stay out of the prompt."""
+    out, todo = _split_cheap(event_jsons)
+    if todo:
+        for i, det in zip(todo, _classify([event_jsons[i] for i in todo])):
+            out[i] = det
+    return out
+
+async def adetect_batch(event_jsons: List[str]) -> List[Detection]:
+    out, todo = _split_cheap(event_jsons)
+    if todo:
+        for i, det in zip(todo, await _aclassify([event_jsons[i] for i in todo])):
+            out[i] = det
+    return out
+
+class _MicroBatcher:
+    """
+    Collects concurrent adetect() calls on one event loop into batches of up to
+    max_size, waiting at most max_wait_s after the first event of a batch.
+    """
+    _CLOSE = None  # queue sentinel, see close()
+
+    def __init__(self, max_size: int, max_wait_s: float):
+        self.max_size = max_size
+        self.max_wait_s = max_wait_s
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.inflight: set[asyncio.Task] = set()
+        self.worker = self.loop.create_task(self._run())
+
+    async def submit(self, event_json: str) -> Detection:
+        fut = self.loop.create_future()
+        await self.queue.put((event_json, fut))
+        return await fut
+
+    def close(self) -> None:
+        """Stop taking events. Everything already submitted is still classified:
+        the worker batches what is queued ahead of the sentinel as usual, flushes
+        the batch it holds without waiting out max_wait_s, then exits. Safe to
+        call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, self._CLOSE)
+        except RuntimeError:  # loop already closed: nobody is waiting on it
+            pass
+
+    async def _run(self) -> None:
+        closing = False
+        while not closing:
+            item = await self.queue.get()
+            if item is self._CLOSE:
+                return
+            batch = [item]
+            deadline = self.loop.time() + self.max_wait_s
+            while len(batch) < self.max_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is self._CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+            # classify in the background so the next batch can start filling now
+            t = self.loop.create_task(self._flush(batch))
+            self.inflight.add(t)
+            t.add_done_callback(self.inflight.discard)
+
+    async def _flush(self, batch: list) -> None:
+        try:
+            results = await _aclassify([e for e, _ in batch])
+        except Exception:
+            results = [_heuristic_detect(e) for e, _ in batch]
+        for (_, fut), det in zip(batch, results):
+            if not fut.done():
+                fut.set_result(det)
+
+_batcher: _MicroBatcher | None = None
+
+# ---- priority scheduling ----
+_REPUTATION_SCORE = {"malicious": 1.0, "suspicious": 0.5}
+IOC_WEIGHT = 0.2  # at 5+ IOCs
+
+def prescore(event_json: str) -> float:
+    """
+    Cheap 0..1 urgency of an event, for ordering the LLM queue: the keyword tier's
+    verdict, the worst local reputation (feed index or OSINT cache) of its IOCs,
+    and how many IOCs it carries. No network calls.
+    """
+    from agents import osint
+    from agents.ioc_extract import extract_iocs
+    det, ambiguous = _keyword_verdict(event_json)
+    kw = (det.confidence if det.label == "malicious" else
+          0.5 if det.label == "suspicious" or ambiguous else 0.0)
+    iocs = extract_iocs(event_json)
+    rep = 0.0
+    for ioc in iocs:
+        rep = max(rep, _REPUTATION_SCORE.get(osint.local_reputation(ioc), 0.0))
+    return min(1.0, max(kw, rep) + IOC_WEIGHT * min(len(iocs), 5) / 5)
+
+def _shed(event_json: str) -> Detection:
+    TIER_COUNTS["shed"] += 1
+    det = _heuristic_detect(event_json)
+    return Detection(label=det.label, reason=f"{det.reason} (LLM queue full)", confidence=det.confidence)
+
+scheduler: AdmissionQueue | None = None
+
+def set_scheduling(max_inflight: int, queue_depth: int | None = None) -> None:
+    """Retune admission control at runtime (max_inflight <= 0 turns it off). Events
+    already queued finish under the old limits."""
+    global MAX_INFLIGHT, QUEUE_DEPTH, scheduler
+    MAX_INFLIGHT = max_inflight
+    QUEUE_DEPTH = QUEUE_DEPTH if queue_depth is None else queue_depth
+    scheduler = AdmissionQueue(MAX_INFLIGHT, QUEUE_DEPTH, PRIORITY_BANDS, SHED_CLASSES) if MAX_INFLIGHT > 0 else None
+
+set_scheduling(MAX_INFLIGHT)
+
+def set_batching(max_size: int, max_wait_ms: float) -> None:
+    """Retune micro-batching at runtime (max_size <= 1 turns it off). Events
+    already submitted finish under the old settings."""
+    global BATCH_SIZE, BATCH_WAIT_MS, _batcher
+    BATCH_SIZE, BATCH_WAIT_MS = max_size, max_wait_ms
+    if _batcher is not None:
+        _batcher.close()
+        _batcher = None
+
+def _get_batcher() -> _MicroBatcher:
+    global _batcher
+    loop = asyncio.get_running_loop()
+    if _batcher is None or _batcher.loop is not loop or _batcher.worker.done():
+        if _batcher is not None:
+            _batcher.close()
+        _batcher = _MicroBatcher(BATCH_SIZE, BATCH_WAIT_MS / 1000.0)
+    return _batcher
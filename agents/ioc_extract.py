@@ -1,7 +1,7 @@
 # agents/ioc_extract.py
 import re
 from typing import List
-from storage.schema import IOC
+from storage.records import IOCRec
 
 IP_RE   = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
 URL_RE  = re.compile(r"https?://[^\s\"'>)\]]+", re.I)  # avoid ) ] ' " >
@@ -10,35 +10,84 @@ MAIL_RE = re.compile(r"\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b", re.I)
 # Use non-capturing groups; match the whole domain; strong word boundaries
 DOM_RE  = re.compile(r"\b(?!https?://)(?:[a-z0-9-]+\.)+[a-z]{2,}\b", re.I)
 
+# All five patterns fused into one alternation so the text is scanned once.
+# Order matters: at any position a URL or email wins over the IP/domain inside it,
+# and a domain over an IP or hash that is only its first labels ("10.0.0.1.example.com");
+# finditer resumes after the whole match, so _scan() rescans the inside of a URL and
+# looks for IPs/hashes inside a domain.
+# Known differences from the five separate sweeps: the local part of an email is
+# not scanned, and a scheme glued to a preceding name ("a.com.http://x") is taken
+# as part of the domain.
+# The unnamed last branch swallows any other word in one step (stopping only where a
+# URL could begin) instead of retrying every branch at each character of it.
+# Possessive ++ where the class can't contain the next literal: no useless backtracking.
+IOC_RE = re.compile(
+    r"(?P<url>https?://[^\s\"'>)\]]++)"
+    r"|(?P<email>\b[a-z0-9._%+-]++@[a-z0-9.-]+\.[a-z]{2,}\b)"
+    r"|(?P<domain>\b(?:[a-z0-9-]++\.)+[a-z]{2,}\b)"
+    r"|(?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}\b)"
+    r"|(?P<hash>\b(?:[a-f0-9]{64}|[a-f0-9]{32})\b)"
+    r"|\w(?:[^\Wh]++|h(?!ttps?://))*",
+    re.I,
+)
+_HOST_RE = re.compile(r"(?:[a-z0-9-]+\.)+[a-z]{2,}", re.I)
+# IPs and hashes among a domain's labels
+_INNER_RE = re.compile(r"(?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}\b)|(?P<hash>\b(?:[a-f0-9]{64}|[a-f0-9]{32})\b)", re.I)
+
 TRAILING_PUNCT = ".,;:)]}>\"'"
 
 def _clean(s: str) -> str:
     # strip trailing/leading punctuation commonly stuck to tokens
     return s.strip().strip(TRAILING_PUNCT)
 
-def extract_iocs(text: str) -> List[IOC]:
-    found: List[IOC] = []
-
-    # Collect URLs first
-    urls = [ _clean(m.group(0)) for m in URL_RE.finditer(text) ]
-    for u in urls:
-        if u: found.append(IOC(type="url", value=u))
-
-    for m in IP_RE.finditer(text):
-        found.append(IOC(type="ip", value=_clean(m.group(0))))
-    for m in HASH_RE.finditer(text):
-        found.append(IOC(type="hash", value=_clean(m.group(0))))
-    for m in MAIL_RE.finditer(text):
-        found.append(IOC(type="email", value=_clean(m.group(0))))
-    for m in DOM_RE.finditer(text):
-        dom = _clean(m.group(0))
-        if dom:
-            found.append(IOC(type="domain", value=dom))
-
-    # case sensitive  value type
-    seen, out = set(), []
-    for i in found:
-        k = (i.type, i.value.lower())
-        if k not in seen:
-            seen.add(k); out.append(i)
+def _host_ioc(host: str) -> tuple[str, str] | None:
+    # classify the host part of a URL/email without rescanning the text
+    host = _clean(host)
+    if IP_RE.fullmatch(host):
+        return "ip", host
+    if _HOST_RE.fullmatch(host):
+        return "domain", host
+    return None
+
+def _scan(text: str, add, nested: bool = False) -> None:
+    for m in IOC_RE.finditer(text):
+        t = m.lastgroup
+        if t is None:
+            continue
+        if t == "url":
+            # the URL swallowed its host and anything after it (a redirect target in
+            # the query, an email, an IP): scan that part again. A nested URL is not
+            # reported itself, only what it carries, as the five-sweep extractor did.
+            if not nested:
+                add(t, _clean(m.group(0)))
+            _scan(m.group(0).split("://", 1)[1], add, True)
+            continue
+        v = _clean(m.group(0))
+        add(t, v)
+        if t == "email":
+            # the host of an email is still an indicator in its own right; the local
+            # part is not scanned ("first.last" is not a domain)
+            h = _host_ioc(v.rsplit("@", 1)[-1])
+            if h:
+                add(*h)
+                if h[0] == "domain":
+                    _scan_labels(h[1], add)
+        elif t == "domain":
+            _scan_labels(v, add)
+
+def _scan_labels(domain: str, add) -> None:
+    for m in _INNER_RE.finditer(domain):
+        add(m.lastgroup, m.group(0))
+
+def extract_iocs(text: str) -> List[IOCRec]:
+    seen: set[tuple[str, str]] = set()
+    out: List[IOCRec] = []
+
+    def add(t: str, v: str) -> None:
+        # case sensitive  value type; dedup before building the record
+        k = (t, v.lower())
+        if v and k not in seen:
+            seen.add(k); out.append(IOCRec(t, v))
+
+    _scan(text, add)
     return out
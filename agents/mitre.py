@@ -1,14 +1,30 @@
 # agents/mitre.py
 from __future__ import annotations
-from typing import List, Dict
-from storage.schema import MitreMapping, OSINTFinding
+from typing import Any, Dict, Iterable, List, Tuple
+import json, os
+from storage.records import FindingRec, MappingRec
+from agents.automaton import KeywordAutomaton
+from agents.window_stats import THRESHOLDS as WINDOW_THRESHOLDS
+from storage.artifacts import load_or_build
 
-# Minimal mapping rules. Expand as you add detections.
+try:  # YAML rule files are optional
+    import yaml
+except ImportError:
+    yaml = None
+
+# Minimal mapping rules, used when MITRE_RULES_FILE / rules/mitre_rules.json is missing.
+# Expand as you add detections.
 RULES = [
     # Credential Access
     ({"tags": {"brute-force"}}, {"tactic": "Credential Access", "technique_id": "T1110", "technique": "Brute Force"}),
     ({"reason_contains": ["password spray", "credential stuffing"]},
      {"tactic": "Credential Access", "technique_id": "T1110.003", "technique": "Password Spraying"}),
+    # cross-event counters from agents/window_stats.py: {signal: fires when above};
+    # None is the shared threshold, window_stats.THRESHOLDS (WINDOW_* env)
+    ({"window": {"failed_logins": None}},
+     {"tactic": "Credential Access", "technique_id": "T1110", "technique": "Brute Force"}),
+    ({"window": {"distinct_users": None}},
+     {"tactic": "Credential Access", "technique_id": "T1110.003", "technique": "Password Spraying"}),
 
     # Initial Access (phishing)
     ({"reason_contains": ["phish", "spearphish", "malicious attachment"]},
@@ -27,33 +43,187 @@ RULES = [
     # Exfiltration
     ({"reason_contains": ["exfiltration", "data exfil", "large outbound"]},
      {"tactic": "Exfiltration", "technique_id": "T1041", "technique": "Exfiltration Over C2 Channel"}),
+    ({"window": {"bytes_out": None}},
+     {"tactic": "Exfiltration", "technique_id": "T1041", "technique": "Exfiltration Over C2 Channel"}),
 ]
 
-def mitre_map(osint: Dict[str, OSINTFinding], detection_reason: str) -> List[MitreMapping]:
-    """Map OSINT tags and the detector's reason text to MITRE techniques."""
+Rule = Tuple[Dict[str, Any], Dict[str, str]]
+
+class CompiledRules:
+    """
+    A rule set compiled for one-pass evaluation: every reason_contains substring
+    goes into a single Aho-Corasick automaton, and required tags into an inverted
+    index tag -> rules. A rule matches when all its tags are present (if it has
+    any), at least one of its substrings occurs in the reason (if it has any) and
+    every window signal exceeds its threshold (if it has any). A None threshold is
+    looked up in window_stats.THRESHOLDS at match time, so the compiled set (and
+    its on-disk cache) doesn't depend on the environment.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: List[Rule] = list(rules)
+        self.mappings = [MappingRec(**m) for _, m in self.rules]
+        substrs: List[str] = []
+        owners: Dict[str, List[int]] = {}
+        self.tag_index: Dict[str, List[int]] = {}
+        self.tag_need: List[int] = []
+        self.unconditional: List[int] = []
+        self.sub_only: set[int] = set()
+        self.tag_only: set[int] = set()
+        self.window: Dict[int, Dict[str, float | None]] = {}
+        for i, (cond, _) in enumerate(self.rules):
+            tags = {t.lower() for t in cond.get("tags") or ()}
+            subs = [x.lower() for x in cond.get("reason_contains") or ()]
+            if cond.get("window"):
+                self.window[i] = dict(cond["window"])
+            self.tag_need.append(len(tags))
+            for t in tags:
+                self.tag_index.setdefault(t, []).append(i)
+            for x in subs:
+                if x not in owners:
+                    owners[x] = []
+                    substrs.append(x)
+                owners[x].append(i)
+            if not tags and not subs:
+                self.unconditional.append(i)
+            elif not tags:
+                self.sub_only.add(i)
+            elif not subs:
+                self.tag_only.add(i)
+        self.automaton = KeywordAutomaton(substrs)
+        self.kw_rules = [owners[k] for k in self.automaton.keywords]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    _FIELDS = ("rules", "tag_index", "tag_need", "unconditional", "sub_only", "tag_only", "window", "kw_rules")
+
+    def state(self) -> tuple:
+        """Plain-container form for storage/artifacts.py; from_state() undoes it."""
+        return tuple(getattr(self, f) for f in self._FIELDS) + (self.automaton.state(),)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "CompiledRules":
+        self = cls.__new__(cls)
+        for f, v in zip(cls._FIELDS, state):
+            setattr(self, f, v)
+        self.automaton = KeywordAutomaton.from_state(state[-1])
+        self.mappings = [MappingRec(**m) for _, m in self.rules]
+        return self
+
+    def window_thresholds(self, i: int) -> Dict[str, float]:
+        """Rule i's window condition with shared thresholds filled in."""
+        return {k: WINDOW_THRESHOLDS[k] if v is None else v for k, v in self.window.get(i, {}).items()}
+
+    def match(self, tags: set[str], reason: str, signals: Dict[str, float] | None = None) -> List[int]:
+        """Indices of matching rules, in rule-file order."""
+        sub_hit: set[int] = set()
+        if reason:
+            for k in self.automaton.matches(reason):
+                sub_hit.update(self.kw_rules[k])
+        tag_count: Dict[int, int] = {}
+        for t in tags:
+            for i in self.tag_index.get(t, ()):
+                tag_count[i] = tag_count.get(i, 0) + 1
+        tag_ok = {i for i, n in tag_count.items() if n == self.tag_need[i]}
+        hit = set(self.unconditional)
+        hit.update(i for i in sub_hit if i in self.sub_only or i in tag_ok)
+        hit.update(i for i in tag_ok if i in self.tag_only)
+        if self.window:
+            sig = signals or {}
+            hit = {i for i in hit
+                   if all(sig.get(k, 0) > v for k, v in self.window_thresholds(i).items())}
+        return sorted(hit)
+
+def _stix_rules(bundle: Dict[str, Any]) -> List[Rule]:
+    """
+    Rules from an ATT&CK STIX bundle: for each live attack-pattern, one rule on
+    its name in the detector's reason and one on its slug as an OSINT tag.
+    """
+    out: List[Rule] = []
+    for obj in bundle.get("objects", []):
+        if obj.get("type") != "attack-pattern" or obj.get("revoked") or obj.get("x_mitre_deprecated"):
+            continue
+        ext = next((r.get("external_id") for r in obj.get("external_references", [])
+                    if r.get("source_name") == "mitre-attack"), None)
+        if not ext or not obj.get("name"):
+            continue
+        name = obj["name"]
+        for phase in obj.get("kill_chain_phases", []) or [{"phase_name": "unknown"}]:
+            if phase.get("kill_chain_name", "mitre-attack") != "mitre-attack":
+                continue
+            mapping = {"tactic": phase["phase_name"].replace("-", " ").title(),
+                       "technique_id": ext, "technique": name}
+            out.append(({"reason_contains": [name.lower()]}, mapping))
+            out.append(({"tags": {name.lower().replace(" ", "-").replace("/", "-")}}, mapping))
+    return out
+
+def load_rules_file(path: str) -> List[Rule]:
+    """Read rules from JSON/YAML ({"rules": [...]}) or an ATT&CK STIX bundle."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("PyYAML is required for YAML rule files")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict) and data.get("type") == "bundle":
+        return _stix_rules(data)
+    entries = data["rules"] if isinstance(data, dict) else data
+    out: List[Rule] = []
+    for r in entries:
+        cond = {}
+        if r.get("tags"):
+            cond["tags"] = set(r["tags"])
+        if r.get("reason_contains"):
+            cond["reason_contains"] = list(r["reason_contains"])
+        if r.get("window"):
+            cond["window"] = dict(r["window"])
+        out.append((cond, {k: r[k] for k in ("tactic", "technique_id", "technique")}))
+    return out
+
+RULES_FILE = os.getenv("MITRE_RULES_FILE",
+                       os.path.join(os.path.dirname(__file__), "..", "rules", "mitre_rules.json"))
+
+_compiled = CompiledRules(RULES)
+
+def set_rules(rules: Iterable[Rule]) -> int:
+    """Compile and swap in a new rule set; in-flight mitre_map calls keep the old one."""
+    global _compiled
+    _compiled = CompiledRules(rules)
+    return len(_compiled)
+
+def load_rules(path: str | None = None) -> int:
+    """(Re)load rules from a file; falls back to the built-in RULES when it is missing.
+    The compiled set is cached on disk (storage/artifacts.py): an ATT&CK bundle is
+    tens of MB of JSON, parsed once per edit of the file rather than per process."""
+    global _compiled
+    path = path or RULES_FILE
+    try:
+        _compiled = load_or_build("mitre", 1, path, lambda: CompiledRules(load_rules_file(path)),
+                                  CompiledRules.state, CompiledRules.from_state)
+    except FileNotFoundError:
+        return set_rules(RULES)
+    return len(_compiled)
+
+load_rules()
+
+def mitre_map(osint: Dict[str, FindingRec], detection_reason: str,
+              signals: Dict[str, float] | None = None) -> List[MappingRec]:
+    """Map OSINT tags, the detector's reason text and window signals to MITRE techniques."""
     # gather lowercase tags
     tags = set()
     for v in osint.values():
         for t in v.tags:
             tags.add(t.lower())
 
+    compiled = _compiled
     reason = (detection_reason or "").lower()
-    out: List[MitreMapping] = []
-
-    for cond, mapping in RULES:
-        ok = True
-        want_tags = cond.get("tags")
-        if want_tags and not want_tags.issubset(tags):
-            ok = False
-        substrs = cond.get("reason_contains")
-        if ok and substrs and not any(s in reason for s in substrs):
-            ok = False
-        if ok:
-            out.append(MitreMapping(**mapping))
 
     # dedupe by technique_id
     seen, uniq = set(), []
-    for m in out:
+    for i in compiled.match(tags, reason, signals):
+        m = compiled.mappings[i]
         if m.technique_id not in seen:
-            seen.add(m.technique_id); uniq.append(m)
+            seen.add(m.technique_id); uniq.append(m)  # frozen, safe to share
     return uniq
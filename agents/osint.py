@@ -1,58 +1,212 @@
 # agents/osint.py
 from __future__ import annotations
-from typing import Dict
-from datetime import datetime, timedelta
-
-from storage.schema import IOC, OSINTFinding
-
-# Simple in-memory cache: {ioc_value: (finding, expires_at)}
-_CACHE: Dict[str, tuple[OSINTFinding, datetime]] = {}
-
-# Heuristic examples you can replace with real API lookups.
-# For demo/smoke: mark 203.0.113.0/24 (RFC 5737 TEST-NET-3) as "malicious" to simulate hits.
-def _heuristic_lookup(ioc: IOC) -> OSINTFinding:
-    if ioc.type == "ip" and ioc.value.startswith("203.0.113."):
-        return OSINTFinding(
-            reputation="malicious",
-            sources=["HeuristicStub"],
-            last_seen=datetime.utcnow(),
-            tags=["brute-force"],
-        )
-    # Example: domains that look like obvious placeholders → unknown
-    if ioc.type in {"domain", "url"} and ("example.com" in ioc.value or "example.org" in ioc.value):
-        return OSINTFinding(reputation="unknown", sources=["HeuristicStub"])
-
-    # Default
-    return OSINTFinding(reputation="unknown", sources=[])
-
-def _get_cached(ioc_value: str) -> OSINTFinding | None:
-    hit = _CACHE.get(ioc_value)
-    if not hit:
-        return None
-    finding, exp = hit
-    if datetime.utcnow() > exp:
-        _CACHE.pop(ioc_value, None)
-        return None
-    return finding
+from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+import asyncio, os, threading
+from urllib.parse import urlsplit
+
+from storage.schema import OSINTFinding
+from storage.records import FindingRec, IOCRec
+from storage.cache import TTLCache
+from agents.osint_providers import Provider, providers_from_env
+from agents.reputation_index import FeedWatcher
+
+# Bounded LRU keyed by (type, value). OSINT_CACHE_DB adds a SQLite tier shared by
+# every worker on the host; a background thread purges expired entries.
+_CACHE: TTLCache[FindingRec] = TTLCache(
+    maxsize=int(os.getenv("OSINT_CACHE_SIZE", "50000")),
+    ttl=600,
+    sqlite_path=os.getenv("OSINT_CACHE_DB") or None,
+    table="osint",
+    dumps=FindingRec.to_json,
+    loads=FindingRec.from_json,
+)
+_CACHE.start_expiry(float(os.getenv("OSINT_CACHE_EXPIRY_INTERVAL", "60")))
+
+# Seconds to keep a finding, by reputation; "unknown" is the negative cache.
+TTL_BY_REPUTATION = {
+    "malicious": int(os.getenv("OSINT_TTL_MALICIOUS", "3600")),
+    "suspicious": int(os.getenv("OSINT_TTL_SUSPICIOUS", "1800")),
+    "unknown": int(os.getenv("OSINT_TTL_UNKNOWN", "300")),
+}
+# Cap for a finding some provider did not answer (rate-limited, timed out, failed):
+# retried soon rather than kept as "unknown" for OSINT_TTL_UNKNOWN.
+TTL_INCOMPLETE = int(os.getenv("OSINT_TTL_INCOMPLETE", "30"))
+
+# Local threat-intel feeds (see agents/reputation_index.py for the file format).
+# OSINT_INDEX_FILE caches the compiled index for fast, mmap-ed worker start-up;
+# feeds are re-checked every OSINT_FEEDS_RELOAD seconds and swapped in live.
+FEEDS = FeedWatcher(
+    os.getenv("OSINT_FEEDS_DIR", os.path.join(os.path.dirname(__file__), "..", "feeds")),
+    index_file=os.getenv("OSINT_INDEX_FILE") or None,
+    interval=float(os.getenv("OSINT_FEEDS_RELOAD", "30")),
+)
+
+def _feed_entry(ioc: IOCRec):
+    idx = FEEDS.index
+    if ioc.type == "ip":
+        return idx.lookup_ip(ioc.value)
+    if ioc.type == "domain":
+        return idx.lookup_domain(ioc.value)
+    if ioc.type == "hash":
+        return idx.lookup_hash(ioc.value)
+    if ioc.type == "email":
+        return idx.lookup_domain(ioc.value.rsplit("@", 1)[-1])
+    if ioc.type == "url":
+        try:
+            host = urlsplit(ioc.value).hostname or ""
+        except ValueError:
+            return None
+        return idx.lookup_ip(host) or idx.lookup_domain(host) if host else None
+    return None
+
+# Local lookup against the feed index; remote providers are merged on top.
+# The bundled feeds/demo.txt marks 203.0.113.0/24 (RFC 5737 TEST-NET-3) as "malicious" to simulate hits.
+def _heuristic_lookup(ioc: IOCRec) -> FindingRec:
+    hit = _feed_entry(ioc)
+    if hit is None:
+        return FindingRec("unknown")
+    reputation, source, tags = hit
+    return FindingRec(reputation, [source],
+                      datetime.utcnow() if reputation != "unknown" else None, list(tags))
+
+_CASELESS_TYPES = {"ip", "domain", "hash", "email"}
+
+def _cache_key(ioc: IOCRec) -> str:
+    # URL paths and queries are case-sensitive; only the scheme and host fold
+    value = ioc.value
+    if ioc.type in _CASELESS_TYPES:
+        value = value.lower()
+    elif ioc.type == "url":
+        try:
+            u = urlsplit(value)
+        except ValueError:
+            return f"{ioc.type}:{value}"
+        userinfo, at, host = u.netloc.rpartition("@")
+        value = u._replace(scheme=u.scheme.lower(), netloc=userinfo + at + host.lower()).geturl()
+    return f"{ioc.type}:{value}"
+
+def _get_cached(ioc: IOCRec) -> FindingRec | None:
+    return _CACHE.get(_cache_key(ioc))
+
+def _set_cache(ioc: IOCRec, finding: FindingRec, ttl_seconds: int | None = None) -> None:
+    if ttl_seconds is None:
+        ttl_seconds = TTL_BY_REPUTATION.get(finding.reputation, 600)
+    _CACHE.set(_cache_key(ioc), finding, ttl_seconds)
 
-def _set_cache(ioc_value: str, finding: OSINTFinding, ttl_seconds: int = 600) -> None:
-    _CACHE[ioc_value] = (finding, datetime.utcnow() + timedelta(seconds=ttl_seconds))
+def local_reputation(ioc: IOCRec) -> str:
+    """Reputation known without a network call: a cached finding, else the feed index."""
+    cached = _get_cached(ioc)
+    if cached is not None:
+        return cached.reputation
+    hit = _feed_entry(ioc)
+    return hit[0] if hit is not None else "unknown"
 
-def lookup_osint(ioc: IOC) -> OSINTFinding:
+def cache_stats() -> Dict[str, Any]:
+    return _CACHE.stats()
+
+# Remote providers (AbuseIPDB / VirusTotal / OTX / JSON service), queried concurrently
+# on a shared pool. _heuristic_lookup always runs inline on top of them.
+PROVIDERS: List[Provider] = providers_from_env()
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("OSINT_MAX_WORKERS", "32")),
+                           thread_name_prefix="osint")
+# single-flight: (provider, type, value) -> the one in-flight request everyone waits on
+_INFLIGHT: Dict[tuple[str, str], Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+COALESCED = 0  # lookups that joined an in-flight request instead of sending their own
+
+def register_provider(provider: Provider) -> None:
+    PROVIDERS.append(provider)
+
+def _submit(provider: Provider, ioc: IOCRec) -> Future:
+    global COALESCED
+    key = (provider.name, _cache_key(ioc))
+    with _INFLIGHT_LOCK:
+        fut = _INFLIGHT.get(key)
+        if fut is not None:
+            COALESCED += 1
+            return fut
+        fut = _POOL.submit(provider.lookup, ioc)
+        _INFLIGHT[key] = fut
+    def _release(f: Future) -> None:
+        with _INFLIGHT_LOCK:
+            if _INFLIGHT.get(key) is f:
+                del _INFLIGHT[key]
+    fut.add_done_callback(_release)
+    return fut
+
+_REPUTATION_RANK = {"unknown": 0, "suspicious": 1, "malicious": 2}
+
+def _merge(findings: List[Optional[FindingRec | OSINTFinding]]) -> FindingRec:
     """
-    Replace this with real OSINT provider lookups.
-    E.g., AbuseIPDB/VirusTotal/OTX clients with retries + timeouts.
+    Worst reputation wins; sources and tags are unioned in order, latest last_seen kept.
+    Providers return validated OSINTFinding models (remote input); the result is a record.
     """
-    cached = _get_cached(ioc.value)
-    if cached:
-        return cached
-    finding = _heuristic_lookup(ioc)
-    _set_cache(ioc.value, finding)
+    found = [f for f in findings if f is not None]
+    sources: Dict[str, None] = {}
+    tags: Dict[str, None] = {}
+    for f in found:
+        sources.update(dict.fromkeys(f.sources))
+        tags.update(dict.fromkeys(f.tags))
+    seen = [f.last_seen for f in found if f.last_seen is not None]
+    return FindingRec(
+        reputation=max((f.reputation for f in found), key=_REPUTATION_RANK.__getitem__, default="unknown"),
+        sources=list(sources),
+        # naive datetimes (utcnow) are UTC
+        last_seen=max(seen, key=lambda d: (d if d.tzinfo else d.replace(tzinfo=timezone.utc)).timestamp())
+        if seen else None,
+        tags=list(tags),
+    )
+
+def _fan_out(iocs: List[IOCRec]) -> tuple[Dict[str, FindingRec], Dict[str, tuple[IOCRec, List[Future]]]]:
+    """Serve cache hits; start provider requests for everything else."""
+    done: Dict[str, FindingRec] = {}
+    pending: Dict[str, tuple[IOCRec, List[Future]]] = {}
+    for ioc in iocs:
+        if ioc.value in done or ioc.value in pending:
+            continue
+        cached = _get_cached(ioc)
+        if cached:
+            done[ioc.value] = cached
+        else:
+            pending[ioc.value] = (ioc, [_submit(p, ioc) for p in PROVIDERS if p.supports(ioc)])
+    return done, pending
+
+def _finish(ioc: IOCRec, remote: List[Optional[OSINTFinding]]) -> FindingRec:
+    finding = _merge([_heuristic_lookup(ioc), *remote]) if remote else _heuristic_lookup(ioc)
+    ttl = TTL_BY_REPUTATION.get(finding.reputation, 600)
+    # worst reputation wins, so a missing answer can only have raised a non-malicious one
+    if any(r is None for r in remote) and finding.reputation != "malicious":
+        ttl = min(ttl, TTL_INCOMPLETE)
+    _set_cache(ioc, finding, ttl)
     return finding
 
-def enrich(iocs: list[IOC]) -> Dict[str, OSINTFinding]:
+def lookup_osint(ioc: IOCRec) -> FindingRec:
+    """Cached lookup of one IOC across every provider that supports its type."""
+    return enrich([ioc])[ioc.value]
+
+def enrich(iocs: list[IOCRec]) -> Dict[str, FindingRec]:
     """
-    Returns a dict keyed by IOC value -> OSINTFinding.
-    Deduplicates by IOC value automatically via dict keys.
+    Returns a dict keyed by IOC value -> FindingRec.
+    Deduplicates by IOC value automatically via dict keys. All provider
+    requests for the alert are in flight at once.
     """
-    return {ioc.value: lookup_osint(ioc) for ioc in iocs}
+    out, pending = _fan_out(iocs)
+    for value, (ioc, futs) in pending.items():
+        out[value] = _finish(ioc, [f.result() for f in futs])
+    return {ioc.value: out[ioc.value] for ioc in iocs}
+
+async def aenrich(iocs: list[IOCRec]) -> Dict[str, FindingRec]:
+    """enrich() for the async graph path: waits on the provider pool without blocking the loop."""
+    out, pending = _fan_out(iocs)
+    if pending:
+        results = await asyncio.gather(*(
+            asyncio.gather(*(asyncio.wrap_future(f) for f in futs)) for _, futs in pending.values()
+        ))
+        for (value, (ioc, _)), remote in zip(pending.items(), results):
+            out[value] = _finish(ioc, list(remote))
+    return {ioc.value: out[ioc.value] for ioc in iocs}
+
+def provider_stats() -> Dict[str, Any]:
+    return {"coalesced": COALESCED, **{p.name: p.stats_snapshot() for p in PROVIDERS}}
@@ -0,0 +1,202 @@
+# agents/osint_providers.py
+from __future__ import annotations
+import abc, base64, os, threading, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from storage.records import IOCRec
+from storage.schema import OSINTFinding
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, up to `burst` banked."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        """Take one token, waiting at most `timeout` seconds; False if none came free."""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class Provider(abc.ABC):
+    """
+    One OSINT source. Subclasses set `name` and `types` and implement _lookup().
+    lookup() adds the rate limit and turns every failure into None, so a slow or
+    broken provider never fails enrichment.
+    """
+    name = "provider"
+    types: Set[str] = set()
+
+    def __init__(self, rate: float = 0, burst: int | None = None, timeout: float = 5.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.stats = {"calls": 0, "errors": 0, "rate_limited": 0, "latency_s": 0.0}
+        self._stats_lock = threading.Lock()  # lookup() runs on the osint pool's threads
+
+    def supports(self, ioc: IOCRec) -> bool:
+        return ioc.type in self.types
+
+    def _count(self, key: str, n: float = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def stats_snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        if not self.bucket.acquire(self.timeout):
+            self._count("rate_limited")
+            return None
+        t0 = time.perf_counter()
+        self._count("calls")
+        try:
+            return self._lookup(ioc)
+        except Exception:
+            self._count("errors")
+            return None
+        finally:
+            self._count("latency_s", time.perf_counter() - t0)
+
+    @abc.abstractmethod
+    def _lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        """One request to the source; may raise, lookup() turns that into None."""
+
+class HTTPProvider(Provider):
+    """Provider backed by a pooled keep-alive requests.Session."""
+    base_url = ""
+
+    def __init__(self, base_url: str | None = None, headers: Dict[str, str] | None = None,
+                 pool_size: int = 32, **kw: Any):
+        super().__init__(**kw)
+        self.base_url = (base_url or self.base_url).rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def _get(self, path: str, **params: Any) -> Dict[str, Any]:
+        r = self.session.get(f"{self.base_url}{path}", params=params or None, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+class JSONProvider(HTTPProvider):
+    """
+    Generic provider for an internal reputation service (or a local stub):
+    GET {base_url}/lookup?type=<t>&value=<v> ->
+    {"reputation": "...", "tags": [...], "last_seen": "<iso8601>"}.
+    """
+    name = "JSONProvider"
+    types = {"ip", "domain", "url", "hash", "email"}
+
+    def _lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        data = self._get("/lookup", type=ioc.type, value=ioc.value)
+        return OSINTFinding(
+            reputation=data.get("reputation", "unknown"),
+            sources=[self.name],
+            last_seen=data.get("last_seen"),
+            tags=data.get("tags", []),
+        )
+
+class AbuseIPDBProvider(HTTPProvider):
+    name = "AbuseIPDB"
+    types = {"ip"}
+    base_url = "https://api.abuseipdb.com/api/v2"
+
+    def __init__(self, api_key: str, **kw: Any):
+        super().__init__(headers={"Key": api_key, "Accept": "application/json"}, **kw)
+
+    def _lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        d = self._get("/check", ipAddress=ioc.value, maxAgeInDays=90).get("data", {})
+        score = d.get("abuseConfidenceScore", 0)
+        return OSINTFinding(
+            reputation="malicious" if score >= 75 else "suspicious" if score >= 25 else "unknown",
+            sources=[self.name],
+            last_seen=d.get("lastReportedAt"),
+            tags=[f"abuse-score:{score}"] if score else [],
+        )
+
+class VirusTotalProvider(HTTPProvider):
+    name = "VirusTotal"
+    types = {"ip", "domain", "url", "hash"}
+    base_url = "https://www.virustotal.com/api/v3"
+    _paths = {"ip": "ip_addresses", "domain": "domains", "url": "urls", "hash": "files"}
+
+    def __init__(self, api_key: str, **kw: Any):
+        super().__init__(headers={"x-apikey": api_key}, **kw)
+
+    def _lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        key = ioc.value
+        if ioc.type == "url":
+            key = base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+        attrs = self._get(f"/{self._paths[ioc.type]}/{key}").get("data", {}).get("attributes", {})
+        stats = attrs.get("last_analysis_stats", {})
+        mal, sus = stats.get("malicious", 0), stats.get("suspicious", 0)
+        seen = attrs.get("last_analysis_date")
+        return OSINTFinding(
+            reputation="malicious" if mal >= 3 else "suspicious" if mal or sus else "unknown",
+            sources=[self.name],
+            last_seen=datetime.fromtimestamp(seen, timezone.utc) if seen else None,
+            tags=list(attrs.get("tags", [])),
+        )
+
+class OTXProvider(HTTPProvider):
+    name = "OTX"
+    types = {"ip", "domain", "url", "hash"}
+    base_url = "https://otx.alienvault.com/api/v1"
+    _sections = {"ip": "IPv4", "domain": "domain", "url": "url", "hash": "file"}
+
+    def __init__(self, api_key: str, **kw: Any):
+        super().__init__(headers={"X-OTX-API-KEY": api_key}, **kw)
+
+    def _lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        pulses = self._get(f"/indicators/{self._sections[ioc.type]}/{ioc.value}/general") \
+            .get("pulse_info", {})
+        count = pulses.get("count", 0)
+        tags = sorted({t.lower() for p in pulses.get("pulses", []) for t in p.get("tags", [])})
+        return OSINTFinding(
+            reputation="malicious" if count >= 5 else "suspicious" if count else "unknown",
+            sources=[self.name],
+            tags=tags[:20],
+        )
+
+def providers_from_env() -> list[Provider]:
+    """Remote providers enabled by API keys / URLs in the environment."""
+    timeout = float(os.getenv("OSINT_TIMEOUT", "5"))
+    out: list[Provider] = []
+    if os.getenv("ABUSEIPDB_API_KEY"):
+        out.append(AbuseIPDBProvider(os.environ["ABUSEIPDB_API_KEY"], timeout=timeout,
+                                     rate=float(os.getenv("ABUSEIPDB_RATE", "1"))))
+    if os.getenv("VT_API_KEY"):
+        # public API: 4 requests / minute
+        out.append(VirusTotalProvider(os.environ["VT_API_KEY"], timeout=timeout,
+                                      rate=float(os.getenv("VT_RATE", str(4 / 60))), burst=4))
+    if os.getenv("OTX_API_KEY"):
+        out.append(OTXProvider(os.environ["OTX_API_KEY"], timeout=timeout,
+                               rate=float(os.getenv("OTX_RATE", "10"))))
+    if os.getenv("OSINT_JSON_PROVIDER_URL"):
+        out.append(JSONProvider(os.environ["OSINT_JSON_PROVIDER_URL"], timeout=timeout,
+                                rate=float(os.getenv("OSINT_JSON_PROVIDER_RATE", "0"))))
+    return out
@@ -1,27 +1,58 @@
 # agents/prioritize.py
-from storage.schema import Alert
+from typing import Dict, Tuple
+from storage.records import AlertRec
 
-def score(alert: Alert) -> Alert:
+# Score contributions; severity is the highest cutoff the sum reaches.
+# score() rates one alert in the pipeline, score_columns() whole arrays of them
+# for replay (python -m replay); both read these, so they cannot drift apart.
+WEIGHTS: Dict[str, float] = {
+    "malicious": 0.6,         # detection label
+    "suspicious": 0.35,
+    "osint_malicious": 0.2,   # any IOC with a malicious finding
+    "mitre": 0.2,             # at least one technique mapped
+}
+SEVERITIES = ("low", "medium", "high", "critical")
+CUTOFFS: Tuple[float, float, float] = (0.4, 0.6, 0.8)  # medium, high, critical
+LABELS = ("benign", "suspicious", "malicious")  # label codes for score_columns
+
+def score(alert: AlertRec) -> AlertRec:
+    w = WEIGHTS
     s = 0.0
 
-    # Detection signalgit 
+    # Detection signal
     if alert.detection.label == "malicious":
-        s += 0.6
+        s += w["malicious"]
     elif alert.detection.label == "suspicious":
-        s += 0.35
+        s += w["suspicious"]
 
     # OSINT signal
     if any(f.reputation == "malicious" for f in alert.osint.values()):
-        s += 0.2
+        s += w["osint_malicious"]
 
     # MITRE signal
     if alert.mitre:
-        s += 0.2
+        s += w["mitre"]
 
+    c = CUTOFFS
     alert.severity = (
-        "critical" if s >= 0.8 else
-        "high"     if s >= 0.6 else
-        "medium"   if s >= 0.4 else
+        "critical" if s >= c[2] else
+        "high"     if s >= c[1] else
+        "medium"   if s >= c[0] else
         "low"
     )
     return alert
+
+def score_columns(label, osint_malicious, has_mitre, weights: Dict[str, float] | None = None,
+                  cutoffs: Tuple[float, ...] | None = None):
+    """
+    score() over arrays: label codes (index into LABELS) and two boolean arrays in,
+    severity codes (index into SEVERITIES) out. Sums in score()'s order, so float
+    results on the cutoffs match it exactly. Needs NumPy.
+    """
+    import numpy as np
+    w = {**WEIGHTS, **(weights or {})}
+    label_w = np.array([0.0, w["suspicious"], w["malicious"]])
+    s = label_w[label]
+    s = s + np.where(osint_malicious, w["osint_malicious"], 0.0)
+    s = s + np.where(has_mitre, w["mitre"], 0.0)
+    return np.searchsorted(np.asarray(cutoffs or CUTOFFS, dtype=np.float64), s, side="right").astype(np.int8)
@@ -0,0 +1,320 @@
+# agents/reputation_index.py
+"""
+Threat-intel feed index for local OSINT lookups.
+
+Feeds are plain text files, one indicator per line:
+    indicator[,reputation[,tag1|tag2...]]
+where indicator is an IPv4/IPv6 address or CIDR, a domain, or an MD5/SHA1/SHA256
+hash; reputation defaults to "malicious"; the file name (without extension)
+becomes the finding's source. Lines starting with "#" are ignored.
+
+Every indicator kind ends up in a sorted, fixed-layout array so a lookup is a
+binary search (or a handful, for parent domains) no matter how large the feeds are:
+  * CIDRs/IPs: nested ranges flattened into disjoint [start, end] intervals that
+    carry the most specific (longest-prefix) entry -> one bisect per address.
+  * Domains: sorted 64-bit digests of each listed name; a host is checked
+    label by label against itself and each parent (evil.example.com,
+    example.com, com) - the reversed-label walk of a trie without the pointers.
+  * Hashes: raw digest bytes sorted per digest length, with a uint64 prefix
+    column so the binary search runs over a flat integer array.
+The same arrays are written to one file by save() and memory-mapped by load(),
+so worker processes start without re-parsing feeds.
+"""
+from __future__ import annotations
+import hashlib, ipaddress, json, mmap, os, struct, threading, time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_MAGIC = b"RPIX0001"
+_REPUTATIONS = ("unknown", "suspicious", "malicious")
+_HASH_WIDTHS = (16, 20, 32)  # md5, sha1, sha256
+
+Entry = Tuple[str, str, Tuple[str, ...]]  # (reputation, source, tags)
+
+class _Fixed(Sequence):
+    """Read-only sequence of fixed-width byte keys over a buffer (bisect-compatible)."""
+    __slots__ = ("_mv", "_w")
+
+    def __init__(self, buf, width: int):
+        self._mv, self._w = memoryview(buf), width
+
+    def __len__(self) -> int:
+        return len(self._mv) // self._w
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._mv[i * self._w:(i + 1) * self._w].tobytes()
+
+def _dom_key(name: str) -> int:
+    # 64-bit digest of a normalized domain; collisions are negligible at feed sizes
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+def _flatten(ranges: Dict[Tuple[int, int], int]) -> Tuple[List[int], List[int], List[int]]:
+    """Nested/disjoint ranges -> disjoint intervals labelled with the innermost range's id."""
+    starts: List[int] = []; ends: List[int] = []; ids: List[int] = []
+
+    def emit(s: int, e: int, i: int) -> None:
+        if s <= e:
+            starts.append(s); ends.append(e); ids.append(i)
+
+    stack: List[Tuple[int, int]] = []  # (end, id) of the enclosing ranges
+    pos = 0
+    for (s, e), i in sorted(ranges.items(), key=lambda kv: (kv[0][0], -kv[0][1])):
+        while stack and stack[-1][0] < s:
+            end, sid = stack.pop()
+            emit(pos, end, sid); pos = end + 1
+        if stack:
+            emit(pos, s - 1, stack[-1][1])
+        stack.append((e, i)); pos = s
+    while stack:
+        end, sid = stack.pop()
+        emit(pos, end, sid); pos = end + 1
+    return starts, ends, ids
+
+class FeedIndex:
+    """Immutable lookup structure; build with from_feeds() or load(), query with lookup_*()."""
+
+    def __init__(self, entries: List[Entry], sections: Dict[str, object], source_mmap=None):
+        self.entries = entries
+        self._mm = source_mmap  # keeps a loaded file mapped for the index's lifetime
+        self.v4_start, self.v4_end, self.v4_id = sections["v4_start"], sections["v4_end"], sections["v4_id"]
+        self.v6_start, self.v6_end, self.v6_id = sections["v6_start"], sections["v6_end"], sections["v6_id"]
+        self.dom_key, self.dom_id = sections["dom_key"], sections["dom_id"]
+        self.hashes = {w: (sections[f"h{w}"], sections[f"h{w}_pfx"], sections[f"h{w}_id"])
+                       for w in _HASH_WIDTHS}
+
+    def __len__(self) -> int:
+        return (len(self.v4_id) + len(self.v6_id) + len(self.dom_id)
+                + sum(len(ids) for _, _, ids in self.hashes.values()))
+
+    # ---- build ----
+    @classmethod
+    def from_feeds(cls, paths: Iterable[str]) -> "FeedIndex":
+        entry_ids: Dict[Entry, int] = {}
+        entries: List[Entry] = []
+        v4: Dict[Tuple[int, int], int] = {}
+        v6: Dict[Tuple[int, int], int] = {}
+        doms: Dict[int, int] = {}
+        hashes: Dict[int, Dict[bytes, int]] = {w: {} for w in _HASH_WIDTHS}
+
+        def put(table: dict, key, eid: int) -> None:
+            # the same indicator in several feeds keeps its worst reputation
+            old = table.get(key)
+            if old is None or _REPUTATIONS.index(entries[eid][0]) > _REPUTATIONS.index(entries[old][0]):
+                table[key] = eid
+
+        for path in paths:
+            source = os.path.splitext(os.path.basename(path))[0]
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    parts = [p.strip() for p in line.split(",")]
+                    ind = parts[0]
+                    rep = parts[1].lower() if len(parts) > 1 and parts[1] else "malicious"
+                    if rep not in _REPUTATIONS:
+                        rep = "malicious"
+                    tags = tuple(t for t in parts[2].split("|") if t) if len(parts) > 2 else ()
+                    entry = (rep, source, tags)
+                    eid = entry_ids.get(entry)
+                    if eid is None:
+                        eid = entry_ids[entry] = len(entries)
+                        entries.append(entry)
+                    try:
+                        net = ipaddress.ip_network(ind, strict=False)
+                        table = v4 if net.version == 4 else v6
+                        put(table, (int(net.network_address), int(net.broadcast_address)), eid)
+                        continue
+                    except ValueError:
+                        pass
+                    if len(ind) in (32, 40, 64):
+                        try:
+                            put(hashes[len(ind) // 2], bytes.fromhex(ind), eid)
+                            continue
+                        except ValueError:
+                            pass
+                    put(doms, _dom_key(ind.strip(".").lower()), eid)
+
+        s4, e4, i4 = _flatten(v4)
+        s6, e6, i6 = _flatten(v6)
+        dom_keys = sorted(doms)
+        sections: Dict[str, object] = {
+            "v4_start": array("I", s4), "v4_end": array("I", e4), "v4_id": array("I", i4),
+            "v6_start": _Fixed(b"".join(x.to_bytes(16, "big") for x in s6), 16),
+            "v6_end": _Fixed(b"".join(x.to_bytes(16, "big") for x in e6), 16),
+            "v6_id": array("I", i6),
+            "dom_key": array("Q", dom_keys), "dom_id": array("I", (doms[k] for k in dom_keys)),
+        }
+        for w, table in hashes.items():
+            keys = sorted(table)
+            sections[f"h{w}"] = _Fixed(b"".join(keys), w)
+            sections[f"h{w}_pfx"] = array("Q", (int.from_bytes(k[:8], "big") for k in keys))
+            sections[f"h{w}_id"] = array("I", (table[k] for k in keys))
+        return cls(entries, sections)
+
+    # ---- lookups ----
+    def lookup_ip(self, value: str) -> Optional[Entry]:
+        try:
+            addr = ipaddress.ip_address(value)
+        except ValueError:
+            return None
+        if addr.version == 4:
+            x, starts, ends, ids = int(addr), self.v4_start, self.v4_end, self.v4_id
+        else:
+            x, starts, ends, ids = addr.packed, self.v6_start, self.v6_end, self.v6_id
+        i = bisect_right(starts, x) - 1
+        if i >= 0 and x <= ends[i]:
+            return self.entries[ids[i]]
+        return None
+
+    def lookup_domain(self, host: str) -> Optional[Entry]:
+        """Most specific listed domain among host and its parents."""
+        labels = host.strip(".").lower().split(".")
+        keys, ids = self.dom_key, self.dom_id
+        for j in range(len(labels)):
+            k = _dom_key(".".join(labels[j:]))
+            i = bisect_left(keys, k)
+            if i < len(keys) and keys[i] == k:
+                return self.entries[ids[i]]
+        return None
+
+    def lookup_hash(self, value: str) -> Optional[Entry]:
+        table = self.hashes.get(len(value) // 2) if len(value) % 2 == 0 else None
+        if table is None:
+            return None
+        try:
+            k = bytes.fromhex(value)
+        except ValueError:
+            return None
+        keys, pfx, ids = table
+        p = int.from_bytes(k[:8], "big")
+        i = bisect_left(pfx, p)
+        while i < len(pfx) and pfx[i] == p:
+            if keys[i] == k:
+                return self.entries[ids[i]]
+            i += 1
+        return None
+
+    # ---- (de)serialization ----
+    def _sections(self) -> Dict[str, object]:
+        out: Dict[str, object] = {
+            "v4_start": self.v4_start, "v4_end": self.v4_end, "v4_id": self.v4_id,
+            "v6_start": self.v6_start, "v6_end": self.v6_end, "v6_id": self.v6_id,
+            "dom_key": self.dom_key, "dom_id": self.dom_id,
+        }
+        for w, (keys, pfx, ids) in self.hashes.items():
+            out[f"h{w}"], out[f"h{w}_pfx"], out[f"h{w}_id"] = keys, pfx, ids
+        return out
+
+    def save(self, path: str) -> None:
+        """Write the index to `path` (atomically) in the layout load() maps back."""
+        blobs: List[Tuple[str, bytes, str]] = []  # (name, raw bytes, kind)
+        for name, sec in self._sections().items():
+            if isinstance(sec, _Fixed):
+                blobs.append((name, bytes(sec._mv), f"b{sec._w}"))
+            else:  # array or memoryview of I / Q
+                code = sec.typecode if isinstance(sec, array) else sec.format
+                blobs.append((name, bytes(sec), code))
+
+        layout, off = {}, 0
+        for name, raw, kind in blobs:
+            layout[name] = [off, len(raw), kind]
+            off += (len(raw) + 7) // 8 * 8
+        header = json.dumps({"entries": self.entries, "layout": layout}).encode()
+        base = (len(_MAGIC) + 4 + len(header) + 7) // 8 * 8
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(b"\0" * (base - f.tell()))
+            for name, raw, _ in blobs:
+                f.write(raw)
+                f.write(b"\0" * ((len(raw) + 7) // 8 * 8 - len(raw)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FeedIndex":
+        """Memory-map an index written by save(); nothing is parsed beyond the header."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path}: not a reputation index")
+        (hlen,) = struct.unpack_from("<I", mm, len(_MAGIC))
+        head = json.loads(mm[len(_MAGIC) + 4:len(_MAGIC) + 4 + hlen])
+        base = (len(_MAGIC) + 4 + hlen + 7) // 8 * 8
+        view = memoryview(mm)
+        sections: Dict[str, object] = {}
+        for name, (off, n, kind) in head["layout"].items():
+            mv = view[base + off:base + off + n]
+            sections[name] = _Fixed(mv, int(kind[1:])) if kind.startswith("b") else mv.cast(kind)
+        entries = [(r, s, tuple(t)) for r, s, t in head["entries"]]
+        return cls(entries, sections, source_mmap=mm)
+
+def _feed_files(feeds_dir: str) -> List[str]:
+    if not os.path.isdir(feeds_dir):
+        return []
+    return sorted(os.path.join(feeds_dir, n) for n in os.listdir(feeds_dir)
+                  if n.endswith((".txt", ".csv")) and not n.startswith("."))
+
+class FeedWatcher:
+    """
+    Holds the current FeedIndex for a feeds directory. The index is loaded from
+    index_file when that is newer than every feed, otherwise rebuilt (and saved).
+    With interval > 0 a daemon thread rebuilds on feed changes and swaps the new
+    index in with one assignment, so lookups never wait on a reload.
+    """
+
+    def __init__(self, feeds_dir: str, index_file: str | None = None, interval: float = 0):
+        self.feeds_dir, self.index_file, self.interval = feeds_dir, index_file, interval
+        self._sig = self._signature()
+        self.index = self._load_or_build()
+        self.reloads = 0
+        if interval > 0:
+            threading.Thread(target=self._watch, name="feed-watcher", daemon=True).start()
+
+    def _signature(self) -> Tuple:
+        out = []
+        for p in _feed_files(self.feeds_dir):
+            st = os.stat(p)
+            out.append((p, st.st_mtime_ns, st.st_size))
+        return tuple(out)
+
+    def _load_or_build(self) -> FeedIndex:
+        files = [p for p, _, _ in self._sig]
+        if self.index_file and os.path.exists(self.index_file):
+            newest = max((m for _, m, _ in self._sig), default=0)
+            if os.stat(self.index_file).st_mtime_ns >= newest:
+                try:
+                    return FeedIndex.load(self.index_file)
+                except (ValueError, OSError, KeyError):
+                    pass
+        index = FeedIndex.from_feeds(files)
+        if self.index_file:
+            try:
+                index.save(self.index_file)
+            except OSError:
+                pass
+        return index
+
+    def reload(self) -> bool:
+        """Rebuild if the feeds changed since the last (re)load; True if swapped."""
+        sig = self._signature()
+        if sig == self._sig:
+            return False
+        index = FeedIndex.from_feeds([p for p, _, _ in sig])
+        if self.index_file:
+            try:
+                index.save(self.index_file)
+            except OSError:
+                pass
+        self._sig, self.index = sig, index
+        self.reloads += 1
+        return True
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reload()
+            except Exception:
+                pass
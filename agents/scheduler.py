@@ -0,0 +1,106 @@
+# agents/scheduler.py
+from __future__ import annotations
+import asyncio, heapq, itertools, time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Tuple, TypeVar
+
+from metrics import QUEUE_WAIT, SHED
+
+T = TypeVar("T")
+
+class AdmissionQueue:
+    """
+    At most max_inflight calls run at once; the rest wait in a priority queue,
+    highest score first (FIFO within a score). Once max_queue are waiting, the
+    lowest-scored of the waiters and the newcomer is shed - answered by its
+    shed() fallback right away - unless its class is not in shed_classes, in
+    which case it queues past the limit. Scores fall into classes by bands:
+    low < bands[0] <= normal < bands[1] <= high.
+
+    Used from one event loop at a time (the API's, or a pool worker's).
+    """
+
+    def __init__(self, max_inflight: int, max_queue: int, bands: Tuple[float, float] = (0.3, 0.75),
+                 shed_classes: FrozenSet[str] = frozenset({"low", "normal"})):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.bands = bands
+        self.shed_classes = shed_classes
+        self.inflight = 0
+        self._heap: List[list] = []  # [-score, seq, enqueued_at, class, future]
+        self._seq = itertools.count()
+        self.admitted: Counter = Counter()
+        self.shed: Counter = Counter()
+
+    def klass(self, score: float) -> str:
+        return "high" if score >= self.bands[1] else "normal" if score >= self.bands[0] else "low"
+
+    async def run(self, score: float, work: Callable[[], Awaitable[T]], shed: Callable[[], T]) -> T:
+        klass = self.klass(score)
+        if self.inflight < self.max_inflight and not self._heap:
+            self.inflight += 1
+            QUEUE_WAIT.observe(0.0, klass)
+        else:
+            entry = [-score, next(self._seq), time.perf_counter(), klass, None]
+            if len(self._heap) >= self.max_queue and not self._make_room(entry):
+                self._count_shed(klass)
+                return shed()
+            fut = entry[4] = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._heap, entry)
+            try:
+                admitted = await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled() and fut.result():
+                    self._release()  # handed a slot just as we were cancelled: pass it on
+                else:
+                    self._drop(entry)
+                raise
+            if not admitted:  # pushed out by a higher-priority event
+                return shed()
+        self.admitted[klass] += 1
+        try:
+            return await work()
+        finally:
+            self._release()
+
+    def _make_room(self, entry: list) -> bool:
+        """Queue full: shed the worst sheddable waiter for entry; False if entry itself goes."""
+        # a cancelled waiter stays in the heap until its task resumes and drops it:
+        # its place is already free, and it can't be handed a result
+        live = [e for e in self._heap if not e[4].done()]
+        if len(live) < self.max_queue:
+            return True
+        worst = max((e for e in live if e[3] in self.shed_classes), default=None)
+        if worst is None or worst[:2] < entry[:2]:  # nothing ranks below the newcomer
+            return entry[3] not in self.shed_classes
+        self._drop(worst)
+        self._count_shed(worst[3])
+        worst[4].set_result(False)
+        return True
+
+    def _drop(self, entry: list) -> None:
+        try:
+            self._heap.remove(entry)
+            heapq.heapify(self._heap)
+        except ValueError:
+            pass
+
+    def _count_shed(self, klass: str) -> None:
+        self.shed[klass] += 1
+        SHED.inc(klass)
+
+    def _release(self) -> None:
+        # hand the slot straight to the best waiter, so inflight never dips and refills
+        now = time.perf_counter()
+        while self._heap:
+            _, _, t0, klass, fut = heapq.heappop(self._heap)
+            if not fut.done():
+                QUEUE_WAIT.observe(now - t0, klass)
+                fut.set_result(True)
+                return
+        self.inflight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        queued = Counter(e[3] for e in self._heap)
+        return {"inflight": self.inflight, "max_inflight": self.max_inflight, "max_queue": self.max_queue,
+                "queued": dict(queued), "admitted": dict(self.admitted), "shed": dict(self.shed)}
@@ -0,0 +1,214 @@
+# agents/window_stats.py
+from __future__ import annotations
+import hashlib, os, threading, time
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Sliding windows are a ring of `buckets` sub-windows of window/buckets seconds each.
+# A slot is zeroed when the ring comes back round to it, so memory never grows and
+# an update touches one slot only; reads merge the live slots.
+
+def _hash128(s: str) -> Tuple[int, int]:
+    d = hashlib.blake2b(s.encode(), digest_size=16).digest()
+    return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+
+class _Ring:
+    def __init__(self, window: float, buckets: int, size: int, typecode: str,
+                 clock: Callable[[], float]):
+        self.span = window / buckets
+        self.buckets = buckets
+        self.clock = clock
+        self._zero = array(typecode, bytes(size * array(typecode).itemsize))
+        self.slots = [array(typecode, self._zero) for _ in range(buckets)]
+        self.epochs = [-1] * buckets
+        self._lock = threading.Lock()
+
+    def _epoch(self) -> int:
+        return int(self.clock() // self.span)
+
+    def current(self) -> array:
+        """Slot for now, cleared first if it still holds an expired sub-window. Call with _lock held."""
+        e = self._epoch()
+        i = e % self.buckets
+        if self.epochs[i] != e:
+            self.slots[i][:] = self._zero
+            self.epochs[i] = e
+        return self.slots[i]
+
+    def live(self) -> List[array]:
+        e = self._epoch()
+        return [s for s, se in zip(self.slots, self.epochs) if e - self.buckets < se <= e]
+
+class WindowedCountMin:
+    """
+    Count-min sketch over a sliding window: add(key, n) and count(key) cost
+    depth hash probes, whatever the number of keys. count() never undercounts.
+    With conservative update, a million distinct keys in one sub-window at the
+    default width overcount a key by about 6.
+    """
+
+    def __init__(self, window: float = 300.0, buckets: int = 5, width: int = 1 << 16,
+                 depth: int = 4, typecode: str = "Q", clock: Callable[[], float] = time.time):
+        self.width, self.depth = width, depth
+        self.ring = _Ring(window, buckets, width * depth, typecode, clock)
+
+    def _cells(self, key: str) -> List[int]:
+        h1, h2 = _hash128(key)
+        w = self.width
+        return [r * w + (h1 + r * h2) % w for r in range(self.depth)]
+
+    def add(self, key: str, n: int = 1) -> None:
+        cells = self._cells(key)
+        with self.ring._lock:
+            slot = self.ring.current()
+            # conservative update: raise only the cells that would otherwise fall
+            # below the new estimate, which keeps collisions from piling up
+            target = min(slot[c] for c in cells) + n
+            for c in cells:
+                if slot[c] < target:
+                    slot[c] = target
+
+    def count(self, key: str) -> int:
+        cells = self._cells(key)
+        with self.ring._lock:
+            live = self.ring.live()
+            return min(sum(s[c] for s in live) for c in cells) if live else 0
+
+    def memory_bytes(self) -> int:
+        return sum(s.itemsize * len(s) for s in self.ring.slots)
+
+class WindowedDistinct:
+    """
+    Distinct items per key over a sliding window. A Bloom filter per sub-window
+    remembers (key, item) pairs; a pair found in none of the live ones is new
+    and bumps the key's count in a WindowedCountMin. When the sub-window that
+    counted a pair expires, its next occurrence counts it again. Bloom false
+    positives err low, count-min collisions err high; both stay small at the
+    default sizes with a million pairs per sub-window.
+    """
+
+    def __init__(self, window: float = 300.0, buckets: int = 5, bits: int = 1 << 23,
+                 hashes: int = 3, width: int = 1 << 16, clock: Callable[[], float] = time.time):
+        self.bits, self.hashes = bits, hashes
+        self.seen = _Ring(window, buckets, bits // 8, "B", clock)
+        self.counts = WindowedCountMin(window, buckets, width, typecode="I", clock=clock)
+
+    def add(self, key: str, item: str) -> None:
+        h1, h2 = _hash128(f"{key}\x1f{item}")
+        probes = [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+        with self.seen._lock:
+            for bloom in self.seen.live():
+                if all(bloom[p >> 3] & (1 << (p & 7)) for p in probes):
+                    return
+            cur = self.seen.current()
+            for p in probes:
+                cur[p >> 3] |= 1 << (p & 7)
+        self.counts.add(key)
+
+    def distinct(self, key: str) -> int:
+        return self.counts.count(key)
+
+    def memory_bytes(self) -> int:
+        return sum(len(s) for s in self.seen.slots) + self.counts.memory_bytes()
+
+# ---- per-event signals ----
+
+_SRC_KEYS = ("src_ip", "source_ip", "src", "client_ip", "remote_ip")
+_USER_KEYS = ("user", "username", "user_name", "account", "target_user", "login")
+# directional only: a bare "bytes" may be inbound, or a response size
+_BYTES_KEYS = ("bytes_out", "bytes_sent", "out_bytes", "sent_bytes")
+_FAIL_WORDS = ("failed login", "login failed", "failed password", "authentication failure",
+               "authentication failed", "invalid password", "logon failure", "bad password")
+_FAIL_OUTCOMES = {"failure", "failed", "fail", "denied"}
+_ACTION_KEYS = ("action", "event", "event_type", "category", "type")
+_AUTH_WORDS = ("auth", "logon", "login", "log-in", "signin", "sign-in")
+
+def _first(event: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for k in keys:
+        v = event.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+def _is_auth(event: Dict[str, Any]) -> bool:
+    if _first(event, _USER_KEYS) is not None:
+        return True
+    action = " ".join(str(event.get(k) or "") for k in _ACTION_KEYS).lower()
+    return any(w in action for w in _AUTH_WORDS)
+
+def _is_failed_login(event: Dict[str, Any], event_json: str) -> bool:
+    # a failed outcome counts only on authentication events: a denied firewall
+    # connection or a failed upload is not a login attempt
+    outcome = str(event.get("outcome") or event.get("status") or "").lower()
+    if outcome in _FAIL_OUTCOMES and _is_auth(event):
+        return True
+    text = event_json.lower()
+    return any(w in text for w in _FAIL_WORDS)
+
+class WindowStats:
+    """
+    Cross-event counters keyed by source IP over one sliding window:
+      failed_logins   failed logins from src_ip
+      distinct_users  distinct users among those failed logins (password spraying)
+      bytes_out       outbound bytes from src_ip (exfiltration volume)
+    observe() updates them and returns the event's current values in constant time.
+    """
+
+    def __init__(self, window: float = 300.0, buckets: int = 5, width: int = 1 << 16,
+                 bloom_bits: int = 1 << 23, clock: Callable[[], float] = time.time):
+        self.window = window
+        self.failures = WindowedCountMin(window, buckets, width, typecode="I", clock=clock)
+        self.bytes_out = WindowedCountMin(window, buckets, width, clock=clock)
+        self.users = WindowedDistinct(window, buckets, bloom_bits, width=width, clock=clock)
+        self.observed = 0
+
+    def observe(self, event: Dict[str, Any], event_json: str) -> Dict[str, int]:
+        src = _first(event, _SRC_KEYS)
+        if src is None:
+            return {}
+        src = str(src)
+        self.observed += 1
+        if _is_failed_login(event, event_json):
+            self.failures.add(src)
+            user = _first(event, _USER_KEYS)
+            if user is not None:
+                self.users.add(src, str(user).lower())
+        sent = _first(event, _BYTES_KEYS)
+        if isinstance(sent, (int, float)) and sent > 0:
+            self.bytes_out.add(src, int(sent))
+        return self.signals(src)
+
+    def signals(self, src_ip: str) -> Dict[str, int]:
+        return {
+            "failed_logins": self.failures.count(src_ip),
+            "distinct_users": self.users.distinct(src_ip),
+            "bytes_out": self.bytes_out.count(src_ip),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_s": self.window,
+            "observed": self.observed,
+            "memory_bytes": (self.failures.memory_bytes() + self.bytes_out.memory_bytes()
+                             + self.users.memory_bytes()),
+        }
+
+# Detection thresholds: a signal above its threshold escalates the verdict (see
+# detect.apply_window_signals) and fires MITRE window rules that name the signal
+# without a number of their own (see agents/mitre.py).
+THRESHOLDS: Dict[str, int] = {
+    "failed_logins": int(os.getenv("WINDOW_FAILED_LOGINS", "10")),
+    "distinct_users": int(os.getenv("WINDOW_DISTINCT_USERS", "5")),
+    "bytes_out": int(os.getenv("WINDOW_BYTES_OUT", str(100 * 1024 * 1024))),
+}
+
+def stats_from_env() -> WindowStats | None:
+    """WINDOW_SECONDS (default 300; 0 disables) and WINDOW_BUCKETS set the window."""
+    window = float(os.getenv("WINDOW_SECONDS", "300"))
+    if window <= 0:
+        return None
+    return WindowStats(window, buckets=int(os.getenv("WINDOW_BUCKETS", "5")),
+                       width=int(os.getenv("WINDOW_CMS_WIDTH", str(1 << 16))),
+                       bloom_bits=int(os.getenv("WINDOW_BLOOM_BITS", str(1 << 23))))
+
+WINDOW_STATS: Optional[WindowStats] = stats_from_env()
@@ -1,22 +1,32 @@
 # app_gradio.py
 # Run: uv run app_gradio.py   (or)   python app_gradio.py
+# The live view reads GET /live from the API at LIVE_API_URL (e.g. http://localhost:8000),
+# so it shows real /ingest traffic; unset, it shows the alerts run from this form.
 
-import json
-from collections import deque
+import json, os
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timezone
 
 import gradio as gr
 import pandas as pd
+import requests
 
-from graph import build_graph, PipelineState  # your existing code
+from graph import build_graph  # your existing code
+from live import LIVE, LiveStats
 
 # ---------- build pipeline once ----------
 graph = build_graph()
-alerts_db: deque[Dict[str, Any]] = deque(maxlen=200)  # rolling history
+local_live = LIVE if LIVE is not None else LiveStats()
+LIVE_API_URL = os.getenv("LIVE_API_URL", "").rstrip("/")
+LIVE_REFRESH = float(os.getenv("LIVE_REFRESH_SECONDS", "2"))
+LIVE_TOP = int(os.getenv("LIVE_TOP", "10"))
+LIVE_ROWS = int(os.getenv("LIVE_ROWS", "20"))
+_http = requests.Session()
 
 
 def _to_dict(obj: Any) -> Dict[str, Any]:
+    if hasattr(obj, "to_dict"):     # internal records (storage/records.py)
+        return obj.to_dict()
     if hasattr(obj, "model_dump"):  # Pydantic v2
         return obj.model_dump()
     if hasattr(obj, "dict"):        # Pydantic v1
@@ -99,19 +109,52 @@ def _mk_osint_df(a: Dict[str, Any]) -> pd.DataFrame:
     return pd.DataFrame(rows) if rows else pd.DataFrame(columns=["indicator", "reputation", "sources", "last_seen", "tags"])
 
 
-def _mk_recent_df() -> pd.DataFrame:
-    rows = []
-    for a in list(alerts_db)[:10]:
-        rows.append(
-            {
-                "time": a.get("ts", ""),
-                "severity": a.get("severity", ""),
-                "label": (a.get("detection") or {}).get("label", ""),
-                "event": (a.get("raw") or {}).get("event", ""),
-                "source_ip": (a.get("raw") or {}).get("src_ip", ""),
-            }
-        )
-    return pd.DataFrame(rows) if rows else pd.DataFrame(columns=["time", "severity", "label", "event", "source_ip"])
+def _snapshot() -> Dict[str, Any]:
+    if LIVE_API_URL:
+        r = _http.get(f"{LIVE_API_URL}/live", params={"top": LIVE_TOP, "recent": LIVE_ROWS}, timeout=5)
+        r.raise_for_status()
+        return r.json()
+    return local_live.snapshot(top=LIVE_TOP, recent=LIVE_ROWS)
+
+
+# Every builder below reads one snapshot: fixed-size lists, so rendering costs
+# the same at ten alerts or ten million.
+def _mk_live_md(snap: Dict[str, Any]) -> str:
+    colors = {"low": "#9ca3af", "medium": "#f59e0b", "high": "#f97316", "critical": "#ef4444"}
+    badges = "".join(
+        f'<span style="background:{c}22;color:{c};padding:4px 10px;border-radius:999px;'
+        f'font-weight:600;margin-right:8px">{sev.upper()}: {snap["severity"].get(sev, 0)}</span>'
+        for sev, c in colors.items()
+    )
+    return (f'<div style="margin-bottom:8px"><b>{snap["total"]}</b> alerts in the last '
+            f'{snap["window_minutes"]} min &nbsp;·&nbsp; {snap["seen"]} since start</div>{badges}')
+
+
+def _mk_techniques_df(snap: Dict[str, Any]) -> pd.DataFrame:
+    return pd.DataFrame(snap["top_techniques"], columns=["technique_id", "technique", "alerts"])
+
+
+def _mk_sources_df(snap: Dict[str, Any]) -> pd.DataFrame:
+    return pd.DataFrame(snap["top_sources"], columns=["source_ip", "alerts"])
+
+
+def _mk_rate_df(snap: Dict[str, Any]) -> pd.DataFrame:
+    return pd.DataFrame(snap["per_minute"], columns=["minute", "alerts"])
+
+
+def _mk_recent_df(snap: Dict[str, Any]) -> pd.DataFrame:
+    cols = ["time", "severity", "label", "event", "source_ip", "techniques"]
+    return pd.DataFrame(snap["recent"], columns=cols)
+
+
+def refresh_live():
+    """gr.Timer callback."""
+    try:
+        snap = _snapshot()
+    except Exception as e:
+        md = f"❌ <b>Live view unavailable:</b> {e}"
+        return md, gr.skip(), gr.skip(), gr.skip(), gr.skip()
+    return _mk_live_md(snap), _mk_techniques_df(snap), _mk_sources_df(snap), _mk_rate_df(snap), _mk_recent_df(snap)
 
 
 def build_event_payload(
@@ -169,11 +212,11 @@ def run_pipeline_from_fields(
     if not event_text.strip():
         md = "❌ <b>Please enter an Event description.</b>"
         empty = pd.DataFrame()
-        return md, empty, empty, empty, empty
+        return md, empty, empty, empty
     if not src_ip.strip():
         md = "❌ <b>Please enter a Source IP (src_ip).</b>"
         empty = pd.DataFrame()
-        return md, empty, empty, empty, empty
+        return md, empty, empty, empty
 
     data = build_event_payload(
         src_ip=src_ip,
@@ -187,28 +230,27 @@ def run_pipeline_from_fields(
     )
 
     try:
-        state_in = PipelineState(event=data["event"], alert=None).model_dump()
-        out = graph.invoke(state_in)
+        out = graph.invoke({"event": data["event"]})
         alert = out.get("alert") if isinstance(out, dict) else None
         if alert is None:
             md = "❌ <b>Pipeline returned no <code>alert</code>.</b>"
             empty = pd.DataFrame()
-            return md, empty, empty, empty, empty
+            return md, empty, empty, empty
 
+        if not LIVE_API_URL:  # otherwise the API only counts its own /ingest traffic
+            local_live.add(alert)
         a = _to_dict(alert)
-        alerts_db.appendleft(a)
 
         md = _mk_summary_md(a)
         iocs_df = _mk_iocs_df(a)
         mitre_df = _mk_mitre_df(a)
         osint_df = _mk_osint_df(a)
-        recent_df = _mk_recent_df()
-        return md, iocs_df, mitre_df, osint_df, recent_df
+        return md, iocs_df, mitre_df, osint_df
 
     except Exception as e:
         md = f"❌ <b>Error running pipeline:</b> {e}"
         empty = pd.DataFrame()
-        return md, empty, empty, empty, empty
+        return md, empty, empty, empty
 
 
 # ---------- UI ----------
@@ -239,14 +281,28 @@ with gr.Blocks(title="MITRE Attack Orchestrator Demo") as demo:
             mitre_df = gr.Dataframe(interactive=False, wrap=True, row_count=(0, "dynamic"))
             gr.Markdown("### OSINT Enrichment")
             osint_df = gr.Dataframe(interactive=False, wrap=True, row_count=(0, "dynamic"))
-            gr.Markdown("### Recent Alerts")
-            recent_df = gr.Dataframe(interactive=False, wrap=True, row_count=(0, "dynamic"))
+
+    gr.Markdown("## Live SOC View")
+    live_md = gr.Markdown()
+    with gr.Row():
+        with gr.Column():
+            gr.Markdown("### Top Techniques")
+            techniques_df = gr.Dataframe(interactive=False, row_count=(0, "dynamic"))
+        with gr.Column():
+            gr.Markdown("### Top Source IPs")
+            sources_df = gr.Dataframe(interactive=False, row_count=(0, "dynamic"))
+    rate_plot = gr.BarPlot(x="minute", y="alerts", title="Alerts per minute", height=220)
+    gr.Markdown("### Recent Alerts")
+    recent_df = gr.Dataframe(interactive=False, wrap=True, row_count=(0, "dynamic"))
 
     btn_run.click(
         run_pipeline_from_fields,
         inputs=[src_ip, user, event_text, file_path, destination_ip, url, email, ts_iso],
-        outputs=[summary_md, iocs_df, mitre_df, osint_df, recent_df],
+        outputs=[summary_md, iocs_df, mitre_df, osint_df],
     )
+    live_outputs = [live_md, techniques_df, sources_df, rate_plot, recent_df]
+    demo.load(refresh_live, outputs=live_outputs)
+    gr.Timer(LIVE_REFRESH).tick(refresh_live, outputs=live_outputs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+# bench/__init__.py
+# Offline benchmarks. Run from the repo root, e.g.:
+#   python -m bench.bench_ioc_extract
+#   python -m bench.bench_pipeline --out bench_results.json [--compare old.json]
+# events.py generates seeded synthetic events; fake_llm.py stands in for the chat model.
@@ -0,0 +1,79 @@
+# bench/bench_alert_store.py
+# Bulk-load synthetic alerts into the SQLite store, then time the pivot queries behind GET /alerts.
+#   python -m bench.bench_alert_store [--alerts 1000000] [--db /tmp/alerts_bench.db]
+import argparse, json, os, random, time
+from datetime import datetime, timedelta, timezone
+
+from storage.sqlite_store import AlertStore
+
+_SEV = ("low", "medium", "high", "critical")
+_TECH = ("T1110", "T1110.003", "T1566", "T1059", "T1078", "T1021", "T1041", "T1071")
+
+def make_docs(n: int, seed: int = 21, days: int = 30):
+    """n serialized alerts spread over `days`, drawing IOCs from a skewed pool."""
+    rnd = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    step = days * 86400 / n
+    ips = [f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}" for _ in range(50_000)]
+    doms = [f"host{i}.example.net" for i in range(20_000)]
+    for i in range(n):
+        iocs = [{"type": "ip", "value": ips[int(rnd.paretovariate(1.2)) % len(ips)]}]
+        if rnd.random() < 0.4:
+            iocs.append({"type": "domain", "value": rnd.choice(doms)})
+        if rnd.random() < 0.002:
+            iocs.append({"type": "ip", "value": "203.0.113.45"})
+        yield json.dumps({
+            "event_id": f"bench-{i}",
+            "ts": (start + timedelta(seconds=i * step)).isoformat(),
+            "raw": {"event": "failed login" if rnd.random() < 0.5 else "process start", "n": i},
+            "detection": {"label": "suspicious", "reason": "bench", "confidence": 0.6},
+            "iocs": iocs,
+            "mitre": [{"tactic": "x", "technique_id": t, "technique": t}
+                      for t in rnd.sample(_TECH, rnd.randint(0, 2))],
+            "severity": rnd.choice(_SEV),
+        })
+
+def timed(label: str, fn, reps: int = 20):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        out = fn()
+    print(f"{label:<48} {(time.perf_counter() - t0) / reps * 1e3:8.2f} ms  ({len(out[0])} rows)")
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--alerts", type=int, default=1_000_000)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--db", default="/tmp/alerts_bench.db")
+    args = ap.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    store = AlertStore(args.db)
+    t0 = time.perf_counter()
+    batch = []
+    for d in make_docs(args.alerts):
+        batch.append(d)
+        if len(batch) == args.batch:
+            store.write(batch)
+            batch = []
+    if batch:
+        store.write(batch)
+    dt = time.perf_counter() - t0
+    print(f"insert {args.alerts} alerts in batches of {args.batch}: {dt:.1f} s ({args.alerts / dt:,.0f}/s)")
+
+    day_ago = datetime.now(timezone.utc) - timedelta(days=1)
+    timed("latest page", lambda: store.query(limit=100))
+    timed("indicator 203.0.113.45, last day", lambda: store.query(indicator="203.0.113.45", since=day_ago))
+    timed("indicator 203.0.113.45, all time", lambda: store.query(indicator="203.0.113.45"))
+    timed("technique T1110.003, last day", lambda: store.query(technique="T1110.003", since=day_ago))
+    timed("severity critical + T1566", lambda: store.query(severity="critical", technique="T1566"))
+    page, cur = store.query(severity="high", limit=100)
+    for _ in range(50):
+        page, cur = store.query(severity="high", limit=100, cursor=cur)
+    timed("severity high, page 51 via cursor", lambda: store.query(severity="high", limit=100, cursor=cur))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench/bench_compact.py
+# Prompt compaction (agents/compact.py): tokens per event before and after, the CPU
+# it costs, whether verdicts change, and detect latency against a fake model whose
+# latency grows with prompt tokens.
+#   python -m bench.bench_compact [--events 400] [--llm-latency-ms 150] [--ms-per-1k-tokens 200]
+import os
+
+os.environ.setdefault("DETECT_CACHE_SIZE", "0")  # every event reaches the (fake) model
+for _k in ("GROQ_API_KEY", "OPENAI_API_KEY", "DETECT_CACHE_DB"):
+    os.environ.pop(_k, None)
+
+import argparse, asyncio, json, statistics, time
+from typing import Any, Dict, List
+
+from agents import compact, detect
+from bench.events import DEFAULT_MIX, make_events
+from bench.fake_llm import FakeChatModel, install, verdict
+from bench.bench_pipeline import percentiles
+
+MIXES = {"default": DEFAULT_MIX, "verbose_edr": {"verbose_edr": 1.0},
+         "mixed": {**DEFAULT_MIX, "verbose_edr": 0.3}}
+
+def tokens(payloads: List[str]) -> Dict[str, Any]:
+    before, after, us, same = [], [], [], 0
+    for p in payloads:
+        t0 = time.perf_counter()
+        out, b, a = compact.compact(p)
+        us.append((time.perf_counter() - t0) * 1e6)
+        before.append(b)
+        after.append(a)
+        same += verdict(out)["label"] == verdict(p)["label"]
+    return {"tokens_before_mean": round(statistics.mean(before)), "tokens_before_max": max(before),
+            "tokens_after_mean": round(statistics.mean(after)), "tokens_after_max": max(after),
+            "reduction": round(1 - sum(after) / sum(before), 3),
+            "compact_us_p50": round(statistics.median(us), 1), "compact_us_max": round(max(us), 1),
+            "verdict_agreement": round(same / len(payloads), 4)}
+
+def latency(payloads: List[str], model: FakeChatModel, concurrency: int) -> Dict[str, float]:
+    async def go():
+        sem = asyncio.Semaphore(concurrency)
+        lat: List[float] = []
+
+        async def one(p):
+            async with sem:
+                t = time.perf_counter()
+                await detect.adetect(p)
+                lat.append(time.perf_counter() - t)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in payloads))
+        return lat, time.perf_counter() - t0
+    model.prompt_tokens = 0
+    lat, wall = asyncio.run(go())
+    p = percentiles(lat)
+    return {"p50_ms": p["p50_ms"], "p95_ms": p["p95_ms"], "prompt_tokens": model.prompt_tokens,
+            "throughput_eps": round(len(payloads) / wall, 1)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=400)
+    ap.add_argument("--budget", type=int, default=compact.BUDGET)
+    ap.add_argument("--llm-latency-ms", type=float, default=150.0, help="fixed cost per call")
+    ap.add_argument("--ms-per-1k-tokens", type=float, default=200.0, help="prefill cost per 1k prompt tokens")
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    compact.BUDGET = args.budget
+    model = install(FakeChatModel(args.llm_latency_ms, ms_per_1k_tokens=args.ms_per_1k_tokens))
+    detect.TIERED = False
+
+    for name, mix in MIXES.items():
+        payloads = [json.dumps(e) for e in make_events(args.events, args.seed, mix)]
+        row: Dict[str, Any] = {"mix": name, **tokens(payloads)}
+        for label, budget in (("off", 0), ("on", args.budget)):
+            compact.BUDGET = budget
+            row[f"detect_{label}"] = latency(payloads, model, args.concurrency)
+        compact.BUDGET = args.budget
+        print(json.dumps(row))
+
+if __name__ == "__main__":
+    main()
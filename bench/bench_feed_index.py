@@ -0,0 +1,84 @@
+# bench/bench_feed_index.py
+# Feed index lookups (agents/reputation_index.py) at feed sizes three orders of
+# magnitude apart: per-lookup cost should barely move. Also build, save and
+# mmap-load times for each size.
+#   python -m bench.bench_feed_index [--sizes 1000,1000000] [--lookups 100000]
+import argparse, json, os, random, tempfile, time
+from typing import List, Tuple
+
+from agents.reputation_index import FeedIndex
+
+def write_feed(path: str, n: int, seed: int = 5) -> None:
+    """n indicators: nested IPv4 CIDRs and addresses, IPv6 ranges, domains, md5/sha256."""
+    rnd = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(n):
+            kind = i % 5
+            if kind == 0:
+                a = rnd.getrandbits(32)
+                f.write(f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}/{rnd.choice((16, 20, 24, 28, 32))},"
+                        f"{rnd.choice(('malicious', 'suspicious'))}\n")
+            elif kind == 1:
+                f.write(f"2001:db8:{rnd.getrandbits(16):x}:{rnd.getrandbits(16):x}::/64,suspicious\n")
+            elif kind == 2:
+                f.write(f"d{rnd.getrandbits(40):x}.{rnd.choice(('com', 'net', 'xyz', 'top'))},malicious,phishing\n")
+            else:
+                f.write(f"{rnd.getrandbits(128 if kind == 3 else 256):0{32 if kind == 3 else 64}x},malicious\n")
+
+def queries(n: int, seed: int = 6) -> List[Tuple[str, str]]:
+    """Mostly misses, as in real traffic, across every lookup kind."""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            a = rnd.getrandbits(32)
+            out.append(("ip", f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}"))
+        elif kind == 1:
+            out.append(("ip", f"2001:db8:{rnd.getrandbits(16):x}:{rnd.getrandbits(16):x}::1"))
+        elif kind == 2:
+            out.append(("domain", f"www.cdn.d{rnd.getrandbits(40):x}.com"))
+        else:
+            out.append(("hash", f"{rnd.getrandbits(256):064x}"))
+    return out
+
+def run(idx: FeedIndex, qs: List[Tuple[str, str]], repeat: int = 3) -> Tuple[float, int]:
+    fns = {"ip": idx.lookup_ip, "domain": idx.lookup_domain, "hash": idx.lookup_hash}
+    calls = [(fns[t], v) for t, v in qs]
+    best, hits = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        hits = sum(fn(v) is not None for fn, v in calls)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(qs), hits
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,1000000", help="indicators per feed, comma-separated")
+    ap.add_argument("--lookups", type=int, default=100_000)
+    args = ap.parse_args()
+
+    qs = queries(args.lookups)
+    tmp = tempfile.mkdtemp()
+    for n in (int(x) for x in args.sizes.split(",")):
+        feed, path = os.path.join(tmp, f"feed{n}.txt"), os.path.join(tmp, f"feed{n}.idx")
+        write_feed(feed, n)
+        t0 = time.perf_counter()
+        built = FeedIndex.from_feeds([feed])
+        t_build = time.perf_counter() - t0
+        built.save(path)
+        t0 = time.perf_counter()
+        loaded = FeedIndex.load(path)
+        t_load = time.perf_counter() - t0
+        per_built, hits = run(built, qs)
+        per_mmap, hits_mmap = run(loaded, qs)
+        assert hits == hits_mmap
+        print(json.dumps({
+            "indicators": n, "index_mb": round(os.path.getsize(path) / 2 ** 20, 1),
+            "build_s": round(t_build, 2), "mmap_load_ms": round(t_load * 1e3, 2),
+            "lookup_us": round(per_built * 1e6, 2), "lookup_us_mmap": round(per_mmap * 1e6, 2),
+            "hits": hits, "lookups": len(qs),
+        }))
+
+if __name__ == "__main__":
+    main()
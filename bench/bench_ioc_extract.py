@@ -0,0 +1,94 @@
+# bench/bench_ioc_extract.py
+# Compare the fused single-pass extractor with the previous five-sweep version.
+#   python -m bench.bench_ioc_extract [--events 2000] [--repeat 5]
+import argparse, json, random, time
+from typing import List
+
+from agents.ioc_extract import extract_iocs, URL_RE, IP_RE, HASH_RE, MAIL_RE, DOM_RE, _clean
+from storage.schema import IOC
+
+def legacy_extract_iocs(text: str) -> List[IOC]:
+    """The pre-fusion extractor: five full sweeps, one IOC per raw match, dedup last."""
+    found: List[IOC] = []
+    for m in URL_RE.finditer(text):
+        u = _clean(m.group(0))
+        if u: found.append(IOC(type="url", value=u))
+    for m in IP_RE.finditer(text):
+        found.append(IOC(type="ip", value=_clean(m.group(0))))
+    for m in HASH_RE.finditer(text):
+        found.append(IOC(type="hash", value=_clean(m.group(0))))
+    for m in MAIL_RE.finditer(text):
+        found.append(IOC(type="email", value=_clean(m.group(0))))
+    for m in DOM_RE.finditer(text):
+        dom = _clean(m.group(0))
+        if dom:
+            found.append(IOC(type="domain", value=dom))
+    seen, out = set(), []
+    for i in found:
+        k = (i.type, i.value.lower())
+        if k not in seen:
+            seen.add(k); out.append(i)
+    return out
+
+def make_events(n: int, seed: int = 7) -> List[str]:
+    """Serialized events shaped like auth, proxy, mail and EDR logs."""
+    rnd = random.Random(seed)
+    ip = lambda: f"{rnd.choice(['203.0.113', '198.51.100', '10.0', '192.168.1'])}.{rnd.randint(1, 254)}"
+    dom = lambda: rnd.choice(["example.com", "login-portal.example.org", "cdn.evil-updates.net", "corp.local.example.com"])
+    hx = lambda k: "".join(rnd.choice("0123456789abcdef") for _ in range(k))
+    out = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            evt = {"event": "multiple failed logins", "src_ip": ip(), "user": f"user{rnd.randint(1, 500)}",
+                   "ts": "2025-08-14T10:45:00Z", "attempts": rnd.randint(3, 50)}
+        elif kind == 1:
+            evt = {"event": "proxy request", "src_ip": ip(), "destination_ip": ip(),
+                   "url": f"https://{dom()}/path/{hx(8)}?id={rnd.randint(1, 9999)}&ref=https://{dom()}/r",
+                   "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+        elif kind == 2:
+            evt = {"event": "phishing email reported", "from": f"billing@{dom()}", "to": f"alice@{dom()}",
+                   "subject": "Invoice overdue", "attachment_md5": hx(32),
+                   "body": "Please review the attached invoice at " + f"http://{dom()}/inv/{hx(12)}. " * 3}
+        else:
+            evt = {"event": "process created", "host": f"ws-{rnd.randint(1, 300)}.corp.example.com",
+                   "cmdline": "powershell.exe -nop -w hidden -enc " + hx(rnd.randint(200, 1200)),
+                   "sha256": hx(64), "parent": "winword.exe", "dst": ip()}
+        out.append(json.dumps(evt))
+    return out
+
+def differences(payloads: List[str]) -> List[tuple]:
+    """(payload, only legacy, only fused) wherever the two extract different IOC sets."""
+    out = []
+    for p in payloads:
+        old = {(i.type, i.value.lower()) for i in legacy_extract_iocs(p)}
+        new = {(i.type, i.value.lower()) for i in extract_iocs(p)}
+        if old != new:
+            out.append((p, old - new, new - old))
+    return out
+
+def _time(fn, payloads: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for p in payloads:
+            fn(p)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    payloads = make_events(args.events)
+    differ = differences(payloads)
+    assert not differ, f"{len(differ)} events extract differently, e.g. {differ[0]}"
+    nbytes = sum(len(p) for p in payloads)
+    for name, fn in (("legacy (5 sweeps)", legacy_extract_iocs), ("fused (1 pass)", extract_iocs)):
+        dt = _time(fn, payloads, args.repeat)
+        print(f"{name:<20} {dt * 1e6 / len(payloads):8.1f} us/event  {nbytes / dt / 1e6:7.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
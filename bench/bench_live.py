@@ -0,0 +1,62 @@
+# bench/bench_live.py
+# Live-view aggregates: cost of folding one alert in, and of rendering a snapshot
+# as history grows, against recomputing the same view from the retained alerts.
+#   python -m bench.bench_live [--alerts 1000000] [--ips 200000]
+import argparse, random, time
+from collections import Counter
+
+from live import LiveStats
+
+_SEV = ("low", "medium", "high", "critical")
+_TECH = ("T1110", "T1110.003", "T1566", "T1059", "T1078", "T1021", "T1041", "T1071")
+
+def make_alerts(n: int, ips: int, seed: int = 5):
+    rnd = random.Random(seed)
+    pool = [f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}" for _ in range(ips)]
+    return [{"ts": "2025-08-14T10:00:00Z", "severity": rnd.choice(_SEV),
+             "raw": {"event": "failed login", "src_ip": pool[int(rnd.paretovariate(1.2)) % ips]},
+             "detection": {"label": "suspicious"},
+             "mitre": [{"tactic": "x", "technique_id": t, "technique": t} for t in rnd.sample(_TECH, rnd.randint(0, 2))]}
+            for _ in range(n)]
+
+def recompute(history, top: int = 10):
+    """What a view without running aggregates does on every refresh."""
+    sev, tech, src = Counter(), Counter(), Counter()
+    for a in history:
+        sev[a["severity"]] += 1
+        tech.update(m["technique_id"] for m in a["mitre"])
+        src[a["raw"]["src_ip"]] += 1
+    return sev, tech.most_common(top), src.most_common(top)
+
+def ms(fn, reps: int = 5) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return round((time.perf_counter() - t0) * 1000 / reps, 3)
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--alerts", type=int, default=1_000_000)
+    ap.add_argument("--ips", type=int, default=200_000)
+    ap.add_argument("--minutes", type=int, default=60, help="alerts are spread evenly over this many minutes")
+    args = ap.parse_args()
+    alerts = make_alerts(args.alerts, args.ips)
+
+    clock = type("Clock", (), {"t": 0.0, "__call__": lambda self: self.t})()
+    live = LiveStats(window_minutes=args.minutes, clock=clock)
+    step = args.minutes * 60 / len(alerts)
+    marks = {10 ** k for k in range(3, 8)} | {len(alerts)}
+    t_add = 0.0
+    for i, a in enumerate(alerts, 1):
+        clock.t = i * step
+        t0 = time.perf_counter()
+        live.add(a)
+        t_add += time.perf_counter() - t0
+        if i in marks:
+            print({"history": i, "add_us": round(t_add * 1e6 / i, 2),
+                   "snapshot_ms": ms(lambda: live.snapshot()),
+                   "recompute_ms": ms(lambda: recompute(alerts[:i]), reps=1)})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench/bench_mitre.py
+# Compiled MITRE rule engine vs the previous linear walk over RULES.
+#   python -m bench.bench_mitre [--rules 1500] [--alerts 2000]
+import argparse, random, time
+from typing import Dict, List
+
+from agents.mitre import CompiledRules, RULES, Rule
+from storage.schema import MitreMapping, OSINTFinding
+
+def legacy_mitre_map(rules: List[Rule], osint: Dict[str, OSINTFinding], detection_reason: str) -> List[MitreMapping]:
+    """The pre-compilation mitre_map: every rule, every substring, every call."""
+    tags = {t.lower() for v in osint.values() for t in v.tags}
+    reason = (detection_reason or "").lower()
+    out: List[MitreMapping] = []
+    for cond, mapping in rules:
+        if cond.get("window"):  # the bench passes no window signals: never above a threshold
+            continue
+        want_tags = cond.get("tags")
+        if want_tags and not want_tags.issubset(tags):
+            continue
+        substrs = cond.get("reason_contains")
+        if substrs and not any(s in reason for s in substrs):
+            continue
+        out.append(MitreMapping(**mapping))
+    seen, uniq = set(), []
+    for m in out:
+        if m.technique_id not in seen:
+            seen.add(m.technique_id); uniq.append(m)
+    return uniq
+
+_WORDS = ("remote access token credential service shadow copy script scheduled registry domain "
+          "trust discovery injection process hollowing kerberos ticket dump memory archive "
+          "tunnel beacon proxy encrypted channel account manipulation startup boot logon").split()
+
+def make_rules(n: int, seed: int = 11) -> List[Rule]:
+    """RULES plus synthetic technique rules shaped like an ATT&CK-derived set."""
+    rnd = random.Random(seed)
+    rules: List[Rule] = list(RULES)
+    for i in range(n - len(rules)):
+        phrases = [" ".join(rnd.sample(_WORDS, 2)) + f" t{i}" for _ in range(rnd.randint(1, 4))]
+        cond = {"reason_contains": phrases}
+        if rnd.random() < 0.2:
+            cond = {"tags": {f"tag-{rnd.randint(0, 300)}"}} if rnd.random() < 0.5 else {**cond, "tags": {f"tag-{rnd.randint(0, 300)}"}}
+        rules.append((cond, {"tactic": "Synthetic", "technique_id": f"T9{i:03d}", "technique": phrases[0]}))
+    return rules
+
+def make_alerts(n: int, rules: List[Rule], seed: int = 12):
+    rnd = random.Random(seed)
+    phrases = [p for c, _ in rules for p in c.get("reason_contains", [])]
+    out = []
+    for _ in range(n):
+        reason = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(8, 30)))
+        if rnd.random() < 0.5:
+            reason += "; " + rnd.choice(phrases)
+        tags = [f"tag-{rnd.randint(0, 300)}" for _ in range(rnd.randint(0, 3))] + ["brute-force"] * (rnd.random() < 0.3)
+        out.append(({"1.2.3.4": OSINTFinding(reputation="malicious", tags=tags)}, "Heuristic: " + reason))
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rules", type=int, default=1500)
+    ap.add_argument("--alerts", type=int, default=2000)
+    args = ap.parse_args()
+
+    rules = make_rules(args.rules)
+    alerts = make_alerts(args.alerts, rules)
+
+    t0 = time.perf_counter()
+    compiled = CompiledRules(rules)
+    print(f"compile {len(rules)} rules: {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+    def compiled_map(osint, reason):
+        tags = {t.lower() for v in osint.values() for t in v.tags}
+        seen, uniq = set(), []
+        for i in compiled.match(tags, reason.lower()):
+            m = compiled.mappings[i]
+            if m.technique_id not in seen:
+                seen.add(m.technique_id); uniq.append(m)
+        return uniq
+
+    mismatches = sum(
+        [m.technique_id for m in legacy_mitre_map(rules, o, r)] != [m.technique_id for m in compiled_map(o, r)]
+        for o, r in alerts
+    )
+    for name, fn in (("legacy (linear)", lambda o, r: legacy_mitre_map(rules, o, r)), ("compiled", compiled_map)):
+        t0 = time.perf_counter()
+        for o, r in alerts:
+            fn(o, r)
+        dt = time.perf_counter() - t0
+        print(f"{name:<16} {dt * 1e6 / len(alerts):9.1f} us/alert")
+    print(f"result mismatches: {mismatches}")
+
+if __name__ == "__main__":
+    main()
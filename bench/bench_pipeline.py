@@ -0,0 +1,219 @@
+# bench/bench_pipeline.py
+# Offline benchmark suite: per-agent micro-benchmarks plus end-to-end runs through
+# build_graph() and FastAPI's TestClient, with a fake LLM. Writes JSON for comparison.
+#   python -m bench.bench_pipeline [--events 500] [--llm-latency-ms 5] [--osint-latency-ms 0] [--out bench_results.json]
+#   python -m bench.bench_pipeline --compare old.json [--tolerance 0.15]
+import os
+
+# Offline, quiet, deterministic defaults; must be set before the agents are imported.
+os.environ.setdefault("ALERT_DB", "")              # no SQLite alert store
+os.environ.setdefault("DETECT_CACHE_SIZE", "0")    # every event reaches the (fake) model
+os.environ.setdefault("AGG_WINDOW", "0")
+for _k in ("GROQ_API_KEY", "OPENAI_API_KEY", "ABUSEIPDB_API_KEY", "VT_API_KEY", "OTX_API_KEY",
+           "OSINT_JSON_PROVIDER_URL", "ES_URL", "ALERTS_FILE", "OSINT_CACHE_DB", "DETECT_CACHE_DB"):
+    os.environ.pop(_k, None)
+
+import argparse, asyncio, gc, json, platform, subprocess, sys, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from bench.events import make_events
+from bench.fake_llm import FakeChatModel, install
+from bench import fake_osint
+from agents import osint
+from agents.ioc_extract import extract_iocs
+from agents.mitre import mitre_map
+from agents.prioritize import score
+from graph import build_graph
+from storage import es
+from storage.records import AlertRec
+from storage.schema import Detection
+
+class NullSink:
+    """Drops alerts so the writer thread costs what it costs, minus the IO."""
+
+    def write(self, docs: List[str]) -> List[int]:
+        return []
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in ms (nearest rank)."""
+    s = sorted(samples)
+    at = lambda q: s[min(len(s) - 1, max(0, int(round(q * len(s))) - 1))]
+    return {"p50_ms": round(at(0.50) * 1e3, 3), "p95_ms": round(at(0.95) * 1e3, 3),
+            "p99_ms": round(at(0.99) * 1e3, 3), "max_ms": round(s[-1] * 1e3, 3)}
+
+def micro(fn: Callable[[Any], Any], inputs: List[Any], repeat: int) -> Dict[str, float]:
+    """Best-of-`repeat` pass over inputs, GC off while timing (as timeit does)."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            for x in inputs:
+                fn(x)
+            best = min(best, time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    return {"us_per_op": round(best * 1e6 / len(inputs), 3), "ops": len(inputs)}
+
+def run_micro(events: List[Dict[str, Any]], repeat: int) -> Dict[str, Dict[str, float]]:
+    payloads = [json.dumps(e) for e in events]
+    iocs = [extract_iocs(p) for p in payloads]
+    osint._CACHE.clear()
+    cold = micro(osint.enrich, iocs, 1)
+    warm = micro(osint.enrich, iocs, repeat)
+    findings = [osint.enrich(i) for i in iocs]
+    reasons = ["Heuristic: " + e["event"] for e in events]
+    det = Detection(label="suspicious", reason="bench", confidence=0.6)
+    alerts = [AlertRec(event_id=str(n), ts=datetime.now(timezone.utc), raw={}, detection=det, iocs=i,
+                       osint=f, mitre=mitre_map(f, r)) for n, (i, f, r) in enumerate(zip(iocs, findings, reasons))]
+    return {
+        "extract_iocs": micro(extract_iocs, payloads, repeat),
+        "enrich_cold": cold,
+        "enrich_warm": warm,
+        "mitre_map": micro(lambda fr: mitre_map(*fr), list(zip(findings, reasons)), repeat),
+        "score": micro(score, alerts, repeat),
+    }
+
+def _summary(lat: List[float], wall: float) -> Dict[str, float]:
+    return {"events": len(lat), "wall_s": round(wall, 3),
+            "throughput_eps": round(len(lat) / wall, 2), **percentiles(lat)}
+
+def run_graph_sync(graph, events: List[Dict[str, Any]]) -> Dict[str, float]:
+    lat = []
+    t0 = time.perf_counter()
+    for e in events:
+        t = time.perf_counter()
+        graph.invoke({"event": e})
+        lat.append(time.perf_counter() - t)
+    return _summary(lat, time.perf_counter() - t0)
+
+def run_graph_async(graph, events: List[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    async def go():
+        sem = asyncio.Semaphore(concurrency)
+        lat: List[float] = []
+
+        async def one(e):
+            async with sem:
+                t = time.perf_counter()
+                await graph.ainvoke({"event": e})
+                lat.append(time.perf_counter() - t)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(e) for e in events))
+        return lat, time.perf_counter() - t0
+
+    lat, wall = asyncio.run(go())
+    return {**_summary(lat, wall), "concurrency": concurrency}
+
+def run_http(events: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    import main
+    client = TestClient(main.app)
+    lat = []
+    t0 = time.perf_counter()
+    for e in events:
+        t = time.perf_counter()
+        r = client.post("/ingest", json={"event": e})
+        lat.append(time.perf_counter() - t)
+        assert r.status_code == 200, r.text[:200]
+    single = _summary(lat, time.perf_counter() - t0)
+
+    body = "\n".join(json.dumps(e) for e in events).encode()
+    t0 = time.perf_counter()
+    r = client.post("/ingest/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    wall = time.perf_counter() - t0
+    assert r.status_code == 200 and len(r.text.splitlines()) == len(events)
+    return {"http_ingest": single,
+            "http_ingest_batch": {"events": len(events), "wall_s": round(wall, 3),
+                                  "throughput_eps": round(len(events) / wall, 2)}}
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+# metric -> True when higher is better
+_DIRECTION = {"us_per_op": False, "p50_ms": False, "p95_ms": False, "p99_ms": False, "throughput_eps": True}
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions beyond `tolerance` (0.15 = 15%) between two result files."""
+    out = []
+    for section in ("micro", "e2e"):
+        for name, now in new.get(section, {}).items():
+            before = old.get(section, {}).get(name, {})
+            for metric, higher_better in _DIRECTION.items():
+                a, b = before.get(metric), now.get(metric)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a
+                if (change < -tolerance) if higher_better else (change > tolerance):
+                    out.append(f"{section}.{name}.{metric}: {a} -> {b} ({change:+.0%})")
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=500, help="events per end-to-end run")
+    ap.add_argument("--micro-events", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--llm-latency-ms", type=float, default=5.0)
+    ap.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    ap.add_argument("--osint-latency-ms", type=float, default=0.0,
+                    help="add a remote OSINT provider with this latency (end-to-end runs only)")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--skip-http", action="store_true")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", help="earlier results JSON; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+
+    es.writer.sink = NullSink()
+    model = install(FakeChatModel(args.llm_latency_ms, args.llm_jitter_ms, seed=args.seed))
+
+    results: Dict[str, Any] = {
+        "meta": {"when": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git": _git_rev(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "args": vars(args)},
+        "micro": run_micro(make_events(args.micro_events, args.seed), args.repeat),
+        "e2e": {},
+    }
+    for name, r in results["micro"].items():
+        print(f"{name:<18} {r['us_per_op']:10.1f} us/op")
+
+    events = make_events(args.events, args.seed + 1)
+    if args.osint_latency_ms > 0:
+        fake_osint.install(fake_osint.FakeProvider(args.osint_latency_ms))
+    graph = build_graph()
+    graph.invoke({"event": events[0]})  # warm-up
+    osint._CACHE.clear()
+    e2e = results["e2e"]
+    e2e["graph_invoke"] = run_graph_sync(graph, events)
+    osint._CACHE.clear()  # every run starts from a cold OSINT cache
+    e2e["graph_ainvoke"] = run_graph_async(graph, events, args.concurrency)
+    osint._CACHE.clear()
+    if not args.skip_http:
+        e2e.update(run_http(events))
+    es.writer.close()
+    results["llm_calls"] = model.calls
+    for name, r in e2e.items():
+        pct = f"p50 {r['p50_ms']:.1f} p95 {r['p95_ms']:.1f} p99 {r['p99_ms']:.1f} ms" if "p50_ms" in r else ""
+        print(f"{name:<18} {r['throughput_eps']:10.1f} ev/s  {pct}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
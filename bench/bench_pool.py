@@ -0,0 +1,109 @@
+# bench/bench_pool.py
+# Key-affine worker pool: event transport (ShmRing vs multiprocessing.Queue),
+# end-to-end throughput by worker count, and OSINT cache hit rate with and
+# without key affinity.
+#   python -m bench.bench_pool [--events 4000] [--workers 1,2,4]
+import os
+
+os.environ.setdefault("ALERT_DB", "")
+os.environ.setdefault("DETECT_CACHE_SIZE", "0")
+for _k in ("GROQ_API_KEY", "OPENAI_API_KEY", "ABUSEIPDB_API_KEY", "VT_API_KEY", "OTX_API_KEY",
+           "OSINT_JSON_PROVIDER_URL", "ES_URL", "ALERTS_FILE", "OSINT_CACHE_DB", "DETECT_CACHE_DB"):
+    os.environ.pop(_k, None)
+
+import argparse, asyncio, json, multiprocessing as mp, time
+from typing import Any, Dict, List
+
+from bench.events import make_events
+from pool import ShardedPool, ShmRing
+
+def _drain_ring(name: str, items, size: int, n: int, done) -> None:
+    ring = ShmRing(size, items, name=name)
+    for _ in range(n):
+        items.acquire()
+        json.loads(ring.get()[1])
+    ring.close()
+    done.set()
+
+def _drain_queue(q, n: int, done) -> None:
+    for _ in range(n):
+        json.loads(q.get())
+    done.set()
+
+def transport(events: List[Dict[str, Any]]) -> Dict[str, float]:
+    """us per event, parent -> child, including the JSON encode / decode on each side."""
+    ctx = mp.get_context("spawn")
+    out = {}
+    size = 4 << 20
+    ring = ShmRing(size, ctx.Semaphore(0))
+    done = ctx.Event()
+    p = ctx.Process(target=_drain_ring, args=(ring.name, ring.items, size, len(events), done))
+    p.start()
+    t0 = time.perf_counter()
+    for i, e in enumerate(events):
+        b = json.dumps(e).encode()
+        while not ring.put(i, b):
+            time.sleep(0.0001)
+    done.wait()
+    out["shm_ring_us"] = round((time.perf_counter() - t0) * 1e6 / len(events), 2)
+    p.join()
+    ring.close(unlink=True)
+
+    q, done = ctx.Queue(maxsize=10_000), ctx.Event()
+    p = ctx.Process(target=_drain_queue, args=(q, len(events), done))
+    p.start()
+    t0 = time.perf_counter()
+    for e in events:
+        q.put(json.dumps(e))  # and pickled again by the queue's feeder thread
+    done.wait()
+    out["mp_queue_us"] = round((time.perf_counter() - t0) * 1e6 / len(events), 2)
+    p.join()
+    return out
+
+def _run(graph, events: List[Dict[str, Any]], concurrency: int) -> float:
+    async def go():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(e):
+            async with sem:
+                await graph.ainvoke({"event": e})
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(e) for e in events))
+        return time.perf_counter() - t0
+    return asyncio.run(go())
+
+def pooled(events: List[Dict[str, Any]], workers: int, key, concurrency: int) -> Dict[str, Any]:
+    pool = ShardedPool(workers, key_fields=key)
+    pool.start()
+    pool.invoke({"event": events[0]})  # wait for the workers to be up
+    wall = _run(pool, events, concurrency)
+    caches = [w["osint_cache"] for w in pool.stats()["per_worker"]]
+    pool.close()
+    hits, misses = sum(c["hits"] for c in caches), sum(c["misses"] for c in caches)
+    return {"workers": workers, "key": list(key), "throughput_eps": round(len(events) / wall, 1),
+            "osint_hit_rate": round(hits / max(1, hits + misses), 4)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=4000)
+    ap.add_argument("--transport-events", type=int, default=50_000)
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--concurrency", type=int, default=256)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    print(f"cpus: {os.cpu_count()}")
+
+    print("transport:", transport(make_events(args.transport_events, args.seed)))
+
+    events = make_events(args.events, args.seed + 1)
+    from graph import build_graph
+    graph = build_graph()
+    graph.invoke({"event": events[0]})
+    print(f"in-process: {len(events) / _run(graph, events, args.concurrency):.1f} ev/s")
+    for n in (int(x) for x in args.workers.split(",")):
+        print(pooled(events, n, ("src_ip",), args.concurrency))
+        if n > 1:
+            print(pooled(events, n, (), args.concurrency))  # round-robin: no affinity
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench/bench_scheduler.py
+# LLM admission control (agents/scheduler.py) against a saturated provider: events
+# arrive faster than the fake model serves them, with and without the priority
+# queue. Reports time to verdict per priority class, how many events were shed,
+# and how often the shed events' heuristic verdict matches the model's.
+#   python -m bench.bench_scheduler [--events 600] [--rate 60] [--llm-latency-ms 400] [--capacity 16]
+import os
+
+os.environ.setdefault("DETECT_CACHE_SIZE", "0")  # every event reaches the (fake) model
+for _k in ("GROQ_API_KEY", "OPENAI_API_KEY", "DETECT_CACHE_DB", "OSINT_CACHE_DB"):
+    os.environ.pop(_k, None)
+
+import argparse, asyncio, json, statistics, time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from agents import detect
+from agents.scheduler import AdmissionQueue
+from bench.events import make_payloads
+from bench.fake_llm import FakeChatModel, install, verdict
+from bench.bench_pipeline import percentiles
+
+def run(payloads: List[str], classes: List[str], rate: float) -> Dict[str, Any]:
+    async def go():
+        lat: Dict[str, List[float]] = defaultdict(list)
+        shed: Dict[str, int] = defaultdict(int)
+        agree = 0
+
+        async def one(p, klass):
+            nonlocal agree
+            t = time.perf_counter()
+            det = await detect.adetect(p)
+            lat[klass].append(time.perf_counter() - t)
+            if det.reason.endswith("(LLM queue full)"):
+                shed[klass] += 1
+                agree += det.label == verdict(p)["label"]
+        tasks = []
+        t0 = time.perf_counter()
+        for i, (p, klass) in enumerate(zip(payloads, classes)):  # open loop: arrivals don't wait
+            await asyncio.sleep(max(0.0, t0 + i / rate - time.perf_counter()))
+            tasks.append(asyncio.create_task(one(p, klass)))
+        await asyncio.gather(*tasks)
+        return lat, shed, agree, time.perf_counter() - t0
+    lat, shed, agree, wall = asyncio.run(go())
+    out: Dict[str, Any] = {"wall_s": round(wall, 2), "shed": sum(shed.values()),
+                           "shed_heuristic_agreement": round(agree / sum(shed.values()), 3) if shed else None}
+    for klass in ("high", "normal", "low"):
+        if lat[klass]:
+            p = percentiles(lat[klass])
+            out[klass] = {"n": len(lat[klass]), "p50_ms": round(p["p50_ms"]), "p95_ms": round(p["p95_ms"]),
+                          "shed": shed[klass]}
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=600)
+    ap.add_argument("--rate", type=float, default=60.0, help="arrivals per second")
+    ap.add_argument("--llm-latency-ms", type=float, default=400.0)
+    ap.add_argument("--capacity", type=int, default=16, help="calls the provider serves at once")
+    ap.add_argument("--queue-depth", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    install(FakeChatModel(args.llm_latency_ms, jitter_ms=args.llm_latency_ms / 4, capacity=args.capacity))
+    detect.TIERED = False
+
+    payloads = make_payloads(args.events, args.seed)
+    q = AdmissionQueue(1, 1, detect.PRIORITY_BANDS)
+    detect.prescore(payloads[0])  # imports the OSINT side and loads the feeds
+    t = time.perf_counter()
+    scores = [detect.prescore(p) for p in payloads]
+    us = (time.perf_counter() - t) / len(payloads) * 1e6
+    classes = [q.klass(s) for s in scores]
+    print(json.dumps({"events": len(payloads), "capacity_eps": round(args.capacity / args.llm_latency_ms * 1000, 1),
+                      "arrival_eps": args.rate, "prescore_us": round(us, 1),
+                      "classes": {k: classes.count(k) for k in ("high", "normal", "low")},
+                      "high_model_malicious": round(statistics.mean(
+                          verdict(p)["label"] == "malicious" for p, k in zip(payloads, classes) if k == "high"), 3)}))
+    for label, inflight in (("off", 0), ("on", args.capacity)):
+        detect.set_scheduling(inflight, args.queue_depth)
+        print(json.dumps({"scheduler": label, **run(payloads, classes, args.rate)}))
+    detect.set_scheduling(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench/bench_startup.py
+# Cold start: wall time of fresh interpreters importing the agents, the graph and
+# the API, serving a first event, and loading an ATT&CK-sized MITRE rule bundle
+# with a cold and a warm rules cache (storage/artifacts.py).
+#   python -m bench.bench_startup [--runs 5] [--tree PATH]   (--tree: measure another checkout)
+import argparse, json, os, random, statistics, subprocess, sys, tempfile, time
+from typing import Dict, List
+
+_EVENT = {"event": "multiple failed logins", "src_ip": "203.0.113.45", "user": "alice"}
+_FIRST_EVENT = f"""
+import asyncio, main
+g = main.get_graph() if hasattr(main, "get_graph") else main.graph
+asyncio.run(g.ainvoke({{"event": {_EVENT!r}}}))
+"""
+
+CASES = {
+    "import agents.detect": ("import agents.detect", {}),
+    "import agents.detect (OPENAI_API_KEY set)": ("import agents.detect", {"OPENAI_API_KEY": "sk-bench"}),
+    "import graph": ("import graph", {}),
+    "import main": ("import main", {}),
+    "import main (OPENAI_API_KEY set)": ("import main", {"OPENAI_API_KEY": "sk-bench"}),
+    "import main (POOL_WORKERS=2)": ("import main", {"POOL_WORKERS": "2"}),
+    "import main + first event": (_FIRST_EVENT, {}),
+}
+
+def make_bundle(path: str, techniques: int = 800, relationships: int = 15_000, seed: int = 3) -> None:
+    """A synthetic ATT&CK STIX bundle of roughly enterprise-attack.json's shape (~10 MB)."""
+    rnd = random.Random(seed)
+    words = ["access", "token", "remote", "service", "credential", "dump", "script", "shell",
+             "registry", "task", "proxy", "inject", "hijack", "discovery", "archive", "transfer"]
+    phases = ["initial-access", "execution", "persistence", "privilege-escalation", "defense-evasion",
+              "credential-access", "discovery", "lateral-movement", "collection", "exfiltration"]
+    text = lambda n: " ".join(rnd.choice(words) for _ in range(n))
+    objs = []
+    for i in range(techniques):
+        objs.append({"type": "attack-pattern", "id": f"attack-pattern--{i}", "name": f"{text(3)} {i}",
+                     "description": text(250),
+                     "external_references": [{"source_name": "mitre-attack", "external_id": f"T{1000 + i}"}],
+                     "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": p}
+                                           for p in rnd.sample(phases, rnd.randint(1, 2))]})
+    for i in range(relationships):
+        objs.append({"type": "relationship", "id": f"relationship--{i}", "relationship_type": "uses",
+                     "source_ref": f"malware--{i}", "target_ref": f"attack-pattern--{i % techniques}",
+                     "description": text(80)})
+    with open(path, "w") as f:
+        json.dump({"type": "bundle", "objects": objs}, f)
+
+def run(tree: str, code: str, env: Dict[str, str], runs: int, warm: bool = True) -> Dict[str, float]:
+    base = {k: v for k, v in os.environ.items()
+            if k not in ("GROQ_API_KEY", "OPENAI_API_KEY", "POOL_WORKERS", "MITRE_RULES_FILE")}
+    base.update({"ALERT_DB": "", "PYTHONPATH": tree, "PYTHONDONTWRITEBYTECODE": ""}, **env)
+    walls: List[float] = []
+    for _ in range(runs + warm):  # the first run warms the OS page cache and .pyc files
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=tree, env=base, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        walls.append((time.perf_counter() - t0) * 1000)
+    walls = walls[warm:]
+    return {"median_ms": round(statistics.median(walls), 1), "min_ms": round(min(walls), 1)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--tree", default=os.getcwd(), help="checkout to measure (default: this one)")
+    args = ap.parse_args()
+    tree = os.path.abspath(args.tree)
+
+    print({"interpreter": run(tree, "pass", {}, args.runs)})
+    for name, (code, env) in CASES.items():
+        print({name: run(tree, code, env, args.runs)})
+
+    tmp = tempfile.mkdtemp()
+    bundle = os.path.join(tmp, "enterprise-attack.json")
+    make_bundle(bundle)
+    code = "import agents.mitre as m; assert len(m._compiled) > 1000"
+    env = {"MITRE_RULES_FILE": bundle}
+    print({"bundle_mb": round(os.path.getsize(bundle) / 2 ** 20, 1)})
+    # a fresh cache directory per run: every run parses and compiles the bundle
+    cold = [run(tree, code, {**env, "RULES_CACHE_DIR": tempfile.mkdtemp(dir=tmp)}, 1, warm=False)["median_ms"]
+            for _ in range(args.runs)]
+    print({"import agents.mitre, bundle, cold cache": {"median_ms": round(statistics.median(cold), 1)}})
+    print({"import agents.mitre, bundle, warm cache":
+           run(tree, code, {**env, "RULES_CACHE_DIR": os.path.join(tmp, "warm")}, args.runs)})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# bench/events.py
+# Seeded synthetic SOC events for the benchmarks: same seed, same events, byte for byte.
+import base64, json, random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# Relative frequency of each scenario in a generated stream.
+DEFAULT_MIX = {"failed_login": 0.35, "phishing": 0.15, "lateral_movement": 0.15,
+               "exfil": 0.10, "benign": 0.25}
+
+_TLDS = ("com", "net", "org", "io", "ru", "xyz")
+_WORDS = ("invoice", "update", "secure", "login", "portal", "cdn", "billing", "support",
+          "drive", "share", "office", "verify", "account", "sync", "mail")
+
+class EventGenerator:
+    """
+    Failed logins, phishing mail, lateral movement, exfiltration and benign
+    noise, with a few IOCs each and payloads from ~150 B (auth) to ~3 KB (mail).
+    A small pool of attacker IPs recurs, like a real campaign.
+    """
+
+    def __init__(self, seed: int = 42, mix: Optional[Dict[str, float]] = None,
+                 start: datetime = datetime(2025, 8, 14, 10, 0, tzinfo=timezone.utc)):
+        self.rnd = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.t = start
+        r = self.rnd
+        self.attackers = [f"{r.choice(['203.0.113', '198.51.100', '45.83.64'])}.{r.randint(1, 254)}"
+                          for _ in range(40)]
+        self.users = [f"user{i:04d}" for i in range(2000)]
+        self.hosts = [f"ws-{i:03d}.corp.example.com" for i in range(300)]
+
+    # -- pieces --
+    def _internal_ip(self) -> str:
+        return f"10.{self.rnd.randint(0, 20)}.{self.rnd.randint(0, 255)}.{self.rnd.randint(1, 254)}"
+
+    def _domain(self) -> str:
+        r = self.rnd
+        return f"{r.choice(_WORDS)}-{r.choice(_WORDS)}.{r.choice(_TLDS)}"
+
+    def _hex(self, n: int) -> str:
+        return "%0*x" % (n, self.rnd.getrandbits(n * 4))
+
+    def _ts(self) -> str:
+        self.t += timedelta(milliseconds=self.rnd.randint(5, 400))
+        return self.t.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    # -- scenarios --
+    def failed_login(self) -> Dict[str, Any]:
+        r = self.rnd
+        return {"event": r.choice(["failed login", "authentication failure", "Failed password for user"]),
+                "src_ip": r.choice(self.attackers), "user": r.choice(self.users[:50] if r.random() < 0.7 else self.users),
+                "host": r.choice(self.hosts), "service": r.choice(["sshd", "rdp", "owa", "vpn"]),
+                "outcome": "failure", "ts": self._ts()}
+
+    def phishing(self) -> Dict[str, Any]:
+        r = self.rnd
+        dom = self._domain()
+        links = [f"https://{dom}/{r.choice(_WORDS)}/{self._hex(10)}?u={r.choice(self.users)}"
+                 for _ in range(r.randint(1, 3))]
+        body = " ".join(r.choice(_WORDS) for _ in range(r.randint(150, 450)))
+        return {"event": "phishing email reported", "from": f"{r.choice(_WORDS)}@{dom}",
+                "to": f"{r.choice(self.users)}@example.com", "subject": f"Action required: {r.choice(_WORDS)}",
+                "src_ip": r.choice(self.attackers), "urls": links,
+                "attachment": {"name": f"{r.choice(_WORDS)}.docm", "md5": self._hex(32), "sha256": self._hex(64)},
+                "body": body + " " + " ".join(links), "ts": self._ts()}
+
+    def lateral_movement(self) -> Dict[str, Any]:
+        r = self.rnd
+        tool = r.choice(["psexec", "winrm", "wmic", "smb"])
+        dst = self._internal_ip()
+        return {"event": f"remote service execution via {tool}", "src_ip": self._internal_ip(),
+                "dst_ip": dst, "host": r.choice(self.hosts), "user": r.choice(self.users),
+                "cmdline": f"{tool}.exe \\\\{dst} -s cmd.exe /c whoami & net group \"domain admins\" /domain",
+                "parent_sha256": self._hex(64), "ts": self._ts()}
+
+    def exfil(self) -> Dict[str, Any]:
+        r = self.rnd
+        dom = self._domain()
+        return {"event": "large outbound transfer", "src_ip": self._internal_ip(),
+                "dst_ip": r.choice(self.attackers), "domain": dom, "url": f"https://{dom}/upload/{self._hex(16)}",
+                "bytes_out": r.randint(50, 900) * 1024 * 1024, "file": f"C:\\Users\\Public\\{self._hex(8)}.7z",
+                "process": "rclone.exe", "ts": self._ts()}
+
+    def benign(self) -> Dict[str, Any]:
+        r = self.rnd
+        return {"event": r.choice(["successful login", "heartbeat", "backup completed", "session closed"]),
+                "src_ip": self._internal_ip(), "user": r.choice(self.users), "host": r.choice(self.hosts),
+                "ts": self._ts()}
+
+    def verbose_edr(self) -> Dict[str, Any]:
+        """A chatty EDR process event: encoded command line, loaded modules, environment
+        block, process tree. 5-40 KB; not in DEFAULT_MIX, pass it in `mix`."""
+        r = self.rnd
+        bad = r.random() < 0.5
+        payload = base64.b64encode(self.rnd.randbytes(r.randint(1500, 12000))).decode()
+        cmd = (f"powershell.exe -nop -w hidden -enc {payload}" if bad
+               else f"C:\\Program Files\\App\\updater.exe --check --channel stable --log {self._hex(8)}.log")
+        mods = [f"C:\\Windows\\System32\\{m}.dll" for m in
+                r.choices(["ntdll", "kernel32", "kernelbase", "advapi32", "user32", "ws2_32", "crypt32",
+                           "amsi", "clr", "mscoree", "bcrypt", "sechost", "rpcrt4", "combase"], k=r.randint(40, 200))]
+        return {"event": "suspicious powershell execution" if bad else "process start",
+                "host": r.choice(self.hosts), "user": r.choice(self.users), "src_ip": self._internal_ip(),
+                "process": "powershell.exe" if bad else "updater.exe", "cmdline": cmd, "pid": r.randint(1000, 60000),
+                "parent": {"process": "winword.exe" if bad else "services.exe", "pid": r.randint(100, 9000),
+                           "sha256": self._hex(64)},
+                "sha256": self._hex(64), "integrity_level": r.choice(["Medium", "High", "System"]),
+                "modules": mods,
+                "env": {f"VAR_{i}": self._hex(r.randint(8, 120)) for i in range(r.randint(20, 80))},
+                "tree": [{"pid": r.randint(100, 60000), "image": f"C:\\Windows\\{self._hex(6)}.exe",
+                          "cmdline": " ".join(r.choice(_WORDS) for _ in range(r.randint(5, 40)))}
+                         for _ in range(r.randint(3, 15))],
+                "ts": self._ts()}
+
+    def event(self) -> Dict[str, Any]:
+        kind = self.rnd.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        return getattr(self, kind)()
+
+def make_events(n: int, seed: int = 42, mix: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    gen = EventGenerator(seed, mix)
+    return [gen.event() for _ in range(n)]
+
+def make_payloads(n: int, seed: int = 42, mix: Optional[Dict[str, float]] = None) -> List[str]:
+    return [json.dumps(e) for e in make_events(n, seed, mix)]
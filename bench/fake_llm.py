@@ -0,0 +1,90 @@
+# bench/fake_llm.py
+# Deterministic stand-in for the chat model behind agents/detect.py.
+import asyncio, json, random, re, time
+from typing import List, Tuple
+
+from agents.compact import estimate_tokens
+
+# (keywords, label, reason, confidence): first match wins, in order.
+_VERDICTS = [
+    (("failed login", "authentication failure", "failed password"), "malicious",
+     "repeated failed logins, possible brute force", 0.8),
+    (("phish",), "suspicious", "phishing link in reported email", 0.7),
+    (("psexec", "winrm", "wmic", "remote service"), "malicious", "lateral movement via remote service", 0.8),
+    (("large outbound", "bytes_out"), "malicious", "data exfiltration, large outbound transfer", 0.75),
+]
+
+class _Reply:
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+def verdict(event_json: str) -> dict:
+    text = event_json.lower()
+    for keys, label, reason, conf in _VERDICTS:
+        if any(k in text for k in keys):
+            return {"label": label, "reason": reason, "confidence": conf}
+    return {"label": "benign", "reason": "routine activity", "confidence": 0.7}
+
+class FakeChatModel:
+    """
+    invoke()/ainvoke() like a LangChain chat model, answering detect's PROMPT and
+    BATCH_PROMPT from keywords in the events. Replies depend only on the prompt;
+    latency is latency_ms plus seeded jitter, per call (a batch costs one call),
+    plus ms_per_1k_tokens for every thousand prompt tokens (prefill). capacity > 0
+    makes ainvoke() serve that many calls at a time, the rest in arrival order,
+    like a saturated provider.
+    """
+
+    def __init__(self, latency_ms: float = 5.0, jitter_ms: float = 0.0, seed: int = 0,
+                 ms_per_1k_tokens: float = 0.0, capacity: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.rnd = random.Random(seed)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.capacity = capacity
+        self._slots: Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+    def _delay(self, prompt: str) -> float:
+        ms = self.latency_ms + self.rnd.uniform(-self.jitter_ms, self.jitter_ms)
+        tokens = estimate_tokens(prompt)
+        self.prompt_tokens += tokens
+        return max(0.0, ms + tokens * self.ms_per_1k_tokens / 1000) / 1000
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        if "Events (one per line" in prompt:
+            lines = prompt.split("Events (one per line", 1)[1].splitlines()[1:]
+            items: List[Tuple[int, str]] = []
+            for line in lines:
+                m = re.match(r"(\d+): (.*)", line)
+                if m:
+                    items.append((int(m.group(1)), m.group(2)))
+            return json.dumps([{"id": i, **verdict(e)} for i, e in items])
+        event_json = prompt.split("Event JSON:", 1)[-1].strip()
+        return json.dumps(verdict(event_json))
+
+    def invoke(self, prompt: str) -> _Reply:
+        time.sleep(self._delay(str(prompt)))
+        return _Reply(self._answer(str(prompt)))
+
+    async def ainvoke(self, prompt: str) -> _Reply:
+        if self.capacity <= 0:
+            await asyncio.sleep(self._delay(str(prompt)))
+            return _Reply(self._answer(str(prompt)))
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots[0] is not loop:  # one semaphore per event loop
+            self._slots = (loop, asyncio.Semaphore(self.capacity))
+        async with self._slots[1]:
+            await asyncio.sleep(self._delay(str(prompt)))
+            return _Reply(self._answer(str(prompt)))
+
+def install(model: FakeChatModel) -> FakeChatModel:
+    """Make agents.detect use `model` (provider label "fake")."""
+    from agents import detect
+    detect.llm, detect.PROVIDER = model, "fake"
+    return model
+
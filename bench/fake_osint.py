@@ -0,0 +1,26 @@
+# bench/fake_osint.py
+# Remote OSINT provider stand-in: answers "unknown" after a fixed delay.
+import time
+from typing import Optional
+
+from agents import osint
+from agents.osint_providers import Provider
+from storage.records import IOCRec
+from storage.schema import OSINTFinding
+
+class FakeProvider(Provider):
+    name = "fake"
+    types = {"ip", "domain", "url", "hash", "email"}
+
+    def __init__(self, latency_ms: float = 20.0):
+        super().__init__()
+        self.latency_ms = latency_ms
+
+    def _lookup(self, ioc: IOCRec) -> Optional[OSINTFinding]:
+        time.sleep(self.latency_ms / 1000)
+        return OSINTFinding(reputation="unknown", sources=[self.name])
+
+def install(provider: FakeProvider) -> FakeProvider:
+    """Make it the only remote provider behind agents.osint."""
+    osint.PROVIDERS[:] = [provider]
+    return provider
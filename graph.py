@@ -1,69 +1,202 @@
 # graph.py
 from langgraph.graph import StateGraph, START, END
-from pydantic import BaseModel
-from typing import Dict, Any
+from langchain_core.runnables import RunnableLambda
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 from datetime import datetime
-import json, uuid
+import json, time, uuid
 
-from storage.schema import Alert
-from agents.detect import detect
+from storage.records import AlertRec, FindingRec, IOCRec
+from storage.schema import Detection
+from agents.detect import detect, adetect, apply_window_signals
 from agents.ioc_extract import extract_iocs
-from agents.osint import enrich as osint_enrich
+from agents.osint import enrich as osint_enrich, aenrich as osint_aenrich
 from agents.mitre import mitre_map
 from agents.prioritize import score
-from storage.es import persist_alert
+from agents.aggregate import Aggregator, AGGREGATOR
+from agents.window_stats import WindowStats, WINDOW_STATS
+from storage.es import persist_alert, apersist_alert
+from metrics import ALERTS, NODE_LATENCY
 
-class PipelineState(BaseModel):
+@dataclass
+class PipelineState:
+    # a plain dataclass: LangGraph rebuilds the state between nodes, and a
+    # pydantic model would re-validate the whole alert every time.
+    # Nodes return only the fields they write, so the parallel branches
+    # (detect | extract -> osint) never write the same channel.
     event: Dict[str, Any]
-    alert: Alert | None = None
+    alert: AlertRec | None = None
+    event_json: str | None = None  # json.dumps(event), serialized once and shared by nodes
+    event_id: str | None = None    # pre-assigned by the aggregate node
+    group_key: str | None = None
+    duplicate: bool = False        # folded into an earlier event's alert; the pipeline is skipped
+    signals: Dict[str, int] = field(default_factory=dict)  # cross-event counters for the source (window node)
+    detection: Detection | None = None      # detect branch
+    iocs: List[IOCRec] | None = None        # extract/osint branch
+    osint: Dict[str, FindingRec] | None = None
 
-def node_detect(state: PipelineState) -> PipelineState:
-    det = detect(json.dumps(state.event))
-    state.alert = Alert(
-        event_id=str(uuid.uuid4()),
+Update = Dict[str, Any]
+
+def _event_json(state: PipelineState) -> str:
+    if state.event_json is None:
+        state.event_json = json.dumps(state.event)
+    return state.event_json
+
+def _window_node(stats: WindowStats):
+    def node_window(state: PipelineState) -> Update:
+        return {"signals": stats.observe(state.event, _event_json(state)), "event_json": state.event_json}
+    return node_window
+
+def _aggregate_node(agg: Aggregator):
+    def node_aggregate(state: PipelineState) -> Update:
+        key = agg.key(state.event, _event_json(state))
+        event_id, alert, first = agg.admit(key)
+        out = {"group_key": key, "event_id": event_id, "duplicate": not first, "event_json": state.event_json}
+        if alert is not None:
+            out["alert"] = alert
+        return out
+    return node_aggregate
+
+def node_detect(state: PipelineState) -> Update:
+    return {"detection": apply_window_signals(detect(_event_json(state)), state.signals)}
+
+async def anode_detect(state: PipelineState) -> Update:
+    return {"detection": apply_window_signals(await adetect(_event_json(state)), state.signals)}
+
+def node_extract(state: PipelineState) -> Update:
+    return {"iocs": extract_iocs(_event_json(state))}
+
+def node_osint(state: PipelineState) -> Update:
+    return {"osint": osint_enrich(state.iocs)}
+
+async def anode_osint(state: PipelineState) -> Update:
+    return {"osint": await osint_aenrich(state.iocs)}
+
+def node_mitre(state: PipelineState) -> Update:
+    # join point: both branches are done, so the alert is assembled here
+    det = state.detection
+    alert = AlertRec(
+        event_id=state.event_id or str(uuid.uuid4()),
         ts=datetime.utcnow(),
         raw=state.event,
         detection=det,
-        iocs=[],
-        osint={},
-        mitre=[],
-        severity="low",
+        iocs=state.iocs,
+        osint=state.osint,
+        mitre=mitre_map(state.osint, det.reason, state.signals),
+        signals=state.signals,
     )
-    return state
+    return {"alert": alert}
+
+def node_prioritize(state: PipelineState) -> Update:
+    alert = score(state.alert)
+    ALERTS.inc(alert.severity)
+    return {"alert": alert}
+
+def _persist_nodes(agg: Aggregator | None):
+    # with aggregation on, groups that closed since the last call are re-persisted
+    # once with their final count (same event_id, so sinks overwrite)
+    def node_persist(state: PipelineState) -> Update:
+        persist_alert(state.alert)
+        if agg is not None:
+            agg.attach(state.group_key, state.event_id, state.alert)
+            for a in agg.take_closed():
+                persist_alert(a)
+        return {}
+
+    async def anode_persist(state: PipelineState) -> Update:
+        await apersist_alert(state.alert)
+        if agg is not None:
+            agg.attach(state.group_key, state.event_id, state.alert)
+            for a in agg.take_closed():
+                await apersist_alert(a)
+        return {}
+    return node_persist, anode_persist
 
-def node_extract(state: PipelineState) -> PipelineState:
-    state.alert.iocs = extract_iocs(json.dumps(state.event))
-    return state
+def _timed(fn, afn=None):
+    """(sync, async) versions of a node that record pipeline_node_seconds."""
+    name = fn.__name__.removeprefix("node_")
+    if afn is None:
+        async def afn(state: PipelineState) -> Update:
+            return fn(state)
 
-def node_osint(state: PipelineState) -> PipelineState:
-    state.alert.osint = osint_enrich(state.alert.iocs)
-    return state
+    def timed(state: PipelineState) -> Update:
+        t0 = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            NODE_LATENCY.observe(time.perf_counter() - t0, name)
 
-def node_mitre(state: PipelineState) -> PipelineState:
-    state.alert.mitre = mitre_map(state.alert.osint, state.alert.detection.reason)
-    return state
+    async def atimed(state: PipelineState) -> Update:
+        t0 = time.perf_counter()
+        try:
+            return await afn(state)
+        finally:
+            NODE_LATENCY.observe(time.perf_counter() - t0, name)
+    return timed, atimed
 
-def node_prioritize(state: PipelineState) -> PipelineState:
-    state.alert = score(state.alert)
-    return state
+def _node(fn, afn=None) -> RunnableLambda:
+    """
+    Wrap a node so the graph supports both invoke() and ainvoke(), timing each
+    call into the pipeline_node_seconds histogram.
+    CPU-only nodes get an inline async twin so ainvoke() doesn't hop to a thread for them.
+    """
+    return RunnableLambda(*_timed(fn, afn), name=fn.__name__)
 
-def node_persist(state: PipelineState) -> PipelineState:
-    persist_alert(state.alert)
-    return state
+def _chain(name: str, *steps) -> RunnableLambda:
+    """
+    Several node functions run back to back as one graph node, each still timed
+    under its own name. LangGraph advances in supersteps: as separate nodes,
+    osint would wait for the step in which detect's LLM call is still running.
+    """
+    pairs = [_timed(*s) for s in steps]
 
-def build_graph():
+    def run(state: PipelineState) -> Update:
+        out: Update = {}
+        for fn, _ in pairs:
+            upd = fn(state)
+            for k, v in upd.items():
+                setattr(state, k, v)  # this task's own copy of the state
+            out.update(upd)
+        return out
+
+    async def arun(state: PipelineState) -> Update:
+        out: Update = {}
+        for _, afn in pairs:
+            upd = await afn(state)
+            for k, v in upd.items():
+                setattr(state, k, v)
+            out.update(upd)
+        return out
+    return RunnableLambda(run, afunc=arun, name=name)
+
+def build_graph(aggregator: Aggregator | None = AGGREGATOR,
+                window_stats: WindowStats | None = WINDOW_STATS):
+    """
+    window_stats (WINDOW_SECONDS) counts every event, duplicates included, before
+    aggregator (AGG_WINDOW) dedups in front of detect; None skips either stage.
+    """
     g = StateGraph(PipelineState)
-    g.add_node("detect", node_detect)
-    g.add_node("extract", node_extract)
-    g.add_node("osint", node_osint)
-    g.add_node("mitre", node_mitre)
-    g.add_node("prioritize", node_prioritize)
-    g.add_node("persist", node_persist)
-
-    g.add_edge(START, "detect")
-    g.add_edge("detect", "extract")
-    g.add_edge("extract", "osint")
-    g.add_edge("osint", "mitre")
+    g.add_node("detect", _node(node_detect, anode_detect))
+    g.add_node("enrich", _chain("enrich", (node_extract,), (node_osint, anode_osint)))
+    g.add_node("mitre", _node(node_mitre))
+    g.add_node("prioritize", _node(node_prioritize))
+    g.add_node("persist", _node(*_persist_nodes(aggregator)))
+
+    entry = START
+    if window_stats is not None:
+        g.add_node("window", _node(_window_node(window_stats)))
+        g.add_edge(entry, "window")
+        entry = "window"
+    if aggregator is not None:
+        g.add_node("aggregate", _node(_aggregate_node(aggregator)))
+        g.add_edge(entry, "aggregate")
+        g.add_conditional_edges("aggregate", lambda s: END if s.duplicate else ["detect", "enrich"],
+                                [END, "detect", "enrich"])
+    else:
+        g.add_edge(entry, "detect")
+        g.add_edge(entry, "enrich")
+    # fan out: detection and IOC enrichment are independent; mitre waits for both
+    g.add_edge(["detect", "enrich"], "mitre")
     g.add_edge("mitre", "prioritize")
     g.add_edge("prioritize", "persist")
     g.add_edge("persist", END)
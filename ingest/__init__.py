@@ -0,0 +1,8 @@
+# ingest/__init__.py
+# Streaming ingestion from log files and syslog, outside the HTTP API. Run from the repo root:
+#   python -m ingest /var/log/auth.log --rotated --checkpoint ingest.ckpt   # backfill, resumable
+#   python -m ingest /var/log/auth.log --follow                             # tail -F
+#   python -m ingest --syslog-udp 0.0.0.0:5514 --syslog-tcp 0.0.0.0:5514   # local listener
+#   zcat old.ndjson.gz | python -m ingest -
+# sources.py reads files (large buffered reads / gzip / tail), syslog.py parses and listens,
+# checkpoint.py keeps resume offsets, pipeline.py runs events through the graph.
@@ -0,0 +1,107 @@
+# ingest/__main__.py
+#   python -m ingest [PATH ...|-] [--format auto|ndjson|text|syslog] [--rotated] [--follow]
+#                    [--checkpoint FILE] [--concurrency 64] [--workers N] [--syslog-udp HOST:PORT] [--syslog-tcp HOST:PORT]
+import argparse, asyncio, os, signal, sys
+from typing import Optional, Tuple
+
+from ingest.checkpoint import Checkpoints
+from ingest.pipeline import FORMATS, Ingestor, report
+from ingest.sources import rotated
+from ingest.syslog import SyslogListener
+
+CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "64"))
+QUEUE_SIZE = int(os.getenv("INGEST_SYSLOG_QUEUE", "10000"))  # listener -> graph backlog
+
+def _addr(s: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not s:
+        return None
+    host, _, port = s.rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+async def run(args: argparse.Namespace, graph) -> Ingestor:
+    ing = Ingestor(graph, concurrency=args.concurrency,
+                   checkpoints=Checkpoints(args.checkpoint), poll=args.poll)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, ing.stop.set)
+
+    listener = None
+    if args.syslog_udp or args.syslog_tcp:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        listener = SyslogListener(queue, udp=_addr(args.syslog_udp), tcp=_addr(args.syslog_tcp))
+        await listener.start()
+        print(f"ingest: syslog on {listener.addresses()}", file=sys.stderr)
+
+    reporter = asyncio.create_task(report(ing, args.progress)) if args.progress > 0 else None
+    try:
+        async def files():
+            live = [p for p in args.paths if p != "-"]
+            for path in live:
+                for old in (rotated(path) if args.rotated else []):
+                    await ing.backfill(old, args.format)
+                if not args.follow:
+                    await ing.backfill(path, args.format)
+            if "-" in args.paths:
+                await ing.stdin(args.format)
+            if args.follow and live:
+                await ing.tail(live, args.format)
+
+        jobs = [files()]
+        if listener is not None:
+            jobs.append(ing.listen(queue, "syslog" if args.format == "auto" else args.format))
+        await asyncio.gather(*jobs)
+    finally:
+        if listener is not None:
+            listener.close()
+        await ing.drain()
+        if reporter is not None:
+            reporter.cancel()
+    return ing
+
+def _shutdown(pool) -> None:
+    # same as the API's shutdown hook: final counts of open groups, then drain the writer
+    if pool is not None:
+        pool.close()
+        return
+    from agents.aggregate import AGGREGATOR
+    from storage.es import persist_alert, writer
+    if AGGREGATOR is not None:
+        for a in AGGREGATOR.flush():
+            persist_alert(a)
+    writer.close()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m ingest", description="Stream log files or syslog through the pipeline.")
+    ap.add_argument("paths", nargs="*", help="log files (.gz allowed); - reads stdin")
+    ap.add_argument("--format", choices=FORMATS, default="auto", help="auto: decided per file from its first line")
+    ap.add_argument("--rotated", action="store_true", help="backfill rotated siblings (x.log.1, x.log.2.gz, ...) first")
+    ap.add_argument("--follow", action="store_true", help="keep tailing the files, across rotations")
+    ap.add_argument("--checkpoint", default=os.getenv("INGEST_CHECKPOINT") or None,
+                    help="JSON file with per-file offsets; restarts resume from it")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY, help="events in flight")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("POOL_WORKERS", "0")),
+                    help="run the graph in N worker processes sharded by POOL_KEY (pool.py)")
+    ap.add_argument("--syslog-udp", metavar="HOST:PORT")
+    ap.add_argument("--syslog-tcp", metavar="HOST:PORT")
+    ap.add_argument("--poll", type=float, default=0.5, help="idle wait when following, seconds")
+    ap.add_argument("--progress", type=float, default=10.0, help="stats to stderr every N seconds (0: off)")
+    args = ap.parse_args()
+    if not args.paths and not (args.syslog_udp or args.syslog_tcp):
+        ap.error("nothing to read: give files, - or a syslog listener")
+
+    # heavy imports after argument parsing, so --help stays fast
+    pool = None
+    if args.workers > 0:
+        from pool import ShardedPool
+        graph = pool = ShardedPool(args.workers)
+    else:
+        from graph import build_graph
+        graph = build_graph()
+    try:
+        ing = asyncio.run(run(args, graph))
+    finally:
+        _shutdown(pool)
+    print(ing.progress(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# ingest/checkpoint.py
+from __future__ import annotations
+import hashlib, json, os, time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+HEAD_BYTES = 256  # fingerprint length: tells a reused inode from the file we saw
+
+def file_id(st: os.stat_result) -> str:
+    # device:inode survives logrotate's rename, so app.log -> app.log.1 keeps its offset
+    return f"{st.st_dev}:{st.st_ino}"
+
+def _head(path: str, n: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(n), digest_size=8).hexdigest()
+
+class Checkpoints:
+    """
+    Per-file resume offsets in a small JSON file, written atomically:
+    file_id -> {"path", "offset", "head", "head_len", "done"}.
+
+    offset is in the file's line stream (decompressed bytes for .gz). An entry
+    is only trusted while the first head_len bytes of the file still hash to
+    head, so a new file that reuses an old inode starts from 0.
+    """
+
+    def __init__(self, path: Optional[str], interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._saved = time.monotonic()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def open(self, path: str, st: os.stat_result) -> Tuple[str, int, bool]:
+        """-> (file_id, offset to resume from, done) for a file about to be read."""
+        fid = file_id(st)
+        e = self.files.get(fid)
+        if e is not None and e["head_len"] <= st.st_size and _head(path, e["head_len"]) == e["head"]:
+            e["path"] = path
+            return fid, e["offset"], e.get("done", False)
+        n = min(HEAD_BYTES, st.st_size)
+        self.files[fid] = {"path": path, "offset": 0, "head": _head(path, n), "head_len": n, "done": False}
+        self._dirty = True
+        return fid, 0, False
+
+    def commit(self, fid: str, offset: int, done: bool = False) -> None:
+        e = self.files.get(fid)
+        if e is not None and (offset > e["offset"] or done):
+            e["offset"] = max(offset, e["offset"])
+            e["done"] = e.get("done", False) or done
+            self._dirty = True
+
+    def maybe_save(self) -> None:
+        if self._dirty and time.monotonic() - self._saved >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        self._saved = time.monotonic()
+        if not self.path or not self._dirty:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+class Watermark:
+    """
+    Events finish out of order under concurrency; a file's offset may only move
+    past a line once every earlier line of it is done. add() registers lines in
+    read order, finish() marks one done and returns the offsets now safe to commit.
+    """
+
+    def __init__(self):
+        self._pending: Deque[List[Any]] = deque()  # [file_id, offset, eof, done]
+
+    def add(self, fid: Optional[str], offset: int, eof: bool = False) -> List[Any]:
+        entry = [fid, offset, eof, False]
+        self._pending.append(entry)
+        return entry
+
+    def finish(self, entry: List[Any]) -> List[Tuple[str, int, bool]]:
+        entry[3] = True
+        out = []
+        while self._pending and self._pending[0][3]:
+            fid, offset, eof, _ = self._pending.popleft()
+            if fid is not None:
+                out.append((fid, offset, eof))
+        return out
+
+    def __len__(self) -> int:
+        return len(self._pending)
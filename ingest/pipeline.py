@@ -0,0 +1,205 @@
+# ingest/pipeline.py
+from __future__ import annotations
+import asyncio, json, os, sys, time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from ingest.checkpoint import Checkpoints, Watermark
+from ingest.sources import READ_SIZE, follow, read_lines
+from ingest.syslog import parse_syslog
+
+FORMATS = ("auto", "ndjson", "text", "syslog")
+
+Event = Dict[str, Any]
+
+def _unwrap(item: Any) -> Event:
+    # same shapes as /ingest/batch: {"event": {...}} or a bare event object
+    if not isinstance(item, dict):
+        raise ValueError("event must be a JSON object")
+    if len(item) == 1 and isinstance(item.get("event"), dict):
+        return item["event"]
+    return item
+
+def _ndjson(line: str) -> Event:
+    return _unwrap(json.loads(line))
+
+def _text(line: str) -> Event:
+    return {"event": line}
+
+def _syslog(line: str) -> Event:
+    return parse_syslog(line) or {"event": line}
+
+_PARSERS: Dict[str, Callable[[str], Event]] = {"ndjson": _ndjson, "text": _text, "syslog": _syslog}
+
+def sniff(line: str) -> str:
+    if line.lstrip().startswith("{"):
+        return "ndjson"
+    return "syslog" if parse_syslog(line) is not None else "text"
+
+class LineParser:
+    """bytes -> event, None for blank lines, or the exception for a bad line. "auto" decides on the first line."""
+
+    def __init__(self, fmt: str = "auto"):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format: {fmt!r}")
+        self.fmt = fmt
+        self._parse = _PARSERS.get(fmt)
+
+    def __call__(self, raw: bytes) -> Event | Exception | None:
+        line = raw.decode("utf-8", "replace").rstrip("\r")
+        if not line.strip():
+            return None
+        if self._parse is None:
+            self.fmt = sniff(line)
+            self._parse = _PARSERS[self.fmt]
+        try:
+            return self._parse(line)
+        except ValueError as e:  # JSONDecodeError included
+            return e
+
+class Ingestor:
+    """
+    Feeds events to the graph with at most `concurrency` in flight. Reading
+    only continues when a slot frees up, so memory stays flat however large the
+    input. File offsets are committed to `checkpoints` once every earlier line
+    of that file has finished (see Watermark).
+    """
+
+    def __init__(self, graph, concurrency: int = 64, checkpoints: Optional[Checkpoints] = None,
+                 poll: float = 0.5):
+        self.graph = graph
+        self.concurrency = concurrency
+        self.checkpoints = checkpoints or Checkpoints(None)
+        self.poll = poll
+        self.stop = asyncio.Event()
+        self.watermark = Watermark()
+        self.pending: Set[asyncio.Task] = set()
+        self.stats = {"lines": 0, "events": 0, "errors": 0, "parse_errors": 0, "duplicates": 0}
+        self.started = time.monotonic()
+
+    async def submit(self, item: Event | Exception | None, fid: Optional[str] = None,
+                     end: int = 0, eof: bool = False) -> None:
+        mark = self.watermark.add(fid, end, eof)
+        self.stats["lines"] += 1
+        if not isinstance(item, dict):
+            if item is not None:
+                self.stats["parse_errors"] += 1
+            self._finished(mark)
+            if self.stats["lines"] % 1024 == 0:
+                await asyncio.sleep(0)  # a run of bad lines still lets the loop breathe
+            return
+        while len(self.pending) >= self.concurrency:
+            await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+        t = asyncio.create_task(self._run(item))
+        self.pending.add(t)
+        t.add_done_callback(lambda t, mark=mark: self._done(t, mark))
+
+    async def _run(self, event: Event) -> None:
+        out = await self.graph.ainvoke({"event": event})
+        if out.get("duplicate"):
+            self.stats["duplicates"] += 1
+
+    def _done(self, t: asyncio.Task, mark: List[Any]) -> None:
+        self.pending.discard(t)
+        if t.cancelled() or t.exception() is not None:
+            self.stats["errors"] += 1
+            if not t.cancelled() and self.stats["errors"] <= 5:
+                print(f"ingest: event failed: {t.exception()!r}", file=sys.stderr)
+        else:
+            self.stats["events"] += 1
+        self._finished(mark)
+
+    def _finished(self, mark: List[Any]) -> None:
+        for fid, offset, eof in self.watermark.finish(mark):
+            self.checkpoints.commit(fid, offset, done=eof)
+        self.checkpoints.maybe_save()
+
+    # -- sources --
+    async def backfill(self, path: str, fmt: str = "auto") -> None:
+        """A whole file from its checkpoint; .gz archives are marked done at the end."""
+        fid, offset, done = self.checkpoints.open(path, os.stat(path))
+        if done:
+            return
+        parse = LineParser(fmt)
+        end = offset
+        for raw, end in read_lines(path, offset):
+            if self.stop.is_set():
+                return
+            await self.submit(parse(raw), fid, end)
+        if path.endswith(".gz"):
+            self._finished(self.watermark.add(fid, end, eof=True))
+
+    async def tail(self, paths: Iterable[str], fmt: str = "auto", burst: int = 1000) -> None:
+        """Follow files (tail -F) round-robin until stop; `burst` lines per file per turn."""
+        tails = []
+        for path in paths:
+            st = os.stat(path)
+            fid, offset, _ = self.checkpoints.open(path, st)
+            tails.append({"path": path, "lines": follow(path, offset), "parse": LineParser(fmt),
+                          "ino": (st.st_dev, st.st_ino), "fid": fid})
+        try:
+            while not self.stop.is_set():
+                idle = True
+                for t in tails:
+                    for _ in range(burst):
+                        item = next(t["lines"])
+                        if item is None:
+                            break
+                        idle = False
+                        st, raw, end = item
+                        if (st.st_dev, st.st_ino) != t["ino"]:  # rotated: a new file under the same path
+                            t["ino"] = (st.st_dev, st.st_ino)
+                            t["fid"] = self.checkpoints.open(t["path"], st)[0]
+                        await self.submit(t["parse"](raw), t["fid"], end)
+                if idle:
+                    self.checkpoints.maybe_save()
+                    try:
+                        await asyncio.wait_for(self.stop.wait(), self.poll)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for t in tails:
+                t["lines"].close()
+
+    async def stdin(self, fmt: str = "auto") -> None:
+        """Stream from stdin (no checkpoint); reads happen off the event loop."""
+        loop = asyncio.get_running_loop()
+        parse, rest = LineParser(fmt), b""
+        read = sys.stdin.buffer.read1
+        while not self.stop.is_set():
+            chunk = await loop.run_in_executor(None, read, READ_SIZE)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            for raw in lines:
+                await self.submit(parse(raw))
+        if rest:
+            await self.submit(parse(rest))
+
+    async def listen(self, queue: asyncio.Queue, fmt: str = "syslog") -> None:
+        """Events from a SyslogListener queue until stop."""
+        parse = LineParser(fmt)
+        while not self.stop.is_set():
+            try:
+                raw = await asyncio.wait_for(queue.get(), self.poll)
+            except asyncio.TimeoutError:
+                continue
+            await self.submit(parse(raw))
+
+    async def drain(self) -> None:
+        """Wait for in-flight events, then write the checkpoint."""
+        while self.pending:
+            await asyncio.wait(self.pending)
+        self.checkpoints.save()
+
+    def progress(self) -> str:
+        s = self.stats
+        el = max(time.monotonic() - self.started, 1e-9)
+        return (f"ingest: {s['lines']} lines, {s['events']} events ({s['events'] / el:.0f}/s), "
+                f"{s['duplicates']} duplicates, {s['errors']} failed, {s['parse_errors']} unparsable, "
+                f"{len(self.pending)} in flight")
+
+async def report(ing: Ingestor, every: float) -> None:
+    while True:
+        await asyncio.sleep(every)
+        print(ing.progress(), file=sys.stderr)
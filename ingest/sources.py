@@ -0,0 +1,114 @@
+# ingest/sources.py
+# Line readers over log files. Every reader yields (line, end) where end is the
+# offset just past the line's newline, i.e. where a restart should resume.
+from __future__ import annotations
+import gzip, os, re
+from typing import Iterator, List, Optional, Tuple
+
+READ_SIZE = int(os.getenv("INGEST_READ_SIZE", str(1 << 20)))  # buffered / gzip read chunk
+
+Line = Tuple[bytes, int]
+
+# logrotate names: app.log.1, app.log.2.gz (higher = older) or app.log-20250814[.gz]
+_NUM_RE = re.compile(r"\.(\d+)(?:\.gz)?$")
+_DATE_RE = re.compile(r"-(\d{8,10})(?:\.gz)?$")
+
+def rotated(path: str) -> List[str]:
+    """path's rotated siblings, oldest first (dated ones by date, numbered ones highest first)."""
+    d, base = os.path.split(path)
+    d = d or "."
+    dated, numbered = [], []
+    for name in os.listdir(d):
+        if not name.startswith(base) or name == base:
+            continue
+        rest = name[len(base):]
+        if m := _NUM_RE.fullmatch(rest):
+            numbered.append((-int(m.group(1)), os.path.join(d, name)))
+        elif m := _DATE_RE.fullmatch(rest):
+            dated.append((m.group(1), os.path.join(d, name)))
+    return [p for _, p in sorted(dated)] + [p for _, p in sorted(numbered)]
+
+def read_lines(path: str, offset: int = 0) -> Iterator[Line]:
+    """
+    Whole file from offset in READ_SIZE chunks split in C (bytes.split), about
+    twice the line rate of walking an mmap line by line. Plain files are read up
+    to their size at open time: lines appended meanwhile are left for the next read.
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            if offset:
+                f.seek(offset)  # decompresses up to offset, nothing is parsed
+            yield from _chunked(f, offset)
+        return
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > offset:
+            f.seek(offset)
+            yield from _chunked(f, offset, size - offset)
+
+def _chunked(f, offset: int, limit: Optional[int] = None) -> Iterator[Line]:
+    """Split chunks of f into lines; at most limit bytes if given. A final line without newline is yielded too."""
+    pos, rest = offset, b""
+    while limit is None or limit > 0:
+        chunk = f.read(READ_SIZE if limit is None else min(READ_SIZE, limit))
+        if not chunk:
+            break
+        if limit is not None:
+            limit -= len(chunk)
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            pos += len(line) + 1
+            yield line, pos
+    if rest:
+        yield rest, pos + len(rest)
+
+def follow(path: str, offset: int = 0) -> Iterator[Optional[Tuple[os.stat_result, bytes, int]]]:
+    """
+    tail -F: yields (stat of the file being read, line, end) as the file grows and
+    None whenever it is idle, so the caller can sleep. When path is rotated away
+    (new inode) the old file is read to its end first, then the new one from 0;
+    a truncated file starts over from 0. Partial lines wait for their newline
+    (or for the rotation).
+    """
+    f = None
+    rest = b""
+    pos = offset
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(path, "rb", buffering=0)
+                except FileNotFoundError:
+                    yield None  # between logrotate's rename and the new file
+                    continue
+                st = os.fstat(f.fileno())
+                if st.st_size < pos:
+                    pos = 0
+                f.seek(pos)
+            chunk = f.read(READ_SIZE)
+            if chunk:
+                lines = (rest + chunk).split(b"\n")
+                rest = lines.pop()
+                for line in lines:
+                    pos += len(line) + 1
+                    yield st, line, pos
+                continue
+            try:
+                now = os.stat(path)
+            except FileNotFoundError:
+                now = None
+            if now is not None and (now.st_ino, now.st_dev) != (st.st_ino, st.st_dev):
+                if rest:  # the rotated file's last line had no newline
+                    yield st, rest, pos + len(rest)
+                f.close()  # old file fully read
+                f, rest, pos = None, b"", 0
+                continue
+            if now is not None and now.st_size < pos:
+                f.seek(0)  # truncated in place (copytruncate)
+                rest, pos = b"", 0
+                continue
+            yield None
+    finally:
+        if f is not None:
+            f.close()
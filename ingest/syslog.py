@@ -0,0 +1,116 @@
+# ingest/syslog.py
+# RFC 5424 / RFC 3164 parsing and a local UDP + TCP listener feeding an asyncio.Queue.
+from __future__ import annotations
+import asyncio, re
+from typing import Any, Dict, Optional, Tuple
+
+_FACILITIES = ("kern", "user", "mail", "daemon", "auth", "syslog", "lpr", "news", "uucp", "cron",
+               "authpriv", "ftp", "ntp", "audit", "alert", "clock") + tuple(f"local{i}" for i in range(8))
+_SEVERITIES = ("emerg", "alert", "crit", "err", "warning", "notice", "info", "debug")
+
+# <PRI>1 TIMESTAMP HOST APP PROCID MSGID [SD]... MSG
+_RFC5424 = re.compile(r"<(\d{1,3})>1 (\S+) (\S+) (\S+) (\S+) (\S+) (-|(?:\[(?:[^\]\\]|\\.)*\])+) ?(.*)", re.S)
+# [<PRI>]Mmm dd hh:mm:ss HOST TAG[PID]: MSG  (files written by rsyslog usually have no PRI)
+_RFC3164 = re.compile(r"(?:<(\d{1,3})>)?([A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (\S+) ([^\s:\[]+)(?:\[(\d+)\])?: ?(.*)", re.S)
+# sshd-style "... for [invalid user] NAME from IP ...": keys the window stats and aggregator use
+_SRC_RE = re.compile(r"\bfrom (\d{1,3}(?:\.\d{1,3}){3})\b")
+_USER_RE = re.compile(r"\bfor (?:invalid user )?([\w.@-]+) from\b")
+
+def _nil(v: str) -> Optional[str]:
+    return None if v == "-" else v
+
+def parse_syslog(line: str) -> Optional[Dict[str, Any]]:
+    """Event dict for one syslog line ("event" is the message), or None if it isn't syslog."""
+    if m := _RFC5424.match(line):
+        pri, ts, host, app, pid, msgid, _sd, msg = m.groups()
+        ev = {"event": msg, "ts": _nil(ts), "host": _nil(host), "app": _nil(app),
+              "pid": _nil(pid), "msgid": _nil(msgid)}
+    elif m := _RFC3164.match(line):
+        pri, ts, host, app, pid, msg = m.groups()
+        ev = {"event": msg, "ts": ts, "host": host, "app": app, "pid": pid}
+    else:
+        return None
+    if pri is not None:
+        p = int(pri)
+        ev["facility"] = _FACILITIES[p >> 3] if p >> 3 < len(_FACILITIES) else str(p >> 3)
+        ev["severity"] = _SEVERITIES[p & 7]
+    if m := _SRC_RE.search(msg):
+        ev["src_ip"] = m.group(1)
+    if m := _USER_RE.search(msg):
+        ev["user"] = m.group(1)
+    return {k: v for k, v in ev.items() if v is not None}
+
+class _UDP(asyncio.DatagramProtocol):
+    def __init__(self, listener: "SyslogListener"):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        # no backpressure over UDP: a full queue drops, and the drop is counted
+        try:
+            self.listener.queue.put_nowait(data)
+            self.listener.received += 1
+        except asyncio.QueueFull:
+            self.listener.dropped += 1
+
+class SyslogListener:
+    """
+    UDP datagrams and TCP streams (newline-delimited or RFC 6587 octet-counted
+    "LEN MSG") as raw lines on a bounded queue. TCP readers wait when the queue
+    is full, so senders slow down instead of the listener growing.
+    """
+
+    def __init__(self, queue: asyncio.Queue, udp: Optional[Tuple[str, int]] = None,
+                 tcp: Optional[Tuple[str, int]] = None, max_line: int = 64 * 1024):
+        self.queue = queue
+        self.udp, self.tcp = udp, tcp
+        self.max_line = max_line
+        self.received = self.dropped = 0
+        self._transport = None
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.udp:
+            self._transport, _ = await loop.create_datagram_endpoint(lambda: _UDP(self), local_addr=self.udp)
+        if self.tcp:
+            self._server = await asyncio.start_server(self._client, *self.tcp, limit=self.max_line)
+
+    def addresses(self) -> Dict[str, Tuple[str, int]]:
+        out = {}
+        if self._transport is not None:
+            out["udp"] = self._transport.get_extra_info("sockname")[:2]
+        if self._server is not None:
+            out["tcp"] = self._server.sockets[0].getsockname()[:2]
+        return out
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await self._frame(reader)
+                if line is None:
+                    break
+                await self.queue.put(line)
+                self.received += 1
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError,
+                asyncio.CancelledError):  # cancelled: shutting down, the connection just ends
+            pass
+        finally:
+            writer.close()
+
+    async def _frame(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        first = await reader.read(1)
+        if not first:
+            return None
+        if first.isdigit():
+            # octet counting: "<len> <msg>"; a line that merely starts with a digit falls through
+            head = first + await reader.readuntil(b" ")
+            if head[:-1].isdigit() and int(head[:-1]) <= self.max_line:
+                return await reader.readexactly(int(head[:-1]))
+            return (head + await reader.readline()).rstrip(b"\r\n")
+        return (first + await reader.readline()).rstrip(b"\r\n")
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+        if self._server is not None:
+            self._server.close()
@@ -0,0 +1,136 @@
+# live.py
+from __future__ import annotations
+import os, threading, time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Aggregates behind the live SOC view (app_gradio.py, GET /live). Every alert
+# the API returns is folded in once, in O(1); the view reads a snapshot whose
+# size depends on the window and the top-N, never on how many alerts went by.
+#
+# Same ring scheme as agents/window_stats.py: one slot per minute, zeroed when
+# the ring comes back round to it. Per-slot key counters are Misra-Gries
+# summaries of at most `top_capacity` keys, so a flood of distinct source IPs
+# can't grow them; any key with more than 1/capacity of a minute's alerts is
+# kept, and kept counts undercount by at most that much.
+
+SEVERITIES = ("low", "medium", "high", "critical")
+
+def _bump(counter: Dict[str, int], key: str, cap: int) -> None:
+    if key in counter:
+        counter[key] += 1
+    elif len(counter) < cap:
+        counter[key] = 1
+    else:
+        # full: decrement everyone (the new key included, so it isn't added).
+        # Amortized O(1): each decrement undoes one earlier increment.
+        for k in [k for k, v in counter.items() if v == 1]:
+            del counter[k]
+        for k in counter:
+            counter[k] -= 1
+
+class _Minute:
+    __slots__ = ("epoch", "total", "severity", "techniques", "sources")
+
+    def __init__(self) -> None:
+        self.epoch = -1
+        self.total = 0
+        self.severity = dict.fromkeys(SEVERITIES, 0)
+        self.techniques: Dict[str, int] = {}
+        self.sources: Dict[str, int] = {}
+
+    def reset(self, epoch: int) -> None:
+        self.epoch, self.total = epoch, 0
+        self.severity = dict.fromkeys(SEVERITIES, 0)
+        self.techniques, self.sources = {}, {}
+
+def _fields(alert: Any) -> Tuple[str, List[Tuple[str, str]], str, Dict[str, Any]]:
+    """(severity, [(technique_id, technique)], src_ip, recent row) of an AlertRec, RemoteAlert or dict."""
+    if hasattr(alert, "mitre") and hasattr(alert, "raw"):  # AlertRec: no serialization
+        raw, det, sev = alert.raw, alert.detection, alert.severity
+        mitre = [(m.technique_id, m.technique) for m in alert.mitre]
+        label, ts = det.label, alert.ts.isoformat()
+    else:
+        d = alert.to_dict() if hasattr(alert, "to_dict") else alert
+        raw, sev = d.get("raw") or {}, d.get("severity")
+        mitre = [(m.get("technique_id", ""), m.get("technique", "")) for m in d.get("mitre") or []]
+        label, ts = (d.get("detection") or {}).get("label", ""), d.get("ts", "")
+    sev = (sev or "low").lower()
+    src = str(raw.get("src_ip") or "")
+    row = {"time": ts, "severity": sev, "label": label, "event": str(raw.get("event", ""))[:200],
+           "source_ip": src, "techniques": ", ".join(t for t, _ in mitre)}
+    return sev, mitre, src, row
+
+class LiveStats:
+    def __init__(self, window_minutes: int = 60, top_capacity: int = 256, recent: int = 50,
+                 clock: Callable[[], float] = time.time):
+        self.window = window_minutes
+        self.top_capacity = top_capacity
+        self.clock = clock
+        self.slots = [_Minute() for _ in range(window_minutes)]
+        self.recent: deque = deque(maxlen=recent)
+        self.names: Dict[str, str] = {}  # technique id -> name; bounded by the rule set
+        self.seen = 0
+        self._lock = threading.Lock()
+
+    def add(self, alert: Any) -> None:
+        if alert is None:
+            return
+        sev, mitre, src, row = _fields(alert)
+        e = int(self.clock() // 60)
+        with self._lock:
+            slot = self.slots[e % self.window]
+            if slot.epoch != e:
+                slot.reset(e)
+            slot.total += 1
+            slot.severity[sev] = slot.severity.get(sev, 0) + 1
+            for tid, name in mitre:
+                _bump(slot.techniques, tid, self.top_capacity)
+                self.names.setdefault(tid, name)
+            if src:
+                _bump(slot.sources, src, self.top_capacity)
+            self.recent.appendleft(row)
+            self.seen += 1
+
+    def snapshot(self, top: int = 10, recent: Optional[int] = None) -> Dict[str, Any]:
+        """JSON-ready view of the window; O(window * top_capacity) at most."""
+        e = int(self.clock() // 60)
+        severity = dict.fromkeys(SEVERITIES, 0)
+        techniques: Counter = Counter()
+        sources: Counter = Counter()
+        per_minute = []
+        with self._lock:
+            for m in range(e - self.window + 1, e + 1):
+                slot = self.slots[m % self.window]
+                live = slot.epoch == m
+                per_minute.append([datetime.fromtimestamp(m * 60, timezone.utc).strftime("%H:%M"),
+                                   slot.total if live else 0])
+                if not live:
+                    continue
+                for k, v in slot.severity.items():
+                    severity[k] = severity.get(k, 0) + v
+                techniques.update(slot.techniques)
+                sources.update(slot.sources)
+            rows = list(self.recent)[:recent] if recent is not None else list(self.recent)
+            seen = self.seen
+        return {
+            "window_minutes": self.window,
+            "total": sum(n for _, n in per_minute),
+            "seen": seen,
+            "severity": severity,
+            "top_techniques": [[t, self.names.get(t, ""), n] for t, n in techniques.most_common(top)],
+            "top_sources": [[s, n] for s, n in sources.most_common(top)],
+            "per_minute": per_minute,
+            "recent": rows,
+        }
+
+def live_from_env() -> LiveStats | None:
+    """LIVE_WINDOW_MINUTES (default 60; 0 disables), LIVE_TOP_CAPACITY, LIVE_RECENT."""
+    window = int(os.getenv("LIVE_WINDOW_MINUTES", "60"))
+    if window <= 0:
+        return None
+    return LiveStats(window, top_capacity=int(os.getenv("LIVE_TOP_CAPACITY", "256")),
+                     recent=int(os.getenv("LIVE_RECENT", "50")))
+
+LIVE: Optional[LiveStats] = live_from_env()
@@ -1,23 +1,321 @@
 # main.py
-from fastapi import FastAPI
+import asyncio, json, os, threading, time
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
-from graph import build_graph, PipelineState
+from typing import Dict, Any, AsyncIterator, Literal, Optional, Tuple
+from live import LIVE
+from agents import detect as detect_agent, osint as osint_agent
+from agents.aggregate import AGGREGATOR
+from agents.window_stats import WINDOW_STATS
+from metrics import REGISTRY
+from pool import ShardedPool
+from profiler import SamplingProfiler
+from storage.es import persist_alert, writer as alert_writer
+from storage.sqlite_store import get_store
 
 app = FastAPI(title="MITRE Attack Orchestrator")
-graph = build_graph()
+# POOL_WORKERS > 0: this process only routes; events run in that many worker
+# processes, sharded by POOL_KEY (see pool.py)
+POOL_WORKERS = int(os.getenv("POOL_WORKERS", "0"))
+pool = ShardedPool(POOL_WORKERS) if POOL_WORKERS > 0 else None
+# The graph (LangGraph and every agent, ~1 s) is built by the startup warm-up, in a
+# thread, not at import; GET /ready turns 200 once it and the LLM client are up.
+# A request that arrives first builds it itself. With a pool, this process never
+# imports the graph at all.
+_graph = None
+_graph_lock = threading.Lock()
+warmup: Dict[str, Any] = {"ready": False, "steps_ms": {}, "provider": None, "error": None}
+
+def get_graph():
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                if pool is not None:
+                    _graph = pool
+                else:
+                    from graph import build_graph
+                    _graph = build_graph()
+    return _graph
+
+async def _agraph():
+    return _graph if _graph is not None else await asyncio.to_thread(get_graph)
+
+def _warm_up() -> None:
+    def step(name, fn):
+        t0 = time.perf_counter()
+        fn()
+        warmup["steps_ms"][name] = round((time.perf_counter() - t0) * 1000, 1)
+    try:
+        step("graph", get_graph)
+        if pool is None:  # pool workers warm their own clients
+            step("llm", detect_agent.warm_llm)
+            if detect_agent.PING_ERROR:  # still ready: events use the heuristic meanwhile
+                warmup["error"] = "llm ping: " + detect_agent.PING_ERROR
+        warmup["provider"] = detect_agent.PROVIDER
+        warmup["ready"] = True
+    except Exception as e:
+        warmup["error"] = repr(e)
+
+# Max events of one /ingest/batch request running through the graph at once.
+BATCH_CONCURRENCY = int(os.getenv("INGEST_BATCH_CONCURRENCY", "32"))
 
 class EventIn(BaseModel):
     event: Dict[str, Any]
 
+@app.on_event("startup")
+def _start():
+    if pool is not None:
+        pool.start()
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def _drain_alerts():
+    # flush queued alerts (and final counts of open aggregation groups) before the process exits
+    if pool is not None:
+        pool.close()  # each worker drains its own
+    if AGGREGATOR is not None:
+        for a in AGGREGATOR.flush():
+            persist_alert(a)
+    alert_writer.close()
+
+@app.get("/ready")
+def ready():
+    """200 once warm-up is done (graph built, LLM client created), 503 until then."""
+    if not warmup["ready"]:
+        raise HTTPException(status_code=503, detail=warmup)
+    return warmup
+
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {"ok": True, "alert_writer": alert_writer.metrics(),
+            "aggregator": AGGREGATOR.stats() if AGGREGATOR is not None else None,
+            "window_stats": WINDOW_STATS.stats() if WINDOW_STATS is not None else None,
+            "detect_cache": detect_agent.cache_stats(),
+            "pool": pool.stats() if pool is not None else None}
+
+def _collect():
+    # values other modules already keep, read at scrape time
+    c = osint_agent.cache_stats()
+    yield ("osint_cache_hits_total", "counter", "OSINT cache hits.", [({}, c["hits"])])
+    yield ("osint_cache_misses_total", "counter", "OSINT cache misses.", [({}, c["misses"])])
+    yield ("osint_cache_entries", "gauge", "OSINT cache entries in memory.", [({}, c["size"])])
+    providers = {k: v for k, v in osint_agent.provider_stats().items() if isinstance(v, dict)}
+    yield ("osint_provider_calls_total", "counter", "Remote OSINT lookups by provider.",
+           [({"provider": k}, v.get("calls", 0)) for k, v in providers.items()])
+    yield ("osint_provider_errors_total", "counter", "Failed remote OSINT lookups by provider.",
+           [({"provider": k}, v.get("errors", 0)) for k, v in providers.items()])
+    tiers = detect_agent.TIER_COUNTS
+    yield ("detect_resolved_total", "counter", "Detections by tier (keyword, cache, llm, fallback, shed).",
+           [({"tier": k}, v) for k, v in tiers.items()])
+    yield ("detect_heuristic_fallback_total", "counter", "LLM failures answered by the heuristic.",
+           [({}, tiers.get("fallback", 0))])
+    vc = detect_agent.cache_stats()
+    if vc is not None:
+        yield ("detect_cache_hits_total", "counter", "Verdict cache hits.", [({}, vc["hits"])])
+        yield ("detect_cache_misses_total", "counter", "Verdict cache misses.", [({}, vc["misses"])])
+        yield ("detect_cache_evictions_total", "counter", "Verdicts evicted to stay under DETECT_CACHE_SIZE.",
+               [({}, vc["evictions"])])
+        yield ("detect_cache_entries", "gauge", "Verdict cache entries in memory.", [({}, vc["size"])])
+    sched = detect_agent.scheduler
+    if sched is not None:
+        s = sched.stats()
+        yield ("detect_llm_inflight", "gauge", "Events at the chat model now.", [({}, s["inflight"])])
+        yield ("detect_queue_depth", "gauge", "Events waiting for an LLM slot, by priority class.",
+               [({"priority": k}, s["queued"].get(k, 0)) for k in ("high", "normal", "low")])
+    w = alert_writer.metrics()
+    yield ("alert_writer_queue_depth", "gauge", "Alerts waiting for the bulk writer.", [({}, w["queue_depth"])])
+    yield ("alert_writer_written_total", "counter", "Alerts written to the sink.", [({}, w["written"])])
+    yield ("alert_writer_dead_lettered_total", "counter", "Alerts sent to the dead-letter file.",
+           [({}, w["dead_lettered"])])
+    if AGGREGATOR is not None:
+        a = AGGREGATOR.stats()
+        yield ("aggregator_suppressed_total", "counter", "Events folded into an earlier alert.",
+               [({}, a["suppressed"])])
+        yield ("aggregator_groups", "gauge", "Open aggregation groups.", [({}, a["groups"])])
+
+REGISTRY.add_collector(_collect)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# one request at a time may be profiled (the sampler watches the whole event-loop thread)
+_profile_lock = asyncio.Lock()
+
+@app.get("/live")
+def live(top: int = Query(10, ge=1, le=100), recent: int = Query(20, ge=0, le=1000)):
+    """Live-view aggregates over the last LIVE_WINDOW_MINUTES of /ingest traffic (see live.py)."""
+    if LIVE is None:
+        raise HTTPException(status_code=503, detail="live view disabled (LIVE_WINDOW_MINUTES=0)")
+    return LIVE.snapshot(top=top, recent=recent)
 
 @app.post("/ingest")
-def ingest(evt: EventIn):
+async def ingest(evt: EventIn, profile: bool = False):
+    """?profile=true returns a sampling profile of this request alongside the alert."""
     # pass plain dict to the graph
-    state_in = PipelineState(event=evt.event, alert=None).model_dump()
-    out = graph.invoke(state_in)          # <-- returns a dict
-    alert = out.get("alert")              # dict with our Alert fields
-    return {"ok": True, "alert": alert}
+    state_in = {"event": evt.event}
+    report = None
+    if profile:
+        if _profile_lock.locked():
+            raise HTTPException(status_code=409, detail="another request is being profiled")
+        async with _profile_lock:
+            with SamplingProfiler() as prof:
+                out = await (await _agraph()).ainvoke(state_in)
+        report = prof.report()
+    else:
+        out = await (await _agraph()).ainvoke(state_in)   # <-- returns a dict
+    alert = out.get("alert")              # internal AlertRec; validated into Alert only here
+    if LIVE is not None:
+        LIVE.add(alert)
+    # duplicate: folded into an earlier alert (alert is None while that one is still in flight)
+    body = {"ok": True, "alert": alert.to_model() if alert is not None else None,
+            "duplicate": out.get("duplicate", False)}
+    if report is not None:
+        body["profile"] = report
+    return body
+
+def _unwrap(item: Any) -> Dict[str, Any]:
+    # accept both {"event": {...}} (same shape as /ingest) and a bare event dict
+    if not isinstance(item, dict):
+        raise ValueError("event must be a JSON object")
+    if len(item) == 1 and isinstance(item.get("event"), dict):
+        return item["event"]
+    return item
+
+async def _iter_events(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (index, event-or-error) from a JSON array or a streamed NDJSON body."""
+    ctype = request.headers.get("content-type", "").lower()
+    if "ndjson" in ctype or "jsonl" in ctype or "json-seq" in ctype:
+        i, buf = 0, b""
+        async for chunk in request.stream():
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    yield i, _unwrap(json.loads(line))
+                except ValueError as e:
+                    yield i, e
+                i += 1
+        if buf.strip():
+            try:
+                yield i, _unwrap(json.loads(buf))
+            except ValueError as e:
+                yield i, e
+        return
+
+    try:
+        data = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"invalid JSON body: {e}")
+    if isinstance(data, dict) and isinstance(data.get("events"), list):
+        data = data["events"]
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="expected a JSON array or NDJSON body")
+    for i, item in enumerate(data):
+        try:
+            yield i, _unwrap(item)
+        except ValueError as e:
+            yield i, e
+
+async def _run_one(i: int, event: Any) -> bytes:
+    if isinstance(event, Exception):
+        row = {"index": i, "ok": False, "error": str(event)}
+    else:
+        try:
+            out = await (await _agraph()).ainvoke({"event": event})
+            alert = out.get("alert")
+            if LIVE is not None:
+                LIVE.add(alert)
+            row = {"index": i, "ok": True, "alert": alert.to_dict() if alert is not None else None,
+                   "duplicate": out.get("duplicate", False)}
+        except Exception as e:
+            row = {"index": i, "ok": False, "error": str(e)}
+    return (json.dumps(row) + "\n").encode()
+
+async def _run_batch(events: AsyncIterator[Tuple[int, Any]]) -> AsyncIterator[bytes]:
+    """
+    Run events with at most BATCH_CONCURRENCY in flight; yield results in completion
+    order. The next input line is read in its own task and raced against the
+    running events, so a result goes out as soon as it is done, not when the
+    client sends more.
+    """
+    pending: set[asyncio.Task] = set()
+    reader: Optional[asyncio.Task] = None
+    more = True
+
+    async def _next():
+        return await anext(events, None)
+
+    try:
+        while True:
+            if more and reader is None and len(pending) < BATCH_CONCURRENCY:
+                reader = asyncio.create_task(_next())
+            if reader is None and not pending:
+                break
+            done, _ = await asyncio.wait(pending | {reader} if reader is not None else pending,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if reader in done:
+                item, reader = reader.result(), None
+                if item is None:
+                    more = False
+                else:
+                    pending.add(asyncio.create_task(_run_one(*item)))
+            for t in done & pending:
+                pending.discard(t)
+                yield t.result()
+    finally:
+        if reader is not None:
+            reader.cancel()
+        for t in pending:
+            t.cancel()
+
+@app.post("/ingest/batch")
+async def ingest_batch(request: Request):
+    """
+    Accepts a JSON array (or {"events": [...]}) or an NDJSON body
+    (Content-Type: application/x-ndjson) and streams one NDJSON line per
+    event as soon as it finishes: {"index": n, "ok": true, "alert": {...}}.
+    Lines arrive in completion order; use "index" to correlate.
+    """
+    events = _iter_events(request)
+    # pull the first item eagerly so a malformed JSON body is still a 400
+    try:
+        first = await anext(events)
+    except StopAsyncIteration:
+        first = None
+
+    async def _all():
+        if first is None:
+            return
+        yield first
+        async for item in events:
+            yield item
+
+    return StreamingResponse(_run_batch(_all()), media_type="application/x-ndjson")
+
+@app.get("/alerts")
+def list_alerts(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    severity: Optional[Literal["low", "medium", "high", "critical"]] = None,
+    technique: Optional[str] = Query(None, description="MITRE technique id, e.g. T1110"),
+    indicator: Optional[str] = Query(None, description="IOC value, e.g. 203.0.113.45"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """Stored alerts, newest first. Pass next_cursor back as cursor for the next page."""
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="alert store disabled (set ALERT_DB to a SQLite path)")
+    try:
+        alerts, nxt = store.query(since=since, until=until, severity=severity, technique=technique,
+                                  indicator=indicator, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return {"alerts": alerts, "next_cursor": nxt}
@@ -0,0 +1,140 @@
+# metrics.py
+from __future__ import annotations
+import bisect, threading, time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Minimal Prometheus text-format registry (no client library needed).
+# Labelled values live in dicts keyed by label tuples; one lock per metric.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TOKEN_BUCKETS = (32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, n: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + n
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for lv, v in items:
+            yield "_total", dict(zip(self.labels, lv)), v
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._data: Dict[Tuple[str, ...], List[float]] = {}  # per-bucket counts + [sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            d = self._data.get(label_values)
+            if d is None:
+                d = self._data[label_values] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                d[i] += 1
+            d[-2] += value
+            d[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *label_values)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            items = [(lv, list(d)) for lv, d in self._data.items()]
+        for lv, d in items:
+            base = dict(zip(self.labels, lv))
+            acc = 0.0
+            for b, n in zip(self.buckets, d):
+                acc += n
+                yield "_bucket", {**base, "le": _fmt_value(b)}, acc
+            yield "_bucket", {**base, "le": "+Inf"}, d[-1]
+            yield "_sum", base, d[-2]
+            yield "_count", base, d[-1]
+
+# A collector returns (name, kind, help, [(labels, value), ...]) for values that
+# already live elsewhere (cache stats, queue depth); it is called on every scrape.
+Collected = Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Counter | Histogram] = []
+        self._collectors: List[Callable[[], Iterable[Collected]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], Iterable[Collected]]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for suffix, labels, v in m.samples():
+                lines.append(f"{m.name}{suffix}{_fmt_labels(labels)} {_fmt_value(v)}")
+        for fn in self._collectors:
+            try:
+                collected = list(fn())
+            except Exception:
+                continue  # a broken collector must not take the whole scrape down
+            for name, kind, help, values in collected:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, v in values:
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+NODE_LATENCY = REGISTRY.register(Histogram(
+    "pipeline_node_seconds", "Time spent in each graph node.", ("node",)))
+LLM_CALLS = REGISTRY.register(Counter(
+    "llm_calls", "Chat model calls by provider and kind (single or batch).", ("provider", "kind")))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "llm_errors", "Chat model calls that raised.", ("provider", "kind")))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "llm_call_seconds", "Chat model call latency.", ("provider", "kind")))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "detect_prompt_event_tokens", "Tokens of each event sent to the chat model, before and after compaction.",
+    ("stage",), buckets=TOKEN_BUCKETS))
+QUEUE_WAIT = REGISTRY.register(Histogram(
+    "detect_queue_wait_seconds", "Time events waited for an LLM slot, by priority class.", ("priority",)))
+SHED = REGISTRY.register(Counter(
+    "detect_shed", "Events given the heuristic verdict instead of queueing for the LLM, by priority class.",
+    ("priority",)))
+ALERTS = REGISTRY.register(Counter(
+    "alerts", "Alerts produced, by severity.", ("severity",)))
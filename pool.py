@@ -0,0 +1,333 @@
+# pool.py
+# Key-affine multi-process worker pool: one compiled graph per worker process,
+# events routed by a hash of their key (src_ip by default) so every event of a
+# source hits the same OSINT/verdict caches, window counters and aggregation groups.
+from __future__ import annotations
+import asyncio, itertools, json, os, struct, threading, time, zlib
+import multiprocessing as mp
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+POOL_KEY = tuple(f.strip() for f in os.getenv("POOL_KEY", "src_ip").split(",") if f.strip())
+RING_BYTES = int(os.getenv("POOL_RING_BYTES", str(4 << 20)))
+WORKER_CONCURRENCY = int(os.getenv("POOL_WORKER_CONCURRENCY", "64"))  # events in flight per worker
+
+_CTRL = b"\x00"  # events are JSON objects ("{..."); payloads starting with NUL are commands
+
+class ShmRing:
+    """
+    Single-producer / single-consumer ring of (id, bytes) records in shared
+    memory. Records are copied in and out once: no pickling, no pipe. A
+    counting semaphore carries one token per record, which both wakes the
+    consumer and orders its reads after the producer's writes.
+    """
+    _HDR = 64                     # read and write positions (u64, ever increasing), padded
+    _REC = struct.Struct("<IQ")   # payload length, id
+    _WRAP = 0xFFFFFFFF
+
+    def __init__(self, size: int, items, name: Optional[str] = None):
+        self.size = size
+        self.items = items
+        # spawned workers share the parent's resource tracker, so attaching
+        # registers nothing new and only the owner's unlink() cleans up
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=self._HDR + size)
+        self.buf = self.shm.buf
+        self.pos = self.buf[:16].cast("Q")  # [read, write]
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def put(self, rid: int, payload: bytes) -> bool:
+        """Append one record; False if the ring is full right now."""
+        n = self._REC.size + len(payload)
+        if n > self.size:
+            raise ValueError(f"record of {n} bytes does not fit a {self.size}-byte ring")
+        read, write = self.pos[0], self.pos[1]
+        at = write % self.size
+        if at + n > self.size:  # doesn't fit before the end: skip to the start
+            if write + (self.size - at) + n - read > self.size:
+                return False
+            if self.size - at >= self._REC.size:
+                self._REC.pack_into(self.buf, self._HDR + at, self._WRAP, 0)
+            write += self.size - at
+            at = 0
+        elif write + n - read > self.size:
+            return False
+        o = self._HDR + at
+        self._REC.pack_into(self.buf, o, len(payload), rid)
+        self.buf[o + self._REC.size:o + n] = payload
+        self.pos[1] = write + n
+        self.items.release()
+        return True
+
+    def get(self) -> Tuple[int, bytes]:
+        """Next record; only call after taking a token from `items`."""
+        read = self.pos[0]
+        at = read % self.size
+        if self.size - at < self._REC.size or self._REC.unpack_from(self.buf, self._HDR + at)[0] == self._WRAP:
+            read += self.size - at
+            at = 0
+        length, rid = self._REC.unpack_from(self.buf, self._HDR + at)
+        o = self._HDR + at + self._REC.size
+        payload = bytes(self.buf[o:o + length])
+        self.pos[0] = read + self._REC.size + length
+        return rid, payload
+
+    def close(self, unlink: bool = False) -> None:
+        self.pos.release()
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class RemoteAlert:
+    """A worker's alert as JSON, with the AlertRec methods the API uses."""
+    __slots__ = ("json",)
+
+    def __init__(self, raw: str):
+        self.json = raw
+
+    def to_json(self) -> str:
+        return self.json
+
+    def to_dict(self) -> Dict[str, Any]:
+        return json.loads(self.json)
+
+    def to_model(self):
+        from storage.schema import Alert
+        return Alert.model_validate_json(self.json)
+
+# ---- worker process ----
+
+def _worker_main(idx: int, req_name: str, resp_name: str, req_items, resp_items,
+                 ring_bytes: int, concurrency: int) -> None:
+    from agents.detect import warm_llm
+    from graph import build_graph
+    graph = build_graph()
+    warm_llm()
+    req = ShmRing(ring_bytes, req_items, name=req_name)
+    resp = ShmRing(ring_bytes, resp_items, name=resp_name)
+    try:
+        asyncio.run(_serve(graph, req, resp, concurrency))
+    finally:
+        from agents.aggregate import AGGREGATOR
+        from storage.es import persist_alert, writer
+        if AGGREGATOR is not None:  # same as the API's shutdown hook
+            for a in AGGREGATOR.flush():
+                persist_alert(a)
+        writer.close()
+        req.close()
+        resp.close()
+
+def _worker_stats() -> Dict[str, Any]:
+    from agents import detect, osint
+    from agents.aggregate import AGGREGATOR
+    from agents.window_stats import WINDOW_STATS
+    from storage.es import writer
+    return {"pid": os.getpid(), "osint_cache": osint.cache_stats(), "detect": detect.tier_stats(),
+            "aggregator": AGGREGATOR.stats() if AGGREGATOR is not None else None,
+            "window_stats": WINDOW_STATS.stats() if WINDOW_STATS is not None else None,
+            "alert_writer": writer.metrics()}
+
+async def _serve(graph, req: ShmRing, resp: ShmRing, concurrency: int) -> None:
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    # the reader thread takes a slot per event, so a busy worker leaves records
+    # in the ring and the dispatcher feels the backpressure
+    slots = threading.Semaphore(concurrency)
+
+    async def reply(rid: int, body: bytes) -> None:
+        while not resp.put(rid, body):
+            await asyncio.sleep(0.0005)
+
+    async def run(rid: int, payload: bytes) -> None:
+        try:
+            s = payload.decode()
+            out = await graph.ainvoke({"event": json.loads(s), "event_json": s})
+            alert = out.get("alert")
+            body = b'{"ok":true,"duplicate":%s,"alert":%s}' % (
+                b"true" if out.get("duplicate") else b"false",
+                alert.to_json().encode() if alert is not None else b"null")
+        except Exception as e:
+            body = json.dumps({"ok": False, "error": repr(e)}).encode()
+        finally:
+            slots.release()
+        await reply(rid, body)
+
+    def control(rid: int, cmd: bytes) -> None:
+        if cmd == b"stop":
+            done.set_result(None)
+        elif cmd == b"stats":
+            loop.create_task(reply(rid, json.dumps(_worker_stats()).encode()))
+
+    def read() -> None:
+        while True:
+            req.items.acquire()
+            rid, payload = req.get()
+            if payload[:1] == _CTRL:
+                loop.call_soon_threadsafe(control, rid, payload[1:])
+                if payload[1:] == b"stop":
+                    return
+                continue
+            slots.acquire()
+            loop.call_soon_threadsafe(lambda r=rid, p=payload: tasks.add(loop.create_task(run(r, p))))
+
+    tasks: set = set()
+    threading.Thread(target=read, name="pool-reader", daemon=True).start()
+    await done
+    while tasks:  # finish what was admitted before the stop
+        tasks -= {t for t in tasks if t.done()}
+        if tasks:
+            await asyncio.wait(tasks)
+
+# ---- dispatcher ----
+
+class _Worker:
+    def __init__(self, ctx, idx: int, ring_bytes: int, concurrency: int):
+        self.idx = idx
+        self.req = ShmRing(ring_bytes, ctx.Semaphore(0))
+        self.resp = ShmRing(ring_bytes, ctx.Semaphore(0))
+        self.lock = threading.Lock()  # one producer per ring: submitters take turns
+        self.pending: Dict[int, Future] = {}
+        self.proc = ctx.Process(target=_worker_main, name=f"pipeline-worker-{idx}", daemon=True,
+                                args=(idx, self.req.name, self.resp.name, self.req.items,
+                                      self.resp.items, ring_bytes, concurrency))
+        self.sent = 0
+        self.reader: threading.Thread | None = None
+
+class ShardedPool:
+    """
+    Front dispatcher for `workers` processes, each running build_graph().
+    Events go to worker crc32(key) % workers, where key is the POOL_KEY fields
+    of the event (events without them are spread round-robin). Offers the
+    compiled graph's invoke()/ainvoke(); the result's "alert" is a RemoteAlert.
+
+    Events and results travel as JSON through a pair of ShmRing per worker.
+    Each worker has its own caches, alert writer and sinks (a shared
+    OSINT_CACHE_DB / ALERT_DB SQLite file is fine: both run in WAL mode).
+    """
+
+    def __init__(self, workers: int, key_fields: Tuple[str, ...] = POOL_KEY,
+                 ring_bytes: int = RING_BYTES, concurrency: int = WORKER_CONCURRENCY):
+        self.n = workers
+        self.key_fields = key_fields
+        self.ring_bytes = ring_bytes
+        self.concurrency = concurrency
+        self._ids = itertools.count(1)
+        self._rr = itertools.count()
+        self._workers: List[_Worker] = []
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        """Spawn the workers (done lazily by the first event otherwise)."""
+        with self._start_lock:
+            if self._workers or self._closed:
+                return
+            ctx = mp.get_context("spawn")  # the parent has threads running; don't fork them
+            ws = [_Worker(ctx, i, self.ring_bytes, self.concurrency) for i in range(self.n)]
+            for w in ws:
+                w.proc.start()
+                w.reader = threading.Thread(target=self._read, args=(w,), name=f"pool-resp-{w.idx}", daemon=True)
+                w.reader.start()
+            self._workers = ws
+
+    def shard(self, event: Dict[str, Any]) -> int:
+        key = "\x1f".join(str(event.get(f, "")) for f in self.key_fields)
+        if not key.strip("\x1f"):
+            return next(self._rr) % self.n
+        return zlib.crc32(key.encode()) % self.n
+
+    def _try_send(self, w: _Worker, payload: bytes, fut: Future) -> bool:
+        if w.proc.exitcode is not None:
+            raise RuntimeError(f"pipeline worker {w.idx} exited with {w.proc.exitcode}")
+        rid = next(self._ids)
+        w.pending[rid] = fut
+        with w.lock:
+            if w.req.put(rid, payload):
+                w.sent += 1
+                return True
+        del w.pending[rid]
+        return False
+
+    def _send(self, w: _Worker, payload: bytes) -> Future:
+        fut: Future = Future()
+        while not self._try_send(w, payload, fut):
+            time.sleep(0.0005)  # ring full: the worker is behind
+        return fut
+
+    def submit(self, event: Dict[str, Any]) -> Future:
+        """Route one event; the future resolves to the graph's output."""
+        self.start()
+        return self._send(self._workers[self.shard(event)], json.dumps(event).encode())
+
+    def invoke(self, state: Dict[str, Any], *_: Any, **__: Any) -> Dict[str, Any]:
+        return self.submit(state["event"]).result()
+
+    async def ainvoke(self, state: Dict[str, Any], *_: Any, **__: Any) -> Dict[str, Any]:
+        self.start()
+        event = state["event"]
+        w = self._workers[self.shard(event)]
+        payload = json.dumps(event).encode()
+        fut: Future = Future()
+        while not self._try_send(w, payload, fut):
+            await asyncio.sleep(0.0005)
+        return await asyncio.wrap_future(fut)
+
+    def _read(self, w: _Worker) -> None:
+        while True:
+            if not w.resp.items.acquire(timeout=1.0):
+                if w.proc.exitcode is not None:
+                    err = RuntimeError(f"pipeline worker {w.idx} exited with {w.proc.exitcode}")
+                    for fut in list(w.pending.values()):
+                        fut.set_exception(err)
+                    w.pending.clear()
+                    return
+                continue
+            rid, body = w.resp.get()
+            fut = w.pending.pop(rid, None)
+            if fut is None:
+                continue
+            if body.startswith(b'{"ok":true'):
+                head, _, alert = body.partition(b',"alert":')
+                fut.set_result({"duplicate": head.endswith(b"true"),
+                                "alert": RemoteAlert(alert[:-1].decode()) if alert[:-1] != b"null" else None})
+            elif body.startswith(b'{"ok":false'):
+                fut.set_exception(RuntimeError(json.loads(body)["error"]))
+            else:
+                fut.set_result(json.loads(body))  # control reply
+
+    def stats(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """Per-worker routing counts plus each worker's cache / tier / writer stats."""
+        out = []
+        for w in self._workers:
+            s: Dict[str, Any] = {"worker": w.idx, "alive": w.proc.is_alive(), "sent": w.sent,
+                                 "in_flight": len(w.pending)}
+            if s["alive"]:
+                try:
+                    s.update(self._send(w, _CTRL + b"stats").result(timeout))
+                except Exception as e:
+                    s["error"] = repr(e)
+            out.append(s)
+        return {"workers": self.n, "key": list(self.key_fields), "per_worker": out}
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Let every worker finish its in-flight events, flush its writer and exit."""
+        with self._start_lock:
+            self._closed = True
+            ws, self._workers = self._workers, []
+        for w in ws:
+            if w.proc.is_alive():
+                try:
+                    self._send(w, _CTRL + b"stop")
+                except RuntimeError:
+                    pass
+        for w in ws:
+            w.proc.join(timeout)
+            if w.proc.is_alive():
+                w.proc.terminate()
+                w.proc.join(5)
+            w.req.close(unlink=True)
+            w.resp.close(unlink=True)
@@ -0,0 +1,76 @@
+# profiler.py
+from __future__ import annotations
+import os, sys, threading, time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper
+    thread, so the profiled code runs unmodified and pays nothing when it's off.
+
+        with SamplingProfiler() as prof:
+            ...
+        prof.report()
+
+    On an asyncio loop the target thread is the loop thread, so samples include
+    whatever else the loop was running at the time.
+    """
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None, max_depth: int = 64):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._t0
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == me:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the folded format flamegraph.pl / speedscope read."""
+        return "\n".join(f"{s} {n}" for s, n in self.stacks.most_common())
+
+    def top(self, n: int = 25) -> List[Dict[str, Any]]:
+        """Functions by samples on top of the stack (self) and anywhere in it (total)."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, k in self.stacks.items():
+            frames = [f.rsplit(":", 1)[0] for f in stack.split(";")]
+            own[frames[-1]] += k
+            for f in set(frames):
+                total[f] += k
+        return [{"function": f, "self": own[f], "total": t} for f, t in total.most_common(n)]
+
+    def report(self, n: int = 25) -> Dict[str, Any]:
+        return {"samples": self.samples, "interval_ms": self.interval * 1000,
+                "elapsed_ms": round(self.elapsed * 1000, 3), "top": self.top(n),
+                "collapsed": self.collapsed()}
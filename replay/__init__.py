@@ -0,0 +1,8 @@
+# replay/__init__.py
+# Backtest MITRE rules and severity weights against stored alerts, without the LLM
+# or OSINT. Run from the repo root:
+#   python -m replay --db alerts.db                          # current rules and weights vs what was stored
+#   python -m replay --db alerts.db --rules new_rules.json --weights '{"mitre": 0.3}' --out diff.json
+#   python -m replay --file alerts.ndjson --since 2025-08-01  # the ALERTS_FILE sink's output
+# columns.py loads alerts into NumPy columns (strings factorized into codes);
+# backtest.py re-maps and re-scores them in bulk and builds the diff report.
@@ -0,0 +1,52 @@
+# replay/__main__.py
+#   python -m replay [--db PATH | --file ALERTS.ndjson] [--since T] [--until T] [--rules FILE]
+#                    [--weights JSON] [--cutoffs 0.4,0.6,0.8] [--examples 5] [--top 20] [--out report.json]
+import argparse, json, os, sys, time
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m replay",
+                                 description="Re-map MITRE techniques and re-score severity of stored alerts; "
+                                             "print what changes.")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--db", default=os.getenv("ALERT_DB") or None, help="SQLite alert store (default: ALERT_DB)")
+    src.add_argument("--file", help="NDJSON alerts, e.g. the ALERTS_FILE sink")
+    ap.add_argument("--since", help="ISO time or epoch seconds, inclusive")
+    ap.add_argument("--until", help="ISO time or epoch seconds, exclusive")
+    ap.add_argument("--rules", help="candidate MITRE rules (JSON/YAML/STIX); default: the loaded set")
+    ap.add_argument("--weights", type=json.loads, default=None,
+                    help='severity weight overrides, e.g. \'{"mitre": 0.3}\' (see agents/prioritize.py)')
+    ap.add_argument("--cutoffs", type=lambda s: tuple(float(x) for x in s.split(",")), default=None,
+                    help="medium,high,critical score cutoffs")
+    ap.add_argument("--examples", type=int, default=5, help="event_ids listed per change")
+    ap.add_argument("--top", type=int, default=20, help="rows per section in the text report")
+    ap.add_argument("--out", help="also write the full report as JSON")
+    args = ap.parse_args()
+
+    # heavy imports after argument parsing, so --help stays fast
+    from agents.mitre import CompiledRules, load_rules_file
+    from replay.backtest import format_report, report, rescore
+    from replay.columns import load_ndjson, load_sqlite
+
+    t0 = time.perf_counter()
+    if args.file:
+        cols = load_ndjson(args.file, args.since, args.until)
+    else:
+        if not args.db:
+            ap.error("no alert store: pass --db or --file, or set ALERT_DB")
+        if not os.path.exists(args.db):
+            ap.error(f"no alert store at {args.db}")
+        cols = load_sqlite(args.db, args.since, args.until)
+    t1 = time.perf_counter()
+    rules = CompiledRules(load_rules_file(args.rules)) if args.rules else None
+    res = rescore(cols, rules, args.weights, args.cutoffs)
+    r = report(cols, res, args.examples)
+    t2 = time.perf_counter()
+    r["timing_s"] = {"load": round(t1 - t0, 2), "rescore": round(t2 - t1, 2)}
+    print(format_report(r, args.top))
+    print(f"load {r['timing_s']['load']} s, rescore + report {r['timing_s']['rescore']} s", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(r, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# replay/backtest.py
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from agents import mitre
+from agents.mitre import CompiledRules
+from agents.prioritize import SEVERITIES, score_columns
+from replay.columns import AlertColumns
+
+@dataclass
+class Rescored:
+    techniques: np.ndarray  # int32 -> AlertColumns.technique_sets
+    severity: np.ndarray    # int8, index into prioritize.SEVERITIES
+    combos: int             # distinct (reason, tags, window) inputs actually mapped
+
+def _window_bits(cols: AlertColumns, compiled: CompiledRules) -> Tuple[np.ndarray, int]:
+    """Per alert, which (signal, threshold) pairs of the rule set's window conditions hold, as bits."""
+    pairs = sorted({(k, v) for i in compiled.window for k, v in compiled.window_thresholds(i).items()})
+    per_set = [sum(1 << j for j, (k, v) in enumerate(pairs) if s.get(k, 0) > v) for s in cols.signal_sets]
+    return np.array(per_set or [0], dtype=np.int64)[cols.signals], 1 << len(pairs)
+
+def remap(cols: AlertColumns, rules: CompiledRules | None = None) -> Tuple[np.ndarray, int]:
+    """
+    mitre_map() for every alert: technique-set codes, and how many distinct inputs
+    were matched. Alerts with the same reason, OSINT tags and window-rule outcomes
+    map alike, so the rules run once per distinct combination and the result is
+    broadcast back - a few thousand matches for millions of alerts.
+    """
+    compiled = rules if rules is not None else mitre._compiled
+    bits, nbits = _window_bits(cols, compiled)
+    ntags = max(len(cols.tag_sets), 1)
+    if len(cols.reasons) * ntags * nbits < 1 << 62:
+        key = (cols.reason.astype(np.int64) * ntags + cols.tags) * nbits + bits
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    else:  # too many combinations for one int64 key
+        _, first, inverse = np.unique(np.stack([cols.reason, cols.tags, bits], axis=1), axis=0,
+                                      return_index=True, return_inverse=True)
+    vocab = cols.technique_sets
+    codes = np.empty(len(first), dtype=np.int32)
+    for j, i in enumerate(first):
+        hit = compiled.match(set(cols.tag_sets[cols.tags[i]]), cols.reasons[cols.reason[i]].lower(),
+                             cols.signal_sets[cols.signals[i]])
+        ids = {compiled.mappings[h].technique_id for h in hit}
+        for h in hit:
+            cols.technique_names.setdefault(compiled.mappings[h].technique_id, compiled.mappings[h].technique)
+        codes[j] = vocab.code(tuple(sorted(ids)))
+    return codes[inverse.reshape(-1)], len(first)
+
+def rescore(cols: AlertColumns, rules: CompiledRules | None = None, weights: Dict[str, float] | None = None,
+            cutoffs: Tuple[float, ...] | None = None) -> Rescored:
+    """Re-map techniques with `rules` (default: the loaded set) and re-score severity
+    with `weights` / `cutoffs` (default: agents/prioritize.py's)."""
+    techniques, combos = remap(cols, rules)
+    has_mitre = np.array([len(t) > 0 for t in cols.technique_sets.values], dtype=bool)[techniques]
+    severity = score_columns(cols.label, cols.osint_malicious, has_mitre, weights, cutoffs)
+    return Rescored(techniques, severity, combos)
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+def _examples(cols: AlertColumns, mask: np.ndarray, n: int) -> List[str]:
+    idx = np.flatnonzero(mask)
+    if n <= 0 or not len(idx):
+        return []
+    newest = idx[np.argsort(-cols.ts[idx], kind="stable")[:n]]
+    return [cols.event_id[i] for i in newest]
+
+def report(cols: AlertColumns, res: Rescored, examples: int = 5) -> Dict[str, Any]:
+    """Severity transitions and per-technique gains/losses between the stored alerts and `res`."""
+    k = len(SEVERITIES)
+    old, new = cols.severity.astype(np.int64), res.severity.astype(np.int64)
+    matrix = np.bincount(old * k + new, minlength=k * k).reshape(k, k)
+    transitions = [
+        {"from": SEVERITIES[a], "to": SEVERITIES[b], "alerts": int(matrix[a, b]),
+         "examples": _examples(cols, (old == a) & (new == b), examples)}
+        for a in range(k) for b in range(k) if a != b and matrix[a, b]
+    ]
+    transitions.sort(key=lambda t: -t["alerts"])
+
+    # per technique: a boolean over technique-set codes, gathered to alerts
+    sets = cols.technique_sets.values
+    before_codes, after_codes = cols.techniques, res.techniques
+    moved = before_codes != after_codes
+    touched = sorted({t for c in np.unique(np.concatenate([before_codes[moved], after_codes[moved]]))
+                      for t in sets[c]})
+    by_technique = []
+    for t in touched:
+        has = np.array([t in s for s in sets], dtype=bool)
+        was, now = has[before_codes], has[after_codes]
+        added, removed = now & ~was, was & ~now
+        if not (added.any() or removed.any()):  # only rode along in a changed set
+            continue
+        by_technique.append({
+            "technique_id": t, "technique": cols.technique_names.get(t, ""),
+            "before": int(was.sum()), "after": int(now.sum()),
+            "added": int(added.sum()), "removed": int(removed.sum()),
+            "examples_added": _examples(cols, added, examples),
+            "examples_removed": _examples(cols, removed, examples),
+        })
+    by_technique.sort(key=lambda r: -(r["added"] + r["removed"]))
+
+    return {
+        "alerts": len(cols),
+        "events": int(cols.count.sum()),
+        "span": [_iso(cols.ts.min()), _iso(cols.ts.max())] if len(cols) else None,
+        "combos_mapped": res.combos,
+        "severity": {
+            "before": {s: int(matrix[i].sum()) for i, s in enumerate(SEVERITIES)},
+            "after": {s: int(matrix[:, i].sum()) for i, s in enumerate(SEVERITIES)},
+            "changed": int((old != new).sum()),
+            "raised": int((new > old).sum()),
+            "lowered": int((new < old).sum()),
+            "transitions": transitions,
+        },
+        "techniques": {"changed": int(moved.sum()), "by_technique": by_technique},
+    }
+
+def format_report(r: Dict[str, Any], top: int = 20) -> str:
+    lines = [f"replay: {r['alerts']:,} alerts ({r['events']:,} events)"
+             + (f", {r['span'][0]} .. {r['span'][1]}" if r["span"] else "")]
+    sev = r["severity"]
+    lines.append(f"{'severity':<10}{'before':>12}{'after':>12}{'delta':>10}")
+    for s in SEVERITIES:
+        b, a = sev["before"][s], sev["after"][s]
+        lines.append(f"{s:<10}{b:>12,}{a:>12,}{a - b:>+10,}")
+    lines.append(f"severity changed: {sev['changed']:,} alerts (raised {sev['raised']:,}, lowered {sev['lowered']:,})")
+    for t in sev["transitions"][:top]:
+        ex = f"  e.g. {', '.join(t['examples'])}" if t["examples"] else ""
+        lines.append(f"  {t['from']:>8} -> {t['to']:<8}{t['alerts']:>10,}{ex}")
+    tech = r["techniques"]
+    lines.append(f"techniques changed: {tech['changed']:,} alerts")
+    for t in tech["by_technique"][:top]:
+        lines.append(f"  {t['technique_id']:<10}{t['technique'][:32]:<33}{t['before']:>10,} -> {t['after']:<10,}"
+                     f" +{t['added']:,} -{t['removed']:,}")
+    return "\n".join(lines)
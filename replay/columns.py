@@ -0,0 +1,226 @@
+# replay/columns.py
+from __future__ import annotations
+import json, re, sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from agents.detect import _WINDOW_REASONS
+from agents.prioritize import LABELS, SEVERITIES
+from storage.sqlite_store import _epoch
+
+# Alerts stored before they carried "signals" still name the window counters that
+# fired in their reason ("...; Window: brute force, 37 failed logins from this source").
+_WINDOW_RES = [(k, re.compile(re.escape(t).replace(re.escape("{n}"), r"(\d+)")))
+               for k, t in _WINDOW_REASONS.items()]
+
+def signals_from_reason(reason: str) -> Dict[str, int]:
+    if "Window: " not in reason:
+        return {}
+    out = {}
+    for k, rx in _WINDOW_RES:
+        m = rx.search(reason)
+        if m:
+            out[k] = int(m.group(1))
+    return out
+
+class _Vocab:
+    """Factorizes hashable values into dense int codes, in first-seen order."""
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def code(self, v: Any) -> int:
+        c = self.codes.get(v)
+        if c is None:
+            c = self.codes[v] = len(self.values)
+            self.values.append(v)
+        return c
+
+@dataclass
+class AlertColumns:
+    """
+    Stored alerts as parallel arrays, one row per alert. Repetitive fields are
+    int codes into a vocabulary (reasons, tag sets, signal sets, technique sets),
+    so re-mapping runs once per distinct combination rather than per alert.
+    """
+    event_id: List[str]
+    ts: np.ndarray          # float64, epoch seconds
+    count: np.ndarray       # int64, events folded into the alert
+    label: np.ndarray       # int8, index into prioritize.LABELS
+    osint_malicious: np.ndarray  # bool
+    reason: np.ndarray      # int32 -> reasons
+    tags: np.ndarray        # int32 -> tag_sets
+    signals: np.ndarray     # int32 -> signal_sets
+    severity: np.ndarray    # int8, index into prioritize.SEVERITIES, as stored
+    techniques: np.ndarray  # int32 -> technique_sets, as stored
+    reasons: List[str]
+    tag_sets: List[Tuple[str, ...]]
+    signal_sets: List[Dict[str, int]]
+    technique_sets: _Vocab  # backtest adds the re-mapped sets to the same codes
+    technique_names: Dict[str, str]  # technique_id -> name, as stored
+
+    def __len__(self) -> int:
+        return len(self.event_id)
+
+_LABEL = {l: i for i, l in enumerate(LABELS)}
+_SEVERITY = {s: i for i, s in enumerate(SEVERITIES)}
+_CACHE_MAX = 200_000
+_NUMERIC = ("ts", "count", "label", "osint_malicious", "reason", "tags", "signals", "severity", "techniques")
+
+class ColumnBuilder:
+    """
+    Appends alerts (parsed documents, or store rows) and builds AlertColumns. A second
+    document with the same event_id replaces the first in place: an aggregated
+    group is persisted again with its final count (agents/aggregate.py), and the
+    last copy wins, as in the stores keyed on event_id.
+    """
+
+    def __init__(self):
+        self.event_id: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._num: Dict[str, List] = {k: [] for k in _NUMERIC}
+        self._reasons, self._tags, self._signals, self._techs = _Vocab(), _Vocab(), _Vocab(), _Vocab()
+        self._names: Dict[str, str] = {}
+        self._cols = [self._num[k] for k in _NUMERIC]
+        self._osint_cache: Dict[Optional[str], Tuple[bool, int]] = {}
+        self._signals_cache: Dict[str, int] = {}
+        self._mitre_cache: Dict[Optional[str], int] = {}
+
+    def add(self, d: Dict[str, Any]) -> None:
+        """One alert document, parsed."""
+        det = d.get("detection") or {}
+        reason = det.get("reason") or ""
+        osint = (d.get("osint") or {}).values()
+        self._append(d["event_id"], _epoch(d["ts"]), d.get("count") or 1, det.get("label"), d.get("severity"),
+                     reason, any(f.get("reputation") == "malicious" for f in osint),
+                     self._tags.code(tuple(sorted({t.lower() for f in osint for t in f.get("tags") or ()}))),
+                     self._signal_code(d.get("signals"), reason), self._mitre_code(d.get("mitre") or ()))
+
+    def add_row(self, event_id: str, ts: float, count: Optional[int], label: str, severity: str,
+                reason: Optional[str], osint: Optional[str], signals: Optional[str], mapped: Optional[str]) -> None:
+        """One alert as the store's columns plus JSON fragments of its document. The
+        fragments repeat across alerts, so each distinct one is parsed once."""
+        reason = reason or ""
+        o = self._osint_cache.get(osint)
+        if o is None:
+            if len(self._osint_cache) >= _CACHE_MAX:  # keyed by IOC values too: bound it
+                self._osint_cache.clear()
+            found = json.loads(osint).values() if osint else ()
+            o = self._osint_cache[osint] = (
+                any(f.get("reputation") == "malicious" for f in found),
+                self._tags.code(tuple(sorted({t.lower() for f in found for t in f.get("tags") or ()}))))
+        sig = self._signals_cache.get(signals) if signals is not None else None
+        if sig is None:
+            sig = self._signal_code(json.loads(signals) if signals is not None else None, reason)
+            if signals is not None:
+                self._signals_cache[signals] = sig
+        m = self._mitre_cache.get(mapped)
+        if m is None:
+            m = self._mitre_cache[mapped] = self._mitre_code(json.loads(mapped) if mapped else ())
+        self._append(event_id, ts, count or 1, label, severity, reason, o[0], o[1], sig, m)
+
+    def _signal_code(self, signals: Optional[Dict[str, int]], reason: str) -> int:
+        if signals is None:
+            signals = signals_from_reason(reason)
+        return self._signals.code(tuple(sorted(signals.items())))
+
+    def _mitre_code(self, mapped: Iterable[Dict[str, str]]) -> int:
+        ids = set()
+        for m in mapped:
+            ids.add(m["technique_id"])
+            self._names[m["technique_id"]] = m.get("technique", "")
+        return self._techs.code(tuple(sorted(ids)))
+
+    def _append(self, event_id: str, ts: float, count: int, label: Optional[str], severity: Optional[str],
+                reason: str, osint_malicious: bool, tags: int, signals: int, techniques: int) -> None:
+        row = (ts, count, _LABEL.get(label, 0), osint_malicious, self._reasons.code(reason), tags, signals,
+               _SEVERITY.get(severity, 0), techniques)
+        i = self._row.get(event_id)
+        if i is None:
+            self._row[event_id] = len(self.event_id)
+            self.event_id.append(event_id)
+            for col, v in zip(self._cols, row):
+                col.append(v)
+        else:
+            for col, v in zip(self._cols, row):
+                col[i] = v
+
+    def build(self) -> AlertColumns:
+        n = self._num
+        return AlertColumns(
+            event_id=self.event_id,
+            ts=np.array(n["ts"], dtype=np.float64),
+            count=np.array(n["count"], dtype=np.int64),
+            label=np.array(n["label"], dtype=np.int8),
+            osint_malicious=np.array(n["osint_malicious"], dtype=bool),
+            reason=np.array(n["reason"], dtype=np.int32),
+            tags=np.array(n["tags"], dtype=np.int32),
+            signals=np.array(n["signals"], dtype=np.int32),
+            severity=np.array(n["severity"], dtype=np.int8),
+            techniques=np.array(n["techniques"], dtype=np.int32),
+            reasons=self._reasons.values,
+            tag_sets=self._tags.values,
+            signal_sets=[dict(s) for s in self._signals.values],
+            technique_sets=self._techs,
+            technique_names=self._names,
+        )
+
+def _range(since: Any, until: Any) -> Tuple[str, List[float]]:
+    where, args = [], []
+    if since is not None:
+        where.append("ts >= ?"); args.append(_epoch(since))
+    if until is not None:
+        where.append("ts < ?"); args.append(_epoch(until))
+    return (" WHERE " + " AND ".join(where) if where else ""), args
+
+def sqlite_docs(path: str, since: Any = None, until: Any = None, chunk: int = 10_000) -> Iterator[str]:
+    """Alert documents from an AlertStore database, oldest first."""
+    where, args = _range(since, until)
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cur = db.execute(f"SELECT doc FROM alerts{where} ORDER BY ts, id", args)
+        while rows := cur.fetchmany(chunk):
+            for (doc,) in rows:
+                yield doc
+    finally:
+        db.close()
+
+def ndjson_docs(path: str) -> Iterator[str]:
+    """Alert documents from an NDJSON file (the ALERTS_FILE sink)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+# Only the parts of each document replay reads; SQLite pulls them out in C, and
+# the raw event (most of a document) is never parsed in Python.
+_FIELDS_SQL = ("SELECT event_id, ts, json_extract(doc, '$.count'), label, severity, "
+               "json_extract(doc, '$.detection.reason'), json_extract(doc, '$.osint'), "
+               "json_extract(doc, '$.signals'), json_extract(doc, '$.mitre') FROM alerts")
+
+def load_sqlite(path: str, since: Any = None, until: Any = None, chunk: int = 10_000) -> AlertColumns:
+    where, args = _range(since, until)
+    b = ColumnBuilder()
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cur = db.execute(f"{_FIELDS_SQL}{where} ORDER BY ts, id", args)
+        while rows := cur.fetchmany(chunk):
+            for r in rows:
+                b.add_row(*r)
+    finally:
+        db.close()
+    return b.build()
+
+def load_ndjson(path: str, since: Any = None, until: Any = None) -> AlertColumns:
+    lo = _epoch(since) if since is not None else float("-inf")
+    hi = _epoch(until) if until is not None else float("inf")
+    b = ColumnBuilder()
+    for doc in ndjson_docs(path):
+        d = json.loads(doc)
+        if lo <= _epoch(d["ts"]) < hi:
+            b.add(d)
+    return b.build()
@@ -0,0 +1,69 @@
+# smoke_test/es_bulk_stub_server.py
+# Local stand-in for an Elasticsearch/OpenSearch _bulk endpoint.
+# --fail-every N answers every Nth document with a 429 so retries can be exercised;
+# --reject-status S refuses every whole request with HTTP S instead.
+#   python smoke_test/es_bulk_stub_server.py --port 9201 --fail-every 5
+import argparse, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class BulkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fail_every = 0
+    reject_status = 0
+    docs: dict = {}        # _id -> source
+    bulk_requests = 0
+    _seen = 0
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        if not self.path.endswith("/_bulk"):
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if self.reject_status:
+            with BulkHandler._lock:
+                BulkHandler.bulk_requests += 1
+            self.send_error(self.reject_status)
+            return
+        lines = [l for l in body.split("\n") if l.strip()]
+        items, errors = [], False
+        with BulkHandler._lock:
+            BulkHandler.bulk_requests += 1
+            for action, src in zip(lines[::2], lines[1::2]):
+                meta = json.loads(action)["index"]
+                BulkHandler._seen += 1
+                if self.fail_every and BulkHandler._seen % self.fail_every == 0:
+                    errors = True
+                    items.append({"index": {"_id": meta.get("_id"), "status": 429,
+                                            "error": {"type": "es_rejected_execution_exception"}}})
+                    continue
+                BulkHandler.docs[meta.get("_id")] = json.loads(src)
+                items.append({"index": {"_id": meta.get("_id"), "status": 201}})
+        out = json.dumps({"took": 1, "errors": errors, "items": items}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+def serve(port: int = 0, fail_every: int = 0, reject_status: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; port 0 picks a free one (see server.server_port)."""
+    BulkHandler.fail_every = fail_every
+    BulkHandler.reject_status = reject_status
+    server = ThreadingHTTPServer(("127.0.0.1", port), BulkHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=9201)
+    ap.add_argument("--fail-every", type=int, default=0)
+    ap.add_argument("--reject-status", type=int, default=0)
+    a = ap.parse_args()
+    srv = serve(a.port, a.fail_every, a.reject_status)
+    print(f"stub _bulk on http://127.0.0.1:{srv.server_port} fail_every={a.fail_every}")
+    threading.Event().wait()
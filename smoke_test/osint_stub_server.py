@@ -0,0 +1,56 @@
+# smoke_test/osint_stub_server.py
+# Local stand-in for an OSINT reputation API (JSONProvider protocol) with injected latency.
+#   python smoke_test/osint_stub_server.py --port 8099 --latency 0.2
+import argparse, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled sessions actually reuse sockets
+    latency = 0.2
+    requests_seen = 0
+    in_flight = peak_in_flight = 0  # requests inside the latency sleep; tests reset the peak
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        q = parse_qs(urlparse(self.path).query)
+        value = q.get("value", [""])[0]
+        with StubHandler._lock:
+            StubHandler.requests_seen += 1
+            StubHandler.in_flight += 1
+            StubHandler.peak_in_flight = max(StubHandler.peak_in_flight, StubHandler.in_flight)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with StubHandler._lock:
+                StubHandler.in_flight -= 1
+        bad = value.startswith(("203.0.113.", "198.51.100.")) or "evil" in value
+        body = json.dumps({
+            "reputation": "malicious" if bad else "unknown",
+            "tags": ["stub-feed"] if bad else [],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve(port: int = 0, latency: float = 0.2) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; port 0 picks a free one (see server.server_port)."""
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency", type=float, default=0.2)
+    a = ap.parse_args()
+    srv = serve(a.port, a.latency)
+    print(f"stub OSINT on http://127.0.0.1:{srv.server_port} latency={a.latency}s")
+    threading.Event().wait()
@@ -0,0 +1,62 @@
+# smoke_test/smoke_test_aggregate.py
+# Windowed aggregation: repeats fold into the first alert, windows expire, groups stay bounded.
+import json
+from datetime import datetime
+
+from agents.aggregate import Aggregator
+from storage.records import AlertRec
+from storage.schema import Detection
+
+class Clock:
+    t = 1_000.0
+    def __call__(self):
+        return self.t
+
+def evt(n: int, ip: str = "203.0.113.45") -> dict:
+    return {"src_ip": ip, "user": "alice", "event": f"failed login attempt {n}"}
+
+def alert(event_id: str) -> AlertRec:
+    return AlertRec(event_id=event_id, ts=datetime.utcnow(), raw={},
+                 detection=Detection(label="suspicious", reason="smoke", confidence=0.5))
+
+clock = Clock()
+
+# 1) tumbling: the first event runs the pipeline, the next 999 only bump the count
+agg = Aggregator(window=60, mode="tumbling", clock=clock)
+key = agg.key(evt(0), json.dumps(evt(0)))
+eid, snap, first = agg.admit(key)
+assert first and snap is None
+assert agg.admit(agg.key(evt(1), json.dumps(evt(1))))[:3] == (eid, None, False)  # first still in flight
+agg.attach(key, eid, alert(eid))
+for n in range(2, 1000):
+    clock.t += 0.01
+    e2, snap, first = agg.admit(agg.key(evt(n), json.dumps(evt(n))))
+    assert not first and e2 == eid
+assert snap.count == 1000 and snap.last_seen is not None
+assert agg.key(evt(0, ip="198.51.100.7"), json.dumps(evt(0, ip="198.51.100.7"))) != key
+
+# window closes 60 s after the first event; the final count is handed back once
+clock.t = 1_061.0
+assert agg.admit(key)[2] is True
+closed = agg.take_closed()
+assert len(closed) == 1 and closed[0].count == 1000 and agg.take_closed() == []
+print("tumbling:", agg.stats())
+
+# 2) sliding: a steady trickle keeps the window open
+agg = Aggregator(window=10, mode="sliding", clock=clock)
+eid, _, _ = agg.admit(key)
+agg.attach(key, eid, alert(eid))
+for _ in range(50):
+    clock.t += 5
+    assert agg.admit(key)[0] == eid
+clock.t += 11
+assert agg.admit(key)[0] != eid and agg.take_closed()[0].count == 51
+
+# 3) bounded: max_groups caps memory, oldest groups go first
+agg = Aggregator(window=3600, max_groups=100, clock=clock)
+for i in range(1000):
+    agg.admit(f"k{i}")
+s = agg.stats()
+assert s["groups"] == 100 and s["evicted"] == 900
+assert len(agg.flush()) == 0 and agg.stats()["groups"] == 0
+print("aggregate ok")
@@ -0,0 +1,50 @@
+# smoke_test/smoke_test_alert_store.py
+# SQLite alert store: idempotent batched inserts, pivot filters, keyset pagination.
+import os, sys, tempfile
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, ".")
+
+from bench.bench_alert_store import make_docs
+from storage.sqlite_store import AlertStore
+
+db = os.path.join(tempfile.mkdtemp(), "alerts.db")
+store = AlertStore(db)
+docs = list(make_docs(5000, days=10))
+for i in range(0, len(docs), 500):
+    assert store.write(docs[i:i + 500]) == []
+assert store.write(docs[:500]) == []  # retried batch is a no-op
+assert store.count() == 5000
+
+# 1) walking every page returns each alert exactly once, newest first
+seen, cur, last_ts = [], None, None
+while True:
+    page, cur = store.query(limit=333, cursor=cur)
+    for a in page:
+        assert last_ts is None or a["ts"] <= last_ts
+        last_ts = a["ts"]
+    seen.extend(a["event_id"] for a in page)
+    if cur is None:
+        break
+assert len(seen) == len(set(seen)) == 5000
+
+# 2) indicator pivot agrees with a brute-force scan, and respects since
+day_ago = datetime.now(timezone.utc) - timedelta(days=1)
+want = [d for d in docs if '"203.0.113.45"' in d]
+got, _ = store.query(indicator="203.0.113.45", limit=1000)
+assert len(got) == len(want)
+recent, _ = store.query(indicator="203.0.113.45", since=day_ago, limit=1000)
+assert all(datetime.fromisoformat(a["ts"]) >= day_ago for a in recent)
+
+# 3) combined filters
+hits, _ = store.query(severity="critical", technique="T1566", limit=1000)
+assert hits and all(a["severity"] == "critical" and
+                    any(m["technique_id"] == "T1566" for m in a["mitre"]) for a in hits)
+
+# 4) malformed cursor is rejected
+try:
+    store.query(cursor="not-a-cursor")
+    raise AssertionError("expected ValueError")
+except ValueError:
+    pass
+
+print(f"alert store ok: {store.count()} alerts, {len(got)} for 203.0.113.45, {len(hits)} critical T1566")
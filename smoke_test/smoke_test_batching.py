@@ -0,0 +1,121 @@
+# smoke_test/smoke_test_batching.py
+# Micro-batching in agents/detect.py: batch replies routed to their events, garbled
+# or partial replies falling back per event, detect_batch(), the batch size and
+# wait limits of adetect(), and set_batching() while events are in flight.
+import asyncio, json, os, time
+
+os.environ.setdefault("ALERT_DB", "")
+os.environ["DETECT_CACHE_SIZE"] = "0"
+os.environ.pop("DETECT_MAX_INFLIGHT", None)
+from agents import detect
+from bench.fake_llm import FakeChatModel, install
+
+detect.TIERED = False
+detect.set_scheduling(0)
+
+# 1) _parse_batch_response
+v = lambda i, label="benign": {"id": i, "label": label, "reason": f"r{i}", "confidence": 0.9}
+labels = lambda out: [d.label if d else None for d in out]
+assert labels(detect._parse_batch_response(json.dumps([v(0), v(1, "malicious")]), 2)) == ["benign", "malicious"]
+assert labels(detect._parse_batch_response(json.dumps([v(1, "malicious"), v(0)]), 2)) == ["benign", "malicious"]
+assert labels(detect._parse_batch_response(json.dumps({"results": [v(0), v(1)]}), 2)) == ["benign", "benign"]
+assert labels(detect._parse_batch_response("Sure! " + json.dumps([v(0)]) + " hope that helps", 3)) == ["benign", None, None]
+no_ids = [{"label": "suspicious", "reason": "x", "confidence": 0.5}] * 2  # positional when ids are missing
+assert labels(detect._parse_batch_response(json.dumps(no_ids), 2)) == ["suspicious", "suspicious"]
+bad_conf = [v(0), {**v(1), "confidence": "high"}]
+assert labels(detect._parse_batch_response(json.dumps(bad_conf), 2)) == ["benign", None]
+for garbled in ("", "I cannot help with that.", "[{not json}]", "{}", "[1, 2]"):
+    assert labels(detect._parse_batch_response(garbled, 2)) == [None, None], garbled
+print("parse ok")
+
+# 2) detect_batch: one call for the batch; unanswered events get the heuristic
+class Partial(FakeChatModel):
+    """Answers only the even ids of a batch; every reply to `garble` calls is junk."""
+
+    def __init__(self, garble=False, **kw):
+        super().__init__(**kw)
+        self.garble = garble
+
+    def _answer(self, prompt):
+        out = super()._answer(prompt)
+        if self.garble:
+            return "```json\n[{oops\n```"
+        data = json.loads(out)
+        return json.dumps([d for d in data if d["id"] % 2 == 0]) if isinstance(data, list) else out
+
+events = [json.dumps({"event": "failed login", "src_ip": f"203.0.113.{i}", "user": "bob"}) for i in range(3)]
+events += [json.dumps({"event": "heartbeat", "host": f"ws-{i}"}) for i in range(3)]
+model = install(FakeChatModel(latency_ms=1))
+out = detect.detect_batch(events)
+assert model.calls == 1 and labels(out) == ["malicious"] * 3 + ["benign"] * 3, labels(out)
+assert out[0].reason == "repeated failed logins, possible brute force"
+
+detect.TIER_COUNTS.clear()
+install(Partial(latency_ms=1))
+out = detect.detect_batch(events)
+heuristic = [o.reason.startswith("Heuristic:") for o in out]
+assert heuristic == [False, True, False, True, False, True], heuristic
+assert detect.TIER_COUNTS == {"llm": 3, "fallback": 3}, detect.TIER_COUNTS
+
+detect.TIER_COUNTS.clear()
+install(Partial(garble=True, latency_ms=1))
+out = detect.detect_batch(events)
+assert all(o.reason.startswith("Heuristic:") for o in out) and detect.TIER_COUNTS == {"fallback": 6}
+print("detect_batch ok")
+
+# 3) adetect: concurrent calls share calls of up to BATCH_SIZE events
+async def burst(evs):
+    return await asyncio.gather(*(detect.adetect(e) for e in evs))
+
+model = install(FakeChatModel(latency_ms=20))
+detect.set_batching(4, 50)
+ten = [json.dumps({"event": "heartbeat", "n": i}) for i in range(10)]
+out = asyncio.run(burst(ten))
+assert model.calls == 3 and labels(out) == ["benign"] * 10, model.calls  # 4 + 4 + 2
+
+# a lone event waits at most BATCH_WAIT_MS for company
+async def lone():
+    t = time.perf_counter()
+    await detect.adetect(ten[0])
+    return time.perf_counter() - t
+elapsed = asyncio.run(lone())
+assert 0.05 <= elapsed < 0.05 + 0.02 + 0.1, elapsed
+
+# garbled replies under adetect fall back per event too
+detect.TIER_COUNTS.clear()
+install(Partial(garble=True, latency_ms=5))
+out = asyncio.run(burst(events[:4]))
+assert labels(out) == ["malicious"] * 3 + ["benign"] and detect.TIER_COUNTS == {"fallback": 4}
+print("adetect batching ok")
+
+# 4) retune while events are queued or half-collected: every caller still gets a verdict
+async def retune():
+    detect.set_batching(8, 200)
+    calls = [asyncio.create_task(detect.adetect(e)) for e in events[:5]]
+    await asyncio.sleep(0.003)  # the worker holds a partial batch
+    detect.set_batching(2, 10)
+    t = time.perf_counter()
+    first = await asyncio.wait_for(asyncio.gather(*calls), 2)
+    flushed = time.perf_counter() - t
+    more = await asyncio.wait_for(asyncio.gather(*(detect.adetect(e) for e in events)), 2)
+    return first, flushed, more
+
+model = install(FakeChatModel(latency_ms=5))
+first, flushed, more = asyncio.run(retune())
+assert labels(first) == ["malicious"] * 3 + ["benign"] * 2, labels(first)
+assert flushed < 0.1, flushed  # flushed at the retune, not after the old 200 ms wait
+assert labels(more) == ["malicious"] * 3 + ["benign"] * 3 and model.calls == 1 + 3, model.calls
+
+# retuned from another thread, with events queued behind the partial batch
+async def retune_threaded():
+    detect.set_batching(2, 200)
+    calls = [asyncio.create_task(detect.adetect(e)) for e in events]
+    await asyncio.sleep(0.003)
+    await asyncio.to_thread(detect.set_batching, 1, 0)
+    return await asyncio.wait_for(asyncio.gather(*calls), 2)
+
+out = asyncio.run(retune_threaded())
+assert labels(out) == ["malicious"] * 3 + ["benign"] * 3
+detect.set_batching(1, 20)
+print("retune ok")
+print("OK")
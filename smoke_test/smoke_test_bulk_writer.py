@@ -0,0 +1,86 @@
+# smoke_test/smoke_test_bulk_writer.py
+# Bulk alert writer against the local _bulk stub: batching, retries, dead-letter, drain.
+import json, os, sys, tempfile, threading, time
+from datetime import datetime, timezone
+sys.path.insert(0, "smoke_test")
+from es_bulk_stub_server import serve, BulkHandler
+
+from storage.es import BulkWriter, ESBulkSink, FileSink
+from storage.schema import Alert, Detection
+
+def mk(i: int) -> Alert:
+    return Alert(event_id=f"evt-{i}", ts=datetime.now(timezone.utc), raw={"n": i},
+                 detection=Detection(label="suspicious", reason="smoke", confidence=0.5))
+
+tmp = tempfile.mkdtemp()
+
+# 1) every 7th doc is rejected with 429 once; the retry must land all of them
+srv = serve(fail_every=7)
+w = BulkWriter(ESBulkSink(f"http://127.0.0.1:{srv.server_port}"), batch_size=100,
+               flush_interval=0.05, retry_backoff=0.01,
+               dead_letter_path=os.path.join(tmp, "dlq.ndjson"))
+t0 = time.perf_counter()
+for i in range(1000):
+    w.enqueue(mk(i))
+enq = time.perf_counter() - t0
+w.close()
+m = w.metrics()
+print(f"enqueue 1000: {enq*1000:.1f} ms; bulk requests: {BulkHandler.bulk_requests}; metrics: {m}")
+assert len(BulkHandler.docs) == 1000 and m["written"] == 1000 and m["retried"] > 0
+assert m["dead_lettered"] == 0 and m["queue_depth"] == 0
+
+# 2) sink that is down -> retries exhausted -> dead-letter file
+class Down:
+    def write(self, docs):
+        raise ConnectionError("cluster unreachable")
+dlq = os.path.join(tmp, "dlq2.ndjson")
+w = BulkWriter(Down(), batch_size=10, flush_interval=0.01, max_retries=2, retry_backoff=0.001,
+               dead_letter_path=dlq)
+for i in range(25):
+    w.enqueue(mk(i))
+w.close()
+rows = [json.loads(l) for l in open(dlq)]
+print("dead-lettered:", len(rows), rows[0]["error"])
+assert len(rows) == 25 and rows[0]["alert"]["event_id"] == "evt-0"
+
+# 3) backpressure: a tiny queue in front of a slow sink blocks producers instead of growing
+class Slow(FileSink):
+    def write(self, docs):
+        time.sleep(0.02)
+        return super().write(docs)
+out = os.path.join(tmp, "alerts.ndjson")
+w = BulkWriter(Slow(out), max_queue=8, batch_size=4, flush_interval=0.01,
+               dead_letter_path=os.path.join(tmp, "dlq3.ndjson"))
+for i in range(64):
+    w.enqueue(mk(i))
+    assert w.depth() <= 8
+w.close()
+print("backpressure waits:", w.metrics()["backpressure_waits"])
+assert w.metrics()["backpressure_waits"] > 0
+assert sum(1 for _ in open(out)) == 64
+
+# 4) the cluster refuses a whole request with a 4xx: dead-lettered at once, not retried
+srv = serve(reject_status=400)
+dlq = os.path.join(tmp, "dlq4.ndjson")
+w = BulkWriter(ESBulkSink(f"http://127.0.0.1:{srv.server_port}"), batch_size=10, flush_interval=0.01,
+               retry_backoff=0.5, dead_letter_path=dlq)
+before = BulkHandler.bulk_requests
+for i in range(10):
+    w.enqueue(mk(i))
+w.close()
+m = w.metrics()
+assert BulkHandler.bulk_requests - before == 1 and m["retried"] == 0, m
+assert m["dead_lettered"] == 10 and sum(1 for _ in open(dlq)) == 10
+srv.shutdown()
+
+# 5) counters stay exact with many producers
+w = BulkWriter(FileSink(os.path.join(tmp, "many.ndjson")), max_queue=16, batch_size=8, flush_interval=0.005,
+               dead_letter_path=os.path.join(tmp, "dlq5.ndjson"))
+threads = [threading.Thread(target=lambda: [w.enqueue(mk(i)) for i in range(250)]) for _ in range(8)]
+for t in threads: t.start()
+for t in threads: t.join()
+w.close()
+m = w.metrics()
+print("8 producers:", m["enqueued"], "enqueued,", m["backpressure_waits"], "waits")
+assert m["enqueued"] == m["written"] == 2000 and m["dead_lettered"] == 0, m
+print("OK")
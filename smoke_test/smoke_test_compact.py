@@ -0,0 +1,68 @@
+# smoke_test/smoke_test_compact.py
+# Prompt compaction: ranking, head/tail truncation, repeated-item collapse, the hard
+# token budget, stable key order, and detect's prompts going through it.
+import json, os
+
+os.environ.setdefault("ALERT_DB", "")
+os.environ["DETECT_CACHE_SIZE"] = "0"
+from agents import compact, detect
+from agents.compact import count_tokens
+from bench.events import make_events
+from bench.fake_llm import FakeChatModel, install
+from metrics import PROMPT_TOKENS
+
+# 1) a small event keeps every field and value; only the key order changes
+e = {"ts": "2025-08-14T10:00:00Z", "user": "alice", "event": "failed login", "src_ip": "203.0.113.45"}
+out, before, after = compact.compact(json.dumps(e))
+assert json.loads(out) == e and list(json.loads(out)) == ["event", "src_ip", "user", "ts"], out
+assert before == count_tokens(json.dumps(e))
+
+# 2) same fields in another order -> byte-identical output (stable prompt prefix)
+assert compact.compact(json.dumps(dict(reversed(list(e.items())))))[0] == out
+
+# 3) long values keep head and tail; repeats collapse; long lists keep first and last
+cmd = "powershell -enc " + "QUFB" * 500 + " END-MARKER"
+d = json.loads(compact.compact(json.dumps({"event": "x", "cmdline": cmd,
+                                           "modules": ["a.dll"] * 50 + [f"m{i}.dll" for i in range(20)]}),
+                               budget=10_000)[0])
+assert d["cmdline"].startswith("powershell -enc QUFB") and d["cmdline"].endswith("END-MARKER"), d["cmdline"]
+assert "chars]..." in d["cmdline"] and len(d["cmdline"]) < 300
+assert d["modules"][0] == {"item": "a.dll", "repeated": 50} and d["modules"][-1] == "m19.dll"
+assert len(d["modules"]) == compact.LIST_ITEMS + 1 and "more items" in d["modules"][-2], d["modules"]
+
+# 4) hard budget on verbose EDR events: bulky fields go first, the verdict-bearing ones stay
+for budget in (512, 200, 64):
+    for ev in make_events(30, 7, {"verbose_edr": 1.0}):
+        out, before, after = compact.compact(json.dumps(ev), budget=budget)
+        assert after <= budget < before, (budget, before, after)
+        assert count_tokens(out) == after
+        d = json.loads(out)
+        om = d["_omitted"]  # field names, or only their number when even those don't fit
+        assert d["event"] == ev["event"] and "env" not in d and (isinstance(om, int) or "env" in om), om
+print("budgets ok:", before, "->", after, "tokens at budget", budget)
+
+# 5) not JSON, or one giant field: cut as text, still within budget
+out, _, after = compact.compact("x" * 50_000, budget=100)
+assert after <= 100 and out.startswith("xxx") and out.endswith("xxx")
+out, _, after = compact.compact(json.dumps({"event": "A" * 50_000}), budget=40)
+assert after <= 40
+assert compact.compact(json.dumps(e), budget=0)[0] == json.dumps(e)  # off
+
+# 6) detect prompts carry the compacted event; tokens recorded before and after
+model = install(FakeChatModel(latency_ms=0))
+prompts = []
+_answer = model._answer
+model._answer = lambda p: prompts.append(p) or _answer(p)
+detect.TIERED = False
+big = make_events(1, 3, {"verbose_edr": 1.0})[0]
+det = detect.detect(json.dumps(big))
+assert det.label in {"benign", "suspicious", "malicious"} and len(prompts) == 1
+sent = prompts[0].split("Event JSON:", 1)[1].strip()
+assert count_tokens(sent) <= compact.BUDGET < count_tokens(json.dumps(big))
+assert prompts[0].startswith(detect.PROMPT.format(event_json=""))  # fixed prefix, event last
+detect.detect_batch([json.dumps(big), json.dumps(e)])
+assert "_omitted" in prompts[1] and "0: " in prompts[1] and "1: " in prompts[1]
+stages = {s[1]["stage"]: v for s in PROMPT_TOKENS.samples() if s[0] == "_count" for v in [s[2]]}
+assert stages == {"before": 3, "after": 3}, stages
+print("detect ok:", det.label, "prompt tokens", count_tokens(prompts[0]))
+print("OK")
@@ -0,0 +1,94 @@
+# smoke_test/smoke_test_feed_index.py
+# Threat-intel feed index: nested CIDRs, parent domains, IPv6, hashes, save/load
+# through mmap, and FeedWatcher picking up a changed feed.
+import os, tempfile, time
+
+from agents.reputation_index import FeedIndex, FeedWatcher
+
+tmp = tempfile.mkdtemp()
+feeds = os.path.join(tmp, "feeds")
+os.makedirs(feeds)
+md5, sha256 = "5d41402abc4b2a76b9719d911017c592", "ab" * 32
+with open(os.path.join(feeds, "intel.txt"), "w") as f:
+    f.write("""# comment
+10.0.0.0/8,suspicious,internal-scan
+10.1.0.0/16,malicious,botnet
+10.1.2.3,unknown
+10.1.255.0/24,suspicious
+2001:db8::/32,suspicious
+2001:db8:bad::/48,malicious,c2
+example.com,suspicious
+evil.example.com,malicious,phishing
+%s,malicious,emotet
+%s
+""" % (md5.upper(), sha256))
+with open(os.path.join(feeds, "vendor.csv"), "w") as f:
+    f.write("10.9.9.9,malicious\nexample.com,malicious,typosquat\n")
+
+def check(idx):
+    rep = lambda e: e and e[0]
+    # nested CIDRs: the most specific range wins, on both sides of an inner one
+    assert idx.lookup_ip("10.200.0.1") == ("suspicious", "intel", ("internal-scan",))
+    assert idx.lookup_ip("10.1.0.0") == ("malicious", "intel", ("botnet",))
+    assert rep(idx.lookup_ip("10.1.2.2")) == rep(idx.lookup_ip("10.1.2.4")) == "malicious"
+    assert rep(idx.lookup_ip("10.1.2.3")) == "unknown"
+    assert rep(idx.lookup_ip("10.1.255.255")) == "suspicious"  # inner range at the outer one's end
+    assert rep(idx.lookup_ip("10.2.0.0")) == "suspicious"
+    assert rep(idx.lookup_ip("10.255.255.255")) == "suspicious"
+    assert idx.lookup_ip("10.9.9.9") == ("malicious", "vendor", ())
+    assert idx.lookup_ip("11.0.0.0") is None and idx.lookup_ip("9.255.255.255") is None
+    assert idx.lookup_ip("not-an-ip") is None
+    # IPv6, nested too
+    assert rep(idx.lookup_ip("2001:db8::1")) == "suspicious"
+    assert idx.lookup_ip("2001:db8:bad:1::7") == ("malicious", "intel", ("c2",))
+    assert idx.lookup_ip("2001:db9::1") is None
+    # domains: the name itself or its nearest listed parent; worst of two feeds kept
+    assert idx.lookup_domain("evil.example.com") == ("malicious", "intel", ("phishing",))
+    assert idx.lookup_domain("a.b.EVIL.example.com.") == ("malicious", "intel", ("phishing",))
+    assert idx.lookup_domain("www.example.com") == ("malicious", "vendor", ("typosquat",))
+    assert idx.lookup_domain("example.org") is None and idx.lookup_domain("com") is None
+    assert idx.lookup_domain("notexample.com") is None
+    # hashes, case-insensitive; other lengths and non-hex miss
+    assert idx.lookup_hash(md5) == ("malicious", "intel", ("emotet",))
+    assert idx.lookup_hash(sha256.upper()) == ("malicious", "intel", ())
+    assert idx.lookup_hash(md5[:-1] + "0") is None and idx.lookup_hash("zz" * 16) is None
+    assert idx.lookup_hash("ab" * 20) is None
+
+files = sorted(os.path.join(feeds, n) for n in os.listdir(feeds))
+built = FeedIndex.from_feeds(files)
+check(built)
+path = os.path.join(tmp, "feeds.idx")
+built.save(path)
+loaded = FeedIndex.load(path)
+assert loaded._mm is not None and len(loaded) == len(built)
+check(loaded)
+with open(os.path.join(tmp, "junk.idx"), "wb") as f:
+    f.write(b"not an index")
+try:
+    FeedIndex.load(os.path.join(tmp, "junk.idx"))
+    raise AssertionError("junk loaded")
+except ValueError:
+    pass
+print("index ok:", len(built), "intervals/keys")
+
+# the watcher maps a fresh index file instead of re-reading the feeds
+w = FeedWatcher(feeds, index_file=path)
+assert w.index._mm is not None
+check(w.index)
+assert not w.reload()
+
+# a changed feed is picked up by the watcher thread and swapped in
+w = FeedWatcher(feeds, index_file=path, interval=0.05)
+assert w.index.lookup_domain("new-c2.example.net") is None
+time.sleep(0.01)  # a distinct mtime
+with open(os.path.join(feeds, "vendor.csv"), "a") as f:
+    f.write("new-c2.example.net,malicious,c2\n")
+deadline = time.time() + 5
+while w.reloads == 0 and time.time() < deadline:
+    time.sleep(0.02)
+assert w.reloads == 1, "feed change not picked up"
+assert w.index.lookup_domain("x.new-c2.example.net") == ("malicious", "vendor", ("c2",))
+check(w.index)
+assert FeedIndex.load(path).lookup_domain("new-c2.example.net") is not None  # index file rewritten
+print("watcher ok")
+print("OK")
@@ -0,0 +1,138 @@
+# smoke_test/smoke_test_ingest.py
+# Streaming ingestion: syslog parsing, rotated/gzip backfill, checkpoint resume,
+# tail -F across a rotation, the UDP/TCP listener, and one pass through the real graph.
+import asyncio, gzip, json, os, random, socket, tempfile, time
+
+from ingest.checkpoint import Checkpoints
+from ingest.pipeline import Ingestor, LineParser
+from ingest.sources import read_lines, rotated
+from ingest.syslog import SyslogListener, parse_syslog
+
+class StubGraph:
+    """Records events; finishes them out of order; optionally stops the ingestor after `stop_after`."""
+    def __init__(self, stop_after=None):
+        self.seen, self.stop_after, self.ing = [], stop_after, None
+
+    async def ainvoke(self, state):
+        await asyncio.sleep(random.random() / 1000)
+        self.seen.append(state["event"]["n"])
+        if self.stop_after and len(self.seen) >= self.stop_after:
+            self.ing.stop.set()
+        return {"alert": None, "duplicate": False}
+
+# 1) syslog parsing
+e = parse_syslog("Aug 14 10:00:01 bastion sshd[4242]: Failed password for invalid user admin from 203.0.113.45 port 52144 ssh2")
+assert e["app"] == "sshd" and e["pid"] == "4242" and e["src_ip"] == "203.0.113.45" and e["user"] == "admin", e
+e = parse_syslog('<34>1 2025-08-14T10:00:01.003Z web01 nginx 77 ID47 [exampleSDID@32473 iut="3"] GET /login from 198.51.100.7')
+assert e["facility"] == "auth" and e["severity"] == "crit" and e["host"] == "web01" and e["event"].startswith("GET"), e
+assert parse_syslog("just some text") is None
+p = LineParser()
+assert p(b'{"event": {"n": 1}}') == {"n": 1} and p.fmt == "ndjson"
+assert isinstance(p(b"{broken"), ValueError) and p(b"   ") is None
+print("syslog/parsers ok")
+
+# 2) rotated archives, oldest first, read through gzip and mmap
+tmp = tempfile.mkdtemp()
+log = os.path.join(tmp, "app.log")
+def lines(a, b):
+    return "".join(json.dumps({"n": n, "event": "failed login"}) + "\n" for n in range(a, b))
+with gzip.open(log + ".2.gz", "wt") as f:
+    f.write(lines(0, 3000))
+with open(log + ".1", "w") as f:
+    f.write(lines(3000, 6000))
+with open(log, "w") as f:
+    f.write(lines(6000, 9000) + json.dumps({"n": 9000}))  # last line without newline
+assert rotated(log) == [log + ".2.gz", log + ".1"], rotated(log)
+assert [json.loads(l)["n"] for l, _ in read_lines(log + ".2.gz", 0)][-1] == 2999
+
+# 3) backfill stopped half way, then resumed from the checkpoint: every line exactly once
+ckpt = os.path.join(tmp, "ingest.ckpt")
+
+async def backfill(stop_after=None):
+    g = StubGraph(stop_after)
+    ing = g.ing = Ingestor(g, concurrency=16, checkpoints=Checkpoints(ckpt, interval=0))
+    for path in rotated(log) + [log]:
+        await ing.backfill(path)
+    await ing.drain()
+    return g.seen
+
+first = asyncio.run(backfill(stop_after=4500))
+second = asyncio.run(backfill())
+both = first + second
+print(f"resume: {len(first)} + {len(second)} events, {len(both) - len(set(both))} repeats")
+assert set(both) == set(range(9001))
+# in flight when stopped -> may be seen twice (at-least-once), never skipped
+assert len(both) - len(set(both)) <= 16
+files = json.load(open(ckpt))["files"]
+assert any(v["done"] for v in files.values() if v["path"].endswith(".gz"))
+assert asyncio.run(backfill()) == []  # nothing left
+
+# 4) tail -F: appends, then a logrotate-style rename + new file
+live = os.path.join(tmp, "live.log")
+open(live, "w").close()
+
+async def tail():
+    g = StubGraph()
+    ing = Ingestor(g, concurrency=8, poll=0.02)
+    task = asyncio.create_task(ing.tail([live]))
+    with open(live, "a") as f:
+        f.write(lines(0, 100))
+    await asyncio.sleep(0.2)
+    with open(live, "a") as f:
+        f.write(lines(100, 150) + json.dumps({"n": 150}))  # partial line, completed by the rotation
+    os.rename(live, live + ".1")
+    with open(live, "w") as f:
+        f.write(lines(151, 200))
+    for _ in range(100):
+        await asyncio.sleep(0.02)
+        if len(g.seen) >= 200:
+            break
+    ing.stop.set()
+    await task
+    await ing.drain()
+    return g.seen
+
+seen = asyncio.run(tail())
+print("tail across rotation:", len(seen), "events")
+assert sorted(seen) == list(range(200)), sorted(set(range(200)) - set(seen))
+
+# 5) syslog listener: UDP datagrams, TCP newline and octet-counted frames
+async def listen():
+    q = asyncio.Queue(maxsize=100)
+    lst = SyslogListener(q, udp=("127.0.0.1", 0), tcp=("127.0.0.1", 0))
+    await lst.start()
+    addrs = lst.addresses()
+    u = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    u.sendto(b"<38>Aug 14 10:00:01 h sshd[1]: Failed password for root from 203.0.113.9 port 1 ssh2", addrs["udp"])
+    r, w = await asyncio.open_connection(*addrs["tcp"])
+    msg = b"<38>Aug 14 10:00:02 h sshd[1]: Accepted password for bob from 10.0.0.5 port 2 ssh2"
+    w.write(msg + b"\n" + str(len(msg)).encode() + b" " + msg)
+    await w.drain()
+    got = [await asyncio.wait_for(q.get(), 2) for _ in range(3)]
+    w.close(); u.close(); lst.close()
+    return got
+
+got = asyncio.run(listen())
+assert sum(b"Accepted" in g for g in got) == 2 and sum(b"Failed" in g for g in got) == 1, got
+print("listener ok:", [parse_syslog(g.decode())["src_ip"] for g in got])
+
+# 6) the real graph (no LLM configured: heuristic detection), syslog file
+os.environ.setdefault("ALERT_DB", "")
+from graph import build_graph
+auth = os.path.join(tmp, "auth.log")
+with open(auth, "w") as f:
+    for i in range(50):
+        f.write(f"Aug 14 10:00:{i:02d} bastion sshd[{100 + i}]: Failed password for user{i % 7} "
+                f"from 203.0.113.{i % 3 + 1} port {40000 + i} ssh2\n")
+
+async def real():
+    ing = Ingestor(build_graph(aggregator=None), concurrency=8)
+    t0 = time.perf_counter()
+    await ing.backfill(auth)
+    await ing.drain()
+    return ing, time.perf_counter() - t0
+
+ing, wall = asyncio.run(real())
+print(ing.progress(), f"in {wall:.2f}s")
+assert ing.stats["events"] == 50 and ing.stats["errors"] == 0
+print("OK")
@@ -0,0 +1,69 @@
+# smoke_test/smoke_test_ingest_batch.py
+# /ingest/batch streaming: results go out as soon as they finish even while the
+# client is idle, at most BATCH_CONCURRENCY run at once, every input gets a line.
+import asyncio, json, os, time
+
+os.environ.setdefault("ALERT_DB", "")
+import main
+
+running, peak = 0, 0
+
+async def fake_run_one(i, event):
+    global running, peak
+    running += 1
+    peak = max(peak, running)
+    await asyncio.sleep(event.get("ms", 1) / 1000)
+    running -= 1
+    return (json.dumps({"index": i, "ok": True}) + "\n").encode()
+
+real_run_one, main._run_one = main._run_one, fake_run_one
+
+# 1) a slow client: the first result is out long before the next line arrives
+async def slow_client():
+    async def events():
+        yield 0, {"ms": 5}
+        await asyncio.sleep(0.5)
+        yield 1, {"ms": 5}
+    t0, seen = time.perf_counter(), []
+    async for line in main._run_batch(events()):
+        seen.append((json.loads(line)["index"], time.perf_counter() - t0))
+    return seen
+
+seen = asyncio.run(slow_client())
+assert [i for i, _ in seen] == [0, 1] and seen[0][1] < 0.2 <= seen[1][1], seen
+
+# 2) a fast client: bounded concurrency, completion order, nothing lost
+main.BATCH_CONCURRENCY = 4
+async def fast_client(n):
+    async def events():
+        for i in range(n):
+            yield i, {"ms": 20 if i % 2 else 1}
+    return [json.loads(line)["index"] async for line in main._run_batch(events())]
+
+order = asyncio.run(fast_client(40))
+assert sorted(order) == list(range(40)) and order != list(range(40)), order
+assert peak == 4, peak
+
+# 3) a client that goes away mid-stream leaves nothing running
+async def abandoned():
+    async def events():
+        for i in range(10):
+            yield i, {"ms": 50}
+    gen = main._run_batch(events())
+    await anext(gen)
+    await gen.aclose()
+    await asyncio.sleep(0.01)
+    return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+assert asyncio.run(abandoned()) == [] and running == 0
+main._run_one = real_run_one
+
+# 4) through the endpoint, with a malformed line
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+body = "\n".join([json.dumps({"event": "failed password", "src_ip": "198.51.100.9"}), "{oops",
+                  json.dumps({"event": {"event": "heartbeat"}})])
+r = client.post("/ingest/batch", content=body, headers={"content-type": "application/x-ndjson"})
+rows = sorted((json.loads(l) for l in r.text.splitlines()), key=lambda d: d["index"])
+assert [d["ok"] for d in rows] == [True, False, True], rows
+print("OK")
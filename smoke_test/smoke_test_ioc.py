@@ -2,4 +2,22 @@
 from agents.ioc_extract import extract_iocs
 s = "Failed logins from 203.0.113.45 against https://example.com/login; hash=5d41402abc4b2a76b9719d911017c592; contact secops@example.org"
 print([f"{i.type}:{i.value}" for i in extract_iocs(s)])
-# expected: ['ip:203.0.113.45','url:https://example.com/login','hash:5d41402abc4b2a76b9719d911017c592','domain:example.com','email:secops@example.org']
+# expected: ['ip:203.0.113.45','url:https://example.com/login','domain:example.com','hash:5d41402abc4b2a76b9719d911017c592','email:secops@example.org','domain:example.org']
+
+# what a URL carries is extracted too: redirect targets, emails, IPs
+s = "click https://t.example.com/c?r=https://evil.net/p#to=bob@mail.example.org&via=198.51.100.7"
+got = [f"{i.type}:{i.value}" for i in extract_iocs(s)]
+assert got == ["url:https://t.example.com/c?r=https://evil.net/p#to=bob@mail.example.org&via=198.51.100.7",
+               "domain:t.example.com", "domain:evil.net", "email:bob@mail.example.org",
+               "domain:mail.example.org", "ip:198.51.100.7"], got
+
+# same IOC sets as the five-sweep extractor it replaced
+from bench.bench_ioc_extract import differences, make_events
+# hosts whose first labels look like an IP or a hash stay whole, and still yield the IP/hash
+edge = ["host 10.0.0.1.example.com up", "5d41402abc4b2a76b9719d911017c592.example.com",
+        "mail a.b@10.1.2.3.evil.com", "see http://10.0.0.1.evil.com/x?y=192.0.2.7", "build 10.0.0.1.5 ok",
+        "ip 10.0.0.1. done", "cdn.5d41402abc4b2a76b9719d911017c592.net"]
+assert {(i.type, i.value) for i in extract_iocs(edge[0])} == {("domain", "10.0.0.1.example.com"), ("ip", "10.0.0.1")}
+differ = differences(make_events(2000) + [s] + edge)
+assert not differ, differ[:3]
+print("OK")
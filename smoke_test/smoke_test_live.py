@@ -0,0 +1,81 @@
+# smoke_test/smoke_test_live.py
+# Live-view aggregates: window roll-off, bounded top-N under an IP flood, alert
+# shapes (AlertRec, worker JSON, dict), and GET /live fed by /ingest.
+import json, os
+
+os.environ.setdefault("ALERT_DB", "")
+from live import LiveStats, _bump
+from pool import RemoteAlert
+
+class Clock:
+    t = 1_700_000_000.0
+    def __call__(self):
+        return self.t
+
+def alert(sev, ip, *techs):
+    return {"ts": "2025-08-14T10:00:00Z", "severity": sev, "raw": {"event": "failed login", "src_ip": ip},
+            "detection": {"label": "suspicious"},
+            "mitre": [{"tactic": "x", "technique_id": t, "technique": f"name {t}"} for t in techs]}
+
+# 1) counts, top-N and per-minute rate over a 5-minute window
+clock = Clock()
+live = LiveStats(window_minutes=5, top_capacity=64, recent=3, clock=clock)
+for i in range(100):
+    live.add(alert("high" if i % 4 else "critical", "203.0.113.45" if i % 2 else f"10.0.0.{i}", "T1110"))
+clock.t += 60
+for i in range(30):
+    live.add(alert("low", "198.51.100.7", "T1566", "T1110"))
+s = live.snapshot(top=3)
+assert s["total"] == 130 and s["seen"] == 130, s
+assert s["severity"] == {"low": 30, "medium": 0, "high": 75, "critical": 25}, s["severity"]
+assert s["top_techniques"][0] == ["T1110", "name T1110", 130] and s["top_techniques"][1][0] == "T1566"
+assert s["top_sources"][0] == ["203.0.113.45", 50] and s["top_sources"][1] == ["198.51.100.7", 30]
+assert [n for _, n in s["per_minute"]] == [0, 0, 0, 100, 30]
+assert len(s["recent"]) == 3 and s["recent"][0]["severity"] == "low"
+
+# 2) minutes roll off the window; the ring never holds more than `window` slots
+clock.t += 4 * 60
+s = live.snapshot()
+assert s["total"] == 30 and s["severity"]["high"] == 0 and [n for _, n in s["per_minute"]] == [30, 0, 0, 0, 0]
+clock.t += 60
+assert live.snapshot()["total"] == 0 and live.snapshot()["top_sources"] == []
+
+# 3) a flood of distinct IPs: counters stay at capacity, the heavy hitter survives
+for i in range(50_000):
+    live.add(alert("medium", f"10.{i // 256 % 256}.{i % 256}.1" if i % 5 else "192.0.2.66"))
+slot = live.slots[int(clock() // 60) % live.window]
+assert len(slot.sources) <= 64, len(slot.sources)
+top = live.snapshot(top=1)["top_sources"][0]
+assert top[0] == "192.0.2.66" and 10_000 - 50_000 // 65 <= top[1] <= 10_000, top
+c = {}
+for k in "aabacadae":
+    _bump(c, k, 2)
+assert c == {"a": 3}, c  # five "a"s, less one decrement each for c and e arriving to a full counter
+print("aggregates ok:", live.snapshot(top=2)["top_sources"])
+
+# 4) the shapes the API hands over: AlertRec, a pool worker's JSON, a dict
+from graph import build_graph
+g = build_graph(aggregator=None)
+rec = g.invoke({"event": {"event": "multiple failed logins", "src_ip": "203.0.113.45", "user": "alice"}})["alert"]
+live2 = LiveStats(window_minutes=2)
+live2.add(rec)
+live2.add(RemoteAlert(rec.to_json()))
+live2.add(rec.to_dict())
+live2.add(None)
+s = live2.snapshot()
+assert s["total"] == 3 and s["top_sources"] == [["203.0.113.45", 3]], s
+assert len({json.dumps(r, sort_keys=True) for r in s["recent"]}) == 1, s["recent"]
+
+# 5) GET /live reflects /ingest and /ingest/batch traffic
+from fastapi.testclient import TestClient
+import main
+main.LIVE = LiveStats(window_minutes=10)
+client = TestClient(main.app)
+assert client.post("/ingest", json={"event": {"event": "failed login", "src_ip": "198.51.100.9"}}).status_code == 200
+body = "\n".join(json.dumps({"event": "failed password", "src_ip": "198.51.100.9", "n": i}) for i in range(5))
+r = client.post("/ingest/batch", content=body, headers={"content-type": "application/x-ndjson"})
+assert r.status_code == 200 and len(r.text.splitlines()) == 5
+s = client.get("/live", params={"top": 1, "recent": 2}).json()
+print("GET /live:", {k: s[k] for k in ("total", "severity", "top_sources")})
+assert s["top_sources"] == [["198.51.100.9", s["total"]]] and s["total"] >= 1 and len(s["recent"]) <= 2
+print("OK")
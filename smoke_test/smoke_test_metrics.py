@@ -0,0 +1,30 @@
+# smoke_test/smoke_test_metrics.py
+# /metrics and ?profile=true through the FastAPI app, no server needed.
+import os
+os.environ.setdefault("ALERT_DB", "")
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+evt = {"event": {"src_ip": "203.0.113.45", "user": "alice", "event": "multiple failed logins"}}
+for _ in range(3):
+    assert client.post("/ingest", json=evt).status_code == 200
+
+r = client.post("/ingest?profile=true", json=evt)
+prof = r.json()["profile"]
+print(f"profile: {prof['samples']} samples in {prof['elapsed_ms']} ms; top: {prof['top'][:3]}")
+assert "top" in prof and "collapsed" in prof
+
+text = client.get("/metrics").text
+for line in ('# TYPE pipeline_node_seconds histogram',
+             'pipeline_node_seconds_count{node="detect"} 4',
+             'pipeline_node_seconds_bucket{node="persist",le="+Inf"} 4',
+             'alerts_total{severity="critical"} 4',
+             'osint_cache_hits_total',
+             'detect_heuristic_fallback_total',
+             'detect_cache_misses_total'):
+    assert line in text, line
+print("\n".join(l for l in text.splitlines() if l.startswith(("pipeline_node_seconds_sum", "alerts_total", "osint_cache"))))
+assert "detect_cache" in client.get("/health").json()
+print("metrics ok")
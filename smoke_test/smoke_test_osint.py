@@ -1,5 +1,6 @@
 from agents.ioc_extract import extract_iocs
-from agents.osint import enrich
+from agents.osint import _cache_key, enrich
+from storage.records import IOCRec
 
 s = "Failed logins from 203.0.113.45 against https://example.com/login; contact secops@example.org"
 iocs = extract_iocs(s)
@@ -7,4 +8,14 @@ enriched = enrich(iocs)
 
 print("IOCs:", [f"{i.type}:{i.value}" for i in iocs])
 for k, v in enriched.items():
-    print(k, "=>", v.model_dump())
+    print(k, "=>", v.to_dict())
+
+# cache keys fold case only where the indicator is case-insensitive
+key = lambda t, v: _cache_key(IOCRec(t, v))
+assert key("url", "HTTPS://Example.COM/Login?Next=A") == key("url", "https://example.com/Login?Next=A")
+assert key("url", "http://x/A") != key("url", "http://x/a")
+assert key("url", "http://Bob@X.org/p") == key("url", "http://Bob@x.org/p") != key("url", "http://bob@x.org/p")
+assert key("domain", "Evil.COM") == key("domain", "evil.com") and key("hash", "ABC") == key("hash", "abc")
+assert key("email", "Ops@Example.org") == key("email", "ops@example.org")
+assert key("file_path", "C:/Temp/A.exe") != key("file_path", "c:/temp/a.exe")
+print("cache keys ok")
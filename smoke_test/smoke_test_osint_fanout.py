@@ -0,0 +1,64 @@
+# smoke_test/smoke_test_osint_fanout.py
+# Concurrent provider fan-out + single-flight against the local stub (no network needed).
+import sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, "smoke_test")
+from osint_stub_server import serve, StubHandler
+
+from agents import osint
+from agents.osint_providers import JSONProvider, Provider
+from storage.schema import IOC
+
+LATENCY = 0.2
+srv = serve(latency=LATENCY)
+osint.register_provider(JSONProvider(f"http://127.0.0.1:{srv.server_port}", timeout=2))
+
+iocs = [IOC(type="ip", value=f"198.51.100.{i}") for i in range(10)]
+StubHandler.peak_in_flight = 0
+t0 = time.perf_counter()
+res = osint.enrich(iocs)
+dt = time.perf_counter() - t0
+print(f"10 IOCs in {dt:.2f}s (stub latency {LATENCY}s each), peak {StubHandler.peak_in_flight} in flight")
+# overlap seen by the stub, not wall time: a loaded machine is slow but still concurrent
+assert StubHandler.peak_in_flight >= 5, "lookups were not concurrent"
+assert all(f.reputation == "malicious" and "JSONProvider" in f.sources for f in res.values())
+
+# 20 alerts in flight asking for the same fresh indicator -> one upstream request
+before = StubHandler.requests_seen
+same = [IOC(type="domain", value="evil-updates.net")]
+with ThreadPoolExecutor(20) as ex:
+    list(ex.map(lambda _: osint.enrich(same), range(20)))
+print("upstream requests for 20 concurrent lookups:", StubHandler.requests_seen - before)
+assert StubHandler.requests_seen - before == 1
+
+# a provider that didn't answer: the finding is cached only briefly, then asked again
+class Flaky(Provider):
+    name, types = "flaky", {"ip"}
+
+    def _lookup(self, ioc):
+        raise TimeoutError
+
+flaky = Flaky()
+osint.register_provider(flaky)
+ioc = IOC(type="ip", value="198.51.100.200")
+t0 = time.time()
+assert osint.enrich([ioc])[ioc.value].reputation == "malicious"  # the stub still answered
+assert osint._CACHE._data[osint._cache_key(ioc)][1] - t0 >= osint.TTL_BY_REPUTATION["malicious"] - 1
+ioc = IOC(type="ip", value="192.0.2.10")  # unknown to the stub: kept for TTL_INCOMPLETE only
+assert osint.enrich([ioc])[ioc.value].reputation == "unknown"
+assert osint._CACHE._data[osint._cache_key(ioc)][1] - t0 <= osint.TTL_INCOMPLETE + 1
+
+# provider counters stay exact under concurrent lookups
+before = flaky.stats_snapshot()
+threads = [threading.Thread(target=lambda: [flaky.lookup(ioc) for _ in range(500)]) for _ in range(8)]
+for t in threads: t.start()
+for t in threads: t.join()
+after = flaky.stats_snapshot()
+assert after["calls"] - before["calls"] == after["errors"] - before["errors"] == 4000, after
+try:
+    type("NoLookup", (Provider,), {})()
+    raise AssertionError("Provider without _lookup() instantiated")
+except TypeError:
+    pass
+print(osint.provider_stats())
+print("[OK] osint fan-out smoke passed")
@@ -0,0 +1,60 @@
+# smoke_test/smoke_test_pool.py
+# Shared-memory ring (wrap-around, full ring) and the key-affine worker pool end to end.
+import asyncio, os, random, threading
+
+os.environ.setdefault("ALERT_DB", "")
+from pool import ShardedPool, ShmRing
+
+def ring_roundtrip():
+    # 1) ring: variable-size records through a small ring wrap many times, in order
+    ring = ShmRing(1000, threading.Semaphore(0))
+    rnd = random.Random(7)
+    sent, got = [], []
+    for i in range(5000):
+        payload = bytes([i % 251]) * rnd.randint(0, 300)
+        while not ring.put(i, payload):  # full: consume one, retry
+            ring.items.acquire()
+            got.append(ring.get())
+        sent.append((i, payload))
+    while ring.items.acquire(blocking=False):
+        got.append(ring.get())
+    assert got == sent, "ring lost or reordered records"
+    try:
+        ring.put(0, b"x" * 2000)
+        raise AssertionError("oversized record accepted")
+    except ValueError:
+        pass
+    ring.close(unlink=True)
+    print("ring ok: 5000 records through a 1000-byte ring")
+
+def pool_end_to_end():
+    # 2) routing: one worker per src_ip; keyless events spread round-robin
+    pool = ShardedPool(2)
+    ips = [f"203.0.113.{i}" for i in range(1, 40)]
+    assert all(pool.shard({"src_ip": ip}) == pool.shard({"src_ip": ip, "user": "x"}) for ip in ips)
+    assert len({pool.shard({"src_ip": ip}) for ip in ips}) == 2
+    assert {pool.shard({"event": "no key"}) for _ in range(4)} == {0, 1}
+
+    # 3) events through the worker processes, sync and async
+    out = pool.invoke({"event": {"event": "multiple failed logins", "src_ip": "203.0.113.45", "user": "alice"}})
+    alert = out["alert"].to_model()
+    assert alert.detection.label in {"suspicious", "malicious"} and any(i.value == "203.0.113.45" for i in alert.iocs)
+    print("invoke:", alert.severity, [m.technique_id for m in alert.mitre])
+
+    async def many():
+        evs = [{"event": "failed login", "src_ip": ips[i % len(ips)], "user": f"u{i % 5}", "n": i} for i in range(300)]
+        return await asyncio.gather(*(pool.ainvoke({"event": e}) for e in evs))
+    outs = asyncio.run(many())
+    assert len(outs) == 300 and all(o["alert"] is not None for o in outs)
+    assert sorted(o["alert"].to_dict()["raw"]["n"] for o in outs) == list(range(300))
+
+    st = pool.stats()
+    sent = [w["sent"] for w in st["per_worker"]]
+    print("per worker sent:", sent, "osint hits:", [w["osint_cache"]["hits"] for w in st["per_worker"]])
+    assert sum(sent) == 301 and all(w["alive"] for w in st["per_worker"])
+    pool.close()
+    print("OK")
+
+if __name__ == "__main__":  # spawned workers re-import this module
+    ring_roundtrip()
+    pool_end_to_end()
@@ -0,0 +1,108 @@
+# smoke_test/smoke_test_scheduler.py
+# LLM admission control: prescore classes, priority order, shedding past the queue
+# limit, cancelled waiters, and adetect() under a slow model.
+import asyncio, json, os
+
+os.environ.setdefault("ALERT_DB", "")
+os.environ["DETECT_CACHE_SIZE"] = "0"
+from agents import detect
+from agents.scheduler import AdmissionQueue
+from bench.fake_llm import FakeChatModel, install
+from metrics import QUEUE_WAIT
+
+# 1) prescore: known-bad source or tooling high, keyword hits normal, noise low
+high = {"event": "failed login", "src_ip": "203.0.113.45", "user": "alice"}
+normal = {"event": "reported email", "subject": "phish?", "url": "https://billing-verify.xyz/a"}
+low = {"event": "heartbeat", "host": "ws-001.corp.example.com", "src_ip": "10.0.0.5"}
+q = AdmissionQueue(1, 2)
+scores = {k: detect.prescore(json.dumps(e)) for k, e in (("high", high), ("normal", normal), ("low", low))}
+assert [q.klass(v) for v in scores.values()] == ["high", "normal", "low"], scores
+assert detect.prescore(json.dumps({"cmd": "mimikatz sekurlsa::logonpasswords"})) >= 0.7
+print("prescore ok:", scores)
+
+# 2) order and shedding: one slot, two queue places
+async def order():
+    q = AdmissionQueue(1, 2)
+    gate, done = asyncio.Event(), []
+
+    async def job(name, score):
+        async def work():
+            await gate.wait()
+            done.append(name)
+            return name
+        return await q.run(score, work, lambda: f"shed:{name}")
+    first = asyncio.create_task(job("first", 0.1))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(job(n, s)) for n, s in
+             (("low1", 0.1), ("normal", 0.5), ("low2", 0.1), ("high1", 0.9), ("high2", 0.8), ("high3", 0.95))]
+    await asyncio.sleep(0)
+    # low2 arrived to a full queue, ranked last: shed; high1 then pushed out low1;
+    # high2 pushed out normal; high3 queues past the limit (high is never shed)
+    assert q.stats()["queued"] == {"high": 3} and q.shed == {"low": 2, "normal": 1}, q.stats()
+    gate.set()
+    results = await asyncio.gather(first, *tasks)
+    assert results == ["first", "shed:low1", "shed:normal", "shed:low2", "high1", "high2", "high3"], results
+    assert done == ["first", "high3", "high1", "high2"], done
+    assert q.inflight == 0 and not q._heap
+
+    # a cancelled waiter leaves no slot behind
+    gate.clear()
+    t1 = asyncio.create_task(job("a", 0.5))
+    t2 = asyncio.create_task(job("b", 0.5))
+    await asyncio.sleep(0)
+    t2.cancel()
+    await asyncio.sleep(0)
+    assert q.stats()["queued"] == {}
+    gate.set()
+    assert await t1 == "a" and q.inflight == 0
+
+    # a waiter cancelled while the queue is full is not picked to make room
+    gate.clear()
+    q2 = AdmissionQueue(1, 1)
+    async def job2(name, score):
+        async def work():
+            await gate.wait()
+            return name
+        return await q2.run(score, work, lambda: f"shed:{name}")
+    busy = asyncio.create_task(job2("busy", 0.5))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(job2("waiter", 0.1))
+    await asyncio.sleep(0)
+    late = asyncio.create_task(job2("late", 0.5))
+    waiter.cancel()  # its future is cancelled now; late runs before the entry leaves the heap
+    await asyncio.sleep(0)
+    gate.set()
+    assert await busy == "busy" and await late == "late" and waiter.cancelled()
+    assert q2.inflight == 0 and not q2._heap
+asyncio.run(order())
+waits = {s[1]["priority"]: s[2] for s in QUEUE_WAIT.samples() if s[0] == "_count"}
+assert waits == {"low": 1, "normal": 3, "high": 3}, waits
+print("queue ok:", waits)
+
+# 3) adetect under a slow model: high-priority events come back first, noise is shed
+model = install(FakeChatModel(latency_ms=100))
+detect.TIERED = False
+detect.set_scheduling(2, 4)
+events = [json.dumps({**low, "n": i}) for i in range(12)] + [json.dumps({**high, "n": i}) for i in range(4)]
+
+async def burst():
+    finished = []
+
+    async def one(e):
+        det = await detect.adetect(e)
+        finished.append((json.loads(e)["event"], det))
+    await asyncio.gather(*(one(e) for e in events))
+    return finished
+finished = asyncio.run(burst())
+order_seen = [name for name, _ in finished]
+shed = [d for _, d in finished if "(LLM queue full)" in d.reason]
+stats = detect.tier_stats()
+assert stats["counts"]["shed"] == len(shed) >= 6 and stats["scheduler"]["shed"] == {"low": len(shed)}, stats
+assert all(name == "heartbeat" for name, d in finished if "(LLM queue full)" in d.reason)
+served = [n for n, d in finished if "(LLM queue full)" not in d.reason]
+assert served[2:6] == ["failed login"] * 4, served  # right after the two that got slots first
+assert stats["scheduler"]["inflight"] == 0 and model.calls == 16 - len(shed)
+detect.set_scheduling(0)
+assert detect.scheduler is None
+print("adetect ok:", stats["scheduler"])
+print("OK")
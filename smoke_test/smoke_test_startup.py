@@ -0,0 +1,101 @@
+# smoke_test/smoke_test_startup.py
+# Cold start: rule artifacts cached on disk (hit, rebuild on edit, corrupt file),
+# no LangChain import until an LLM is used, and the API's warm-up / GET /ready.
+import json, os, subprocess, sys, tempfile, time
+
+tmp = tempfile.mkdtemp()
+os.environ["RULES_CACHE_DIR"] = os.path.join(tmp, "cache")
+os.environ.setdefault("ALERT_DB", "")
+import storage.artifacts as artifacts
+from agents import detect, mitre
+
+# 1) MITRE rules: miss, then hit, same mappings either way
+rules = os.path.join(tmp, "mitre_rules.json")
+with open(rules, "w") as f:
+    json.dump({"rules": [{"reason_contains": ["beacon"], "tactic": "Command and Control",
+                          "technique_id": "T1071", "technique": "Application Layer Protocol"},
+                         {"tags": ["brute-force"], "tactic": "Credential Access",
+                          "technique_id": "T1110", "technique": "Brute Force"}]}, f)
+before = dict(artifacts.STATS)
+assert mitre.load_rules(rules) == 2 and artifacts.STATS["misses"] == before["misses"] + 1
+fresh = mitre._compiled
+assert mitre.load_rules(rules) == 2 and artifacts.STATS["hits"] == before["hits"] + 1
+cached = mitre._compiled
+assert cached is not fresh and cached.state() == fresh.state()
+assert [m.technique_id for m in mitre.mitre_map({}, "periodic beacon to host")] == ["T1071"]
+
+# 2) an edited file misses and replaces its old entry; a corrupt entry is rebuilt
+with open(rules, "w") as f:
+    json.dump({"rules": [{"reason_contains": ["beacon"], "tactic": "Command and Control",
+                          "technique_id": "T1071.001", "technique": "Web Protocols"}]}, f)
+os.utime(rules, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+assert mitre.load_rules(rules) == 1
+entries = [n for n in os.listdir(artifacts.CACHE_DIR) if n.startswith("mitre-")]
+assert len([n for n in entries if n.startswith(artifacts._prefix("mitre", rules))]) == 1, entries
+path = os.path.join(artifacts.CACHE_DIR, artifacts._key("mitre", 1, rules))
+with open(path, "wb") as f:
+    f.write(b"\x00garbage")
+errors = artifacts.STATS["errors"]
+assert mitre.load_rules(rules) == 1 and artifacts.STATS["errors"] == errors + 1
+assert [m.technique_id for m in mitre.mitre_map({}, "beacon")] == ["T1071.001"]
+assert mitre.load_rules(os.path.join(tmp, "missing.json")) == len(mitre.RULES)  # built-ins
+
+# 3) detection keywords go through the same cache
+kw = os.path.join(tmp, "kw.json")
+with open(kw, "w") as f:
+    json.dump({"rules": [{"label": "malicious", "confidence": 0.9, "reason": "mimikatz",
+                          "keywords": ["mimikatz", "sekurlsa"]}]}, f)
+assert detect.load_keyword_rules(kw) == 2 and detect.load_keyword_rules(kw) == 2
+assert detect._heuristic_detect('{"cmd": "sekurlsa::logonpasswords"}').label == "malicious"
+detect.load_keyword_rules()
+print("artifacts ok:", artifacts.STATS)
+
+# 4) fresh interpreters: nothing LangChain-side imported until a model is needed
+def fresh(code, **env):
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120,
+                         env={**os.environ, **env})
+    assert out.returncode == 0, out.stderr[-2000:]
+    return out.stdout.strip()
+
+probe = "import sys, {mod}; print(sorted(m for m in ('langchain_core', 'langchain_openai', 'langgraph') if m in sys.modules))"
+assert fresh(probe.format(mod="agents.detect"), OPENAI_API_KEY="sk-test") == "[]"
+assert fresh(probe.format(mod="main"), POOL_WORKERS="2") == "[]"
+assert fresh(probe.format(mod="main")) == "[]"  # graph built by the warm-up, not at import
+built = fresh("import sys, agents.detect as d; m = d.get_llm(); print(d.PROVIDER, 'langchain_openai' in sys.modules)",
+              OPENAI_API_KEY="sk-test")
+assert built == "openai True", built
+print("lazy imports ok")
+
+# 5) GET /ready: 503 before warm-up, 200 after; requests before it still work
+from fastapi.testclient import TestClient
+import main
+client = TestClient(main.app)  # no lifespan: warm-up not started
+assert client.get("/ready").status_code == 503
+with TestClient(main.app) as client:
+    for _ in range(200):
+        r = client.get("/ready")
+        if r.status_code == 200:
+            break
+        time.sleep(0.05)
+    print("ready:", r.json())
+    assert r.status_code == 200 and "graph" in r.json()["steps_ms"]
+    r = client.post("/ingest", json={"event": {"event": "failed login", "src_ip": "192.0.2.8"}})
+    assert r.status_code == 200 and r.json()["ok"]
+
+# a failing warm-up ping is recorded, not fatal: /ready still turns 200
+from agents import detect
+from bench.fake_llm import FakeChatModel, install
+
+class Down(FakeChatModel):
+    def invoke(self, prompt):
+        raise ConnectionError("provider unreachable")
+
+install(Down())
+detect.WARMUP_PING = True
+main.warmup.update(ready=False, steps_ms={}, error=None)
+main._warm_up()
+assert main.warmup["ready"] and "provider unreachable" in main.warmup["error"], main.warmup
+assert detect.PING_ERROR and TestClient(main.app).get("/ready").status_code == 200
+detect.WARMUP_PING = False
+print("failed ping ok:", main.warmup["error"])
+print("OK")
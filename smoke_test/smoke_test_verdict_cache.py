@@ -0,0 +1,80 @@
+# smoke_test/smoke_test_verdict_cache.py
+# Verdict cache in agents/detect.py: event_template masking, events of one template
+# sharing an LLM verdict (marked as reused), distinct templates not, TTL expiry,
+# LRU eviction, and the counters in tier_stats().
+import json, os, time
+
+os.environ.setdefault("ALERT_DB", "")
+os.environ["DETECT_CACHE_SIZE"] = "100"
+os.environ.pop("DETECT_CACHE_DB", None)
+os.environ.pop("DETECT_MAX_INFLIGHT", None)
+from agents import detect
+from bench.fake_llm import FakeChatModel, install
+from storage.cache import TTLCache
+from storage.schema import Detection
+
+detect.TIERED = False
+detect.set_scheduling(0)
+detect.set_batching(1, 20)
+
+# 1) event_template masks identities, times, numbers and hashes; key order doesn't matter
+a = {"event": "failed login from 203.0.113.45 at 2025-08-14T10:45:00Z", "user": "alice", "attempts": 7,
+     "md5": "5d41402abc4b2a76b9719d911017c592", "mail": "to bob@example.org", "id": "0f8fad5b-d9cb-469f-a165-70867728950e"}
+b = {"id": "1a2b3c4d-0000-4000-8000-00000000abcd", "mail": "to eve@corp.example.com", "md5": "e" * 32,
+     "attempts": 120, "user": "mallory", "event": "failed login from 198.51.100.7 at 2026-01-02 03:04:05"}
+ta, tb = detect.event_template(json.dumps(a)), detect.event_template(json.dumps(b))
+assert ta == tb, (ta, tb)
+assert json.loads(ta) == {"attempts": "<num>", "event": "failed login from <ip> at <ts>", "id": "<uuid>",
+                          "mail": "to <email>", "md5": "<hash>", "user": "<user>"}, ta
+assert detect.event_template("login failed for 10.0.0.1") == "login failed for <ip>"  # not JSON
+assert detect.event_template(json.dumps({**a, "event": "successful login"})) != ta
+assert detect.event_template(json.dumps({**a, "extra": True})) != ta
+print("template ok")
+
+# 2) one LLM call per template; the reused verdict says it was reused
+model = install(FakeChatModel(latency_ms=1))
+detect.TIER_COUNTS.clear()
+first = detect.detect(json.dumps(a))
+again = detect.detect(json.dumps(b))
+assert model.calls == 1 and detect.TIER_COUNTS == {"llm": 1, "cache": 1}, (model.calls, detect.TIER_COUNTS)
+assert again.label == first.label and again.confidence == first.confidence
+assert again.reason == first.reason + detect.CACHED_NOTE and not first.reason.endswith(detect.CACHED_NOTE)
+assert detect.detect(json.dumps(b)).reason == again.reason  # marked once, not per reuse
+
+other = {"event": "phishing email reported", "from": "billing@cdn.evil-updates.net"}
+detect.detect(json.dumps(other))
+assert model.calls == 2 and detect.TIER_COUNTS["llm"] == 2
+stats = detect.tier_stats()["cache"]
+assert stats["hits"] == 2 and stats["misses"] == 2 and stats["size"] == 2, stats
+
+# heuristic fallbacks are not cached
+class Down(FakeChatModel):
+    def invoke(self, prompt):
+        raise ConnectionError
+install(Down())
+down = {"event": "vpn session", "user": "carol"}
+assert detect.detect(json.dumps(down)).reason.startswith("Heuristic:")
+assert detect.tier_stats()["cache"]["size"] == 2
+print("shared entries ok")
+
+# 3) TTL expiry and LRU eviction
+model = install(FakeChatModel(latency_ms=1))
+detect.verdict_cache = TTLCache(maxsize=2, ttl=0.2, table="verdicts",
+                                dumps=lambda d: d.model_dump_json(), loads=Detection.model_validate_json)
+detect.detect(json.dumps(a))
+detect.detect(json.dumps(b))
+assert model.calls == 1
+time.sleep(0.25)
+detect.detect(json.dumps(b))
+assert model.calls == 2 and detect.verdict_cache.stats()["expirations"] == 1
+
+templates = [{"event": f"service {name} restarted", "host": "ws-1"} for name in ("dns", "ntp", "cron")]
+for t in templates:
+    detect.detect(json.dumps(t))
+assert model.calls == 5 and detect.verdict_cache.stats()["evictions"] == 2  # `a`, then dns
+detect.detect(json.dumps(templates[2]))  # still cached
+assert model.calls == 5
+detect.detect(json.dumps(templates[0]))  # evicted: asks again
+assert model.calls == 6
+print("ttl + eviction ok:", detect.tier_stats()["cache"])
+print("OK")
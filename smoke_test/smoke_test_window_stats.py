@@ -0,0 +1,78 @@
+# smoke_test/smoke_test_window_stats.py
+# Sliding-window sketches: brute force and spraying across events, expiry, fixed memory.
+import json, time
+
+from agents.window_stats import THRESHOLDS, WindowStats, WindowedCountMin
+from agents.detect import apply_window_signals, _heuristic_detect
+from agents.mitre import CompiledRules, load_rules_file, mitre_map, RULES_FILE
+
+class Clock:
+    t = 10_000.0
+    def __call__(self):
+        return self.t
+
+clock = Clock()
+ws = WindowStats(window=300, clock=clock)
+mem = ws.stats()["memory_bytes"]
+
+def feed(evt):
+    return ws.observe(evt, json.dumps(evt))
+
+# 1) brute force: single failed logins from one IP, none suspicious on its own text
+for i in range(12):
+    clock.t += 5
+    sig = feed({"src_ip": "203.0.113.45", "user": "alice", "event": "authentication failure", "n": i})
+assert sig["failed_logins"] == 12 and sig["distinct_users"] == 1, sig
+det = apply_window_signals(_heuristic_detect('{"event": "authentication failure"}'), sig)
+assert det.label == "malicious" and "brute force" in det.reason
+assert [m.technique_id for m in mitre_map({}, det.reason, sig)] == ["T1110"]
+
+# 2) password spraying: one attempt each for 40 users from another IP
+for i in range(40):
+    sig = feed({"src_ip": "198.51.100.7", "user": f"user{i}", "outcome": "failure"})
+assert sig["distinct_users"] == 40, sig
+ids = {m.technique_id for m in mitre_map({}, "", sig)}
+assert ids == {"T1110", "T1110.003"}, ids
+assert ws.signals("192.0.2.1") == {"failed_logins": 0, "distinct_users": 0, "bytes_out": 0}
+
+# 3) exfil volume
+for _ in range(3):
+    sig = feed({"src_ip": "10.0.0.5", "event": "upload", "bytes_out": 60 * 1024 * 1024})
+assert "T1041" in {m.technique_id for m in mitre_map({}, "", sig)}
+
+# only authentication events count a failed outcome; a bare "bytes" is not outbound
+for evt in ({"src_ip": "192.0.2.9", "event": "connection", "action": "deny", "status": "denied"},
+            {"src_ip": "192.0.2.9", "event": "file upload", "outcome": "failed", "bytes": 10 ** 9}):
+    sig = feed(evt)
+assert sig == {"failed_logins": 0, "distinct_users": 0, "bytes_out": 0}, sig
+sig = feed({"src_ip": "192.0.2.9", "event_type": "logon", "status": "FAILED"})
+assert sig["failed_logins"] == 1, sig
+
+# one set of thresholds: escalation, the built-in rules and the rules file move together
+rules = CompiledRules(load_rules_file(RULES_FILE))
+saved = dict(THRESHOLDS)
+THRESHOLDS["failed_logins"] = 12
+for n, fires in ((12, False), (13, True)):
+    s = {"failed_logins": n}
+    assert ("brute force" in apply_window_signals(_heuristic_detect("{}"), s).reason) is fires
+    assert ("T1110" in {m.technique_id for m in mitre_map({}, "", s)}) is fires
+    assert bool(rules.match(set(), "", s)) is fires
+THRESHOLDS.update(saved)
+
+# 4) counts leave the window; memory never changed
+clock.t += 301
+assert ws.signals("203.0.113.45")["failed_logins"] == 0
+assert ws.signals("198.51.100.7")["distinct_users"] == 0
+assert ws.stats()["memory_bytes"] == mem
+
+# 5) constant per-event cost and fixed memory at a million distinct keys
+cms = WindowedCountMin(window=300, clock=clock)
+before = cms.memory_bytes()
+t0 = time.perf_counter()
+for i in range(1_000_000):
+    cms.add(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+dt = time.perf_counter() - t0
+err = cms.count("10.0.0.1") - 1
+assert 0 <= err <= 10 and cms.memory_bytes() == before
+print(f"1M keys: {dt:.2f} us/add, overcount {err}, {before / 2**20:.1f} MiB; window stats {mem / 2**20:.1f} MiB")
+print("window stats ok")
@@ -0,0 +1,67 @@
+# storage/artifacts.py
+from __future__ import annotations
+import hashlib, marshal, os, sys, tempfile
+from typing import Any, Callable
+
+# On-disk cache for compiled rule sets (keyword automaton, MITRE rules), so a
+# cold process loads them instead of re-parsing and re-compiling the source.
+# Entries are keyed on the source file's path, size and mtime plus the Python
+# version and a per-kind format version, so an edited rules file or an upgrade
+# misses and rebuilds. marshal, not pickle: plain containers only, and a
+# tampered cache file can't run code on load.
+#
+# RULES_CACHE_DIR sets the directory (default rules/.cache); empty disables.
+
+CACHE_DIR = os.getenv("RULES_CACHE_DIR",
+                      os.path.join(os.path.dirname(__file__), "..", "rules", ".cache"))
+
+STATS = {"hits": 0, "misses": 0, "errors": 0}
+
+def _h(s: str) -> str:
+    return hashlib.blake2b(s.encode(), digest_size=8).hexdigest()
+
+def _prefix(kind: str, source: str) -> str:
+    return f"{kind}-{_h(os.path.realpath(source))}-"
+
+def _key(kind: str, version: int, source: str) -> str:
+    st = os.stat(source)
+    return _prefix(kind, source) + _h(f"{version}:{sys.version_info[:2]}:{st.st_size}:{st.st_mtime_ns}") + ".bin"
+
+def load_or_build(kind: str, version: int, source: str, build: Callable[[], Any],
+                  dump: Callable[[Any], Any], load: Callable[[Any], Any]) -> Any:
+    """
+    The artifact built from `source` by build(), from the cache when it's there.
+    dump(obj) gives marshal-able state and load(state) the object back; bump
+    `version` when that layout changes. A missing source raises FileNotFoundError.
+    """
+    if not CACHE_DIR:
+        return build()
+    path = os.path.join(CACHE_DIR, _key(kind, version, source))
+    try:
+        with open(path, "rb") as f:
+            obj = load(marshal.loads(f.read()))  # marshal.load(f) reads in tiny pieces
+        STATS["hits"] += 1
+        return obj
+    except FileNotFoundError:
+        pass
+    except Exception:  # truncated / foreign file: rebuild over it
+        STATS["errors"] += 1
+    STATS["misses"] += 1
+    obj = build()
+    tmp = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(marshal.dumps(dump(obj)))
+        os.replace(tmp, path)  # readers see the old file or the whole new one
+        # one entry per source file: drop the ones for its earlier versions
+        prefix, name = _prefix(kind, source), os.path.basename(path)
+        for old in os.listdir(CACHE_DIR):
+            if old.startswith(prefix) and old != name:
+                os.unlink(os.path.join(CACHE_DIR, old))
+    except OSError:
+        STATS["errors"] += 1  # read-only checkout etc.: still works, just uncached
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+    return obj
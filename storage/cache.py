@@ -0,0 +1,133 @@
+# storage/cache.py
+from __future__ import annotations
+import json, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+class TTLCache(Generic[V]):
+    """
+    Thread-safe LRU cache with per-entry TTLs and hit/miss/eviction counters.
+
+    If sqlite_path is given, every set() is written through to a local SQLite
+    table and in-memory misses fall back to it, so restarts and sibling
+    worker processes on the same host start warm. Values cross that tier as
+    JSON via dumps/loads.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: float = 600.0,
+        sqlite_path: Optional[str] = None,
+        table: str = "cache",
+        dumps: Callable[[V], str] = json.dumps,
+        loads: Callable[[str], V] = json.loads,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+        self._dumps, self._loads = dumps, loads
+        self.hits = self.misses = self.evictions = self.expirations = self.l2_hits = 0
+
+        self._db: sqlite3.Connection | None = None
+        self._table = table
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=5.0,
+                                       isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                             "(k TEXT PRIMARY KEY, v TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> V | None:
+        now = time.time()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None:
+                value, exp = hit
+                if exp > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            if self._db is not None:
+                row = self._db.execute(f"SELECT v, expires FROM {self._table} WHERE k = ?",
+                                       (key,)).fetchone()
+                if row and row[1] > now:
+                    value = self._loads(row[0])
+                    self._put(key, value, row[1])
+                    self.hits += 1
+                    self.l2_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: V, ttl: float | None = None) -> None:
+        exp = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._put(key, value, exp)
+            if self._db is not None:
+                self._db.execute(f"INSERT OR REPLACE INTO {self._table} (k, v, expires) VALUES (?, ?, ?)",
+                                 (key, self._dumps(value), exp))
+
+    def _put(self, key: str, value: V, exp: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, exp)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry (memory and SQLite); returns how many left memory."""
+        now = time.time()
+        with self._lock:
+            dead = [k for k, (_, exp) in self._data.items() if exp <= now]
+            for k in dead:
+                del self._data[k]
+            self.expirations += len(dead)
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self._table} WHERE expires <= ?", (now,))
+        return len(dead)
+
+    def start_expiry(self, interval: float = 60.0) -> None:
+        """Purge expired entries every `interval` seconds on a daemon thread."""
+        if self._reaper is not None:
+            return
+        def _loop() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.purge_expired()
+                except Exception:
+                    pass
+        self._reaper = threading.Thread(target=_loop, name="ttlcache-expiry", daemon=True)
+        self._reaper.start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self._table}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "l2_hits": self.l2_hits,
+        }
@@ -1,8 +1,299 @@
 # storage/es.py
-import json, time
+from __future__ import annotations
+import asyncio, atexit, json, os, queue, sys, threading, time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from storage.records import AlertRec, alert_json
 from storage.schema import Alert
+from storage.sqlite_store import get_store
+
+# ---- sinks ----
+# A sink takes a batch of alerts already serialized to JSON and returns the
+# indices of the ones that failed and should be retried (raising fails them all).
+
+class StdoutSink:
+    """Default sink: the old print, without the simulated IO delay."""
+
+    def write(self, docs: List[str]) -> List[int]:
+        for d in docs:
+            print("[ALERT]", d[:600])
+        return []
+
+class FileSink:
+    """Appends one alert per line (NDJSON). Handy as a local stand-in for a cluster."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, docs: List[str]) -> List[int]:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(d + "\n" for d in docs))
+        return []
+
+class ESBulkSink:
+    """Elasticsearch/OpenSearch _bulk API; only the items the cluster rejects are retried."""
+
+    def __init__(self, url: str, index: str = "alerts", timeout: float = 10.0,
+                 auth: tuple[str, str] | None = None):
+        self.url = url.rstrip("/") + "/_bulk"
+        self.index = index
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/x-ndjson"
+        if auth:
+            self.session.auth = auth
+
+    def write(self, docs: List[str]) -> List[int]:
+        lines = []
+        for d in docs:
+            # event_id doubles as _id so a retried batch doesn't duplicate documents
+            _id = json.loads(d).get("event_id")
+            lines.append(json.dumps({"index": {"_index": self.index, "_id": _id}}))
+            lines.append(d)
+        r = self.session.post(self.url, data=("\n".join(lines) + "\n").encode(), timeout=self.timeout)
+        if r.status_code == 429 or r.status_code >= 500:
+            return list(range(len(docs)))
+        if r.status_code >= 400:
+            # the cluster refused the whole request (auth, bad index, body too large):
+            # resending it can't help, so every item goes to the dead-letter file
+            reason = " ".join(r.text[:200].split())
+            print(f"[es] _bulk rejected {len(docs)} docs: HTTP {r.status_code} {reason}", file=sys.stderr)
+            return [-1 - i for i in range(len(docs))]
+        body = r.json()
+        if not body.get("errors"):
+            return []
+        failed = []
+        for i, item in enumerate(body.get("items", [])):
+            res = next(iter(item.values()), {})
+            status = res.get("status", 500)
+            # 429/5xx are worth retrying; 4xx mapping errors go straight to the dead-letter file
+            if status == 429 or status >= 500:
+                failed.append(i)
+            elif status >= 400:
+                failed.append(-1 - i)
+        return failed
+
+class TeeSink:
+    """Writes every batch to several sinks; an item failed by any of them is retried on all.
+    Both the _bulk and SQLite sinks key on event_id, so the repeat is idempotent."""
+
+    def __init__(self, sinks: List[Any]):
+        self.sinks = sinks
+
+    def write(self, docs: List[str]) -> List[int]:
+        failed: set[int] = set()
+        for sink in self.sinks:
+            try:
+                failed.update(sink.write(docs))
+            except Exception:
+                failed.update(range(len(docs)))
+        # a retry beats a permanent failure for the same item
+        return sorted(i for i in failed if i >= 0 or -1 - i not in failed)
+
+def sink_from_env():
+    sinks: List[Any] = []
+    if os.getenv("ES_URL"):
+        user, pwd = os.getenv("ES_USER"), os.getenv("ES_PASSWORD")
+        sinks.append(ESBulkSink(os.environ["ES_URL"], os.getenv("ES_INDEX", "alerts"),
+                                auth=(user, pwd) if user and pwd else None))
+    if os.getenv("ALERTS_FILE"):
+        sinks.append(FileSink(os.environ["ALERTS_FILE"]))
+    store = get_store()  # ALERT_DB: opt-in, backs GET /alerts and replay
+    if store is not None:
+        sinks.append(store)
+    if not sinks:
+        return StdoutSink()
+    return sinks[0] if len(sinks) == 1 else TeeSink(sinks)
+
+# ---- writer ----
+
+class BulkWriter:
+    """
+    Bounded queue + background thread that ships alerts to a sink in bulk.
+
+    Flushes when batch_size alerts are waiting or flush_interval seconds after
+    the first one arrived. Failed items are retried with exponential backoff,
+    then appended to dead_letter_path. When the queue is full, enqueue() blocks
+    for up to enqueue_timeout (backpressure) before dead-lettering the alert.
+    A sink may return a negative index (-1 - i) for a permanent failure of item i.
+    """
+
+    def __init__(self, sink=None, max_queue: int = 10_000, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_retries: int = 3, retry_backoff: float = 0.5,
+                 dead_letter_path: str = "alerts.deadletter.ndjson", enqueue_timeout: float = 5.0):
+        self.sink = sink if sink is not None else sink_from_env()
+        self.q: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self.enqueue_timeout = enqueue_timeout
+        self.stats: Dict[str, Any] = {"enqueued": 0, "written": 0, "retried": 0, "dead_lettered": 0,
+                                      "flushes": 0, "backpressure_waits": 0,
+                                      "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+        self._stats_lock = threading.Lock()  # producers and the writer thread both count
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    # -- producer side --
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bulk-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, alert: AlertRec | Alert) -> bool:
+        """Queue one alert; blocks while the queue is full. False if it had to be dead-lettered."""
+        doc = alert_json(alert)
+        self.start()
+        try:
+            self.q.put_nowait(doc)
+        except queue.Full:
+            self._count("backpressure_waits")
+            try:
+                self.q.put(doc, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._dead_letter([doc], "queue full")
+                return False
+        self._count("enqueued")
+        return True
+
+    async def aenqueue(self, alert: AlertRec | Alert) -> bool:
+        """enqueue() that waits for queue space without blocking the event loop."""
+        doc = alert_json(alert)
+        self.start()
+        deadline = time.monotonic() + self.enqueue_timeout
+        waited = False
+        while True:
+            try:
+                self.q.put_nowait(doc)
+                break
+            except queue.Full:
+                if not waited:
+                    self._count("backpressure_waits")
+                    waited = True
+                if time.monotonic() >= deadline:
+                    self._dead_letter([doc], "queue full")
+                    return False
+                await asyncio.sleep(0.005)
+        self._count("enqueued")
+        return True
+
+    def depth(self) -> int:
+        return self.q.qsize()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        flushes = stats["flushes"]
+        return {**stats, "total_flush_ms": round(stats["total_flush_ms"], 3),
+                "queue_depth": self.q.qsize(), "queue_max": self.q.maxsize,
+                "avg_flush_ms": round(stats["total_flush_ms"] / flushes, 3) if flushes else 0.0}
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Flush everything still queued and stop the writer thread (a later enqueue restarts it)."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            try:
+                self.q.put(None, timeout=timeout)  # sentinel: drain and exit
+            except queue.Full:
+                pass
+            thread.join(timeout)
+
+    # -- writer thread --
+    def _run(self) -> None:
+        while True:
+            item = self.q.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                # drain whatever producers managed to queue before close()
+                rest = []
+                while True:
+                    try:
+                        item = self.q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        rest.append(item)
+                for i in range(0, len(rest), self.batch_size):
+                    self._flush(rest[i:i + self.batch_size])
+                return
+
+    def _flush(self, docs: List[str]) -> None:
+        t0 = time.perf_counter()
+        pending = docs
+        for attempt in range(self.max_retries + 1):
+            try:
+                failed = self.sink.write(pending)
+                error = "rejected by sink"
+            except Exception as e:
+                failed, error = list(range(len(pending))), repr(e)
+            permanent = [pending[-1 - i] for i in failed if i < 0]
+            if permanent:
+                self._dead_letter(permanent, "permanent failure")
+            retry = [pending[i] for i in failed if i >= 0]
+            self._count("written", len(pending) - len(retry) - len(permanent))
+            if not retry:
+                break
+            pending = retry
+            if attempt < self.max_retries:
+                self._count("retried", len(retry))
+                time.sleep(self.retry_backoff * (2 ** attempt))
+        else:
+            self._dead_letter(pending, error)
+        ms = (time.perf_counter() - t0) * 1000
+        with self._stats_lock:
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = round(ms, 3)
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], round(ms, 3))
+            self.stats["total_flush_ms"] += ms
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _dead_letter(self, docs: List[str], error: str) -> None:
+        self._count("dead_lettered", len(docs))
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for d in docs:
+                    f.write(json.dumps({"error": error, "ts": time.time(), "alert": json.loads(d)}) + "\n")
+        except OSError as e:
+            print(f"[bulk-writer] dead-letter write failed: {e}", file=sys.stderr)
+
+writer = BulkWriter(
+    max_queue=int(os.getenv("ALERT_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("ALERT_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("ALERT_FLUSH_INTERVAL", "1.0")),
+    max_retries=int(os.getenv("ALERT_MAX_RETRIES", "3")),
+    dead_letter_path=os.getenv("ALERT_DEAD_LETTER", "alerts.deadletter.ndjson"),
+)
+atexit.register(writer.close)
+
+def persist_alert(alert: AlertRec | Alert) -> None:
+    writer.enqueue(alert)
 
-def persist_alert(alert: Alert) -> None:
-    # Replace with Elasticsearch/OpenSearch later.
-    print("[ALERT]", json.dumps(alert.model_dump(), default=str)[:600])
-    time.sleep(0.01)  # tiny IO-sim delay
+async def apersist_alert(alert: AlertRec | Alert) -> None:
+    await writer.aenqueue(alert)
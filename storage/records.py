@@ -0,0 +1,103 @@
+# storage/records.py
+from __future__ import annotations
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from storage.schema import Alert, Detection
+
+# Internal, unvalidated twins of the models in storage/schema.py. They carry the
+# same field names, so agents read them the same way, but cost a slotted object
+# instead of a validation pass. Alerts become pydantic only at the API boundary
+# (to_model) and go to storage straight from to_json().
+
+def _iso(d: Optional[datetime]) -> Optional[str]:
+    return d.isoformat() if d is not None else None
+
+@dataclass(slots=True, frozen=True)
+class IOCRec:
+    type: str
+    value: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "value": self.value}
+
+@dataclass(slots=True)
+class FindingRec:
+    reputation: str
+    sources: List[str] = field(default_factory=list)
+    last_seen: Optional[datetime] = None
+    tags: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"reputation": self.reputation, "sources": self.sources,
+                "last_seen": _iso(self.last_seen), "tags": self.tags}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, s: str) -> "FindingRec":
+        d = json.loads(s)
+        seen = d.get("last_seen")
+        return cls(d["reputation"], d.get("sources", []),
+                   datetime.fromisoformat(seen.replace("Z", "+00:00")) if seen else None, d.get("tags", []))
+
+@dataclass(slots=True, frozen=True)
+class MappingRec:
+    tactic: str
+    technique_id: str
+    technique: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"tactic": self.tactic, "technique_id": self.technique_id, "technique": self.technique}
+
+@dataclass(slots=True)
+class AlertRec:
+    event_id: str
+    ts: datetime
+    raw: Dict[str, Any]
+    detection: Detection
+    iocs: List[IOCRec] = field(default_factory=list)
+    osint: Dict[str, FindingRec] = field(default_factory=dict)
+    mitre: List[MappingRec] = field(default_factory=list)
+    severity: str = "low"
+    count: int = 1
+    last_seen: Optional[datetime] = None
+    signals: Dict[str, int] = field(default_factory=dict)  # kept so replay can re-map window rules
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-JSON dict in the same shape as Alert.model_dump(mode="json")."""
+        d = self.detection
+        return {
+            "event_id": self.event_id,
+            "ts": self.ts.isoformat(),
+            "raw": self.raw,
+            "detection": {"label": d.label, "reason": d.reason, "confidence": d.confidence},
+            "iocs": [i.to_dict() for i in self.iocs],
+            "osint": {k: f.to_dict() for k, f in self.osint.items()},
+            "mitre": [m.to_dict() for m in self.mitre],
+            "severity": self.severity,
+            "count": self.count,
+            "last_seen": _iso(self.last_seen),
+            "signals": self.signals,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def to_model(self) -> Alert:
+        """Validated pydantic Alert, for API responses."""
+        return Alert.model_validate(self.to_dict())
+
+    def copy(self) -> "AlertRec":
+        # IOC/mapping records are frozen and findings are shared read-only, so
+        # copying the containers is enough to isolate count/last_seen updates
+        return AlertRec(self.event_id, self.ts, self.raw, self.detection, list(self.iocs),
+                        dict(self.osint), list(self.mitre), self.severity, self.count, self.last_seen,
+                        self.signals)
+
+def alert_json(alert: AlertRec | Alert) -> str:
+    """One-step JSON for either representation (the bulk writer takes both)."""
+    return alert.to_json() if isinstance(alert, AlertRec) else alert.model_dump_json()
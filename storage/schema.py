@@ -32,3 +32,6 @@ class Alert(BaseModel):
     osint: Dict[str, OSINTFinding] = {}
     mitre: List[MitreMapping] = []
     severity: Literal["low", "medium", "high", "critical"] = "low"
+    count: int = 1                        # events folded into this alert (see agents/aggregate.py)
+    last_seen: Optional[datetime] = None  # time of the latest of them, when count > 1
+    signals: Dict[str, int] = {}          # window counters at detection time (agents/window_stats.py)
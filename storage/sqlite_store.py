@@ -0,0 +1,188 @@
+# storage/sqlite_store.py
+from __future__ import annotations
+import json, os, sqlite3, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# alerts holds the full document; alert_iocs / alert_techniques are pivot tables that
+# repeat ts so "indicator X, newest first, since T" is a single index range scan.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id        INTEGER PRIMARY KEY,
+    event_id  TEXT NOT NULL UNIQUE,
+    ts        REAL NOT NULL,
+    severity  TEXT NOT NULL,
+    label     TEXT NOT NULL,
+    doc       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_iocs (
+    alert_id  INTEGER NOT NULL REFERENCES alerts(id) ON DELETE CASCADE,
+    ts        REAL NOT NULL,
+    type      TEXT NOT NULL,
+    value     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_techniques (
+    alert_id      INTEGER NOT NULL REFERENCES alerts(id) ON DELETE CASCADE,
+    ts            REAL NOT NULL,
+    technique_id  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_alerts_ts ON alerts (ts, id);
+CREATE INDEX IF NOT EXISTS ix_alerts_sev_ts ON alerts (severity, ts, id);
+CREATE INDEX IF NOT EXISTS ix_iocs_value_ts ON alert_iocs (value, ts, alert_id);
+CREATE INDEX IF NOT EXISTS ix_tech_ts ON alert_techniques (technique_id, ts, alert_id);
+"""
+
+def _epoch(ts: Any) -> float:
+    """ISO string / datetime / number or numeric string -> epoch seconds; naive datetimes are UTC."""
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        try:
+            return float(ts)  # "1700000000", as replay's --since/--until accept
+        except ValueError:
+            ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+def _encode_cursor(ts: float, alert_id: int) -> str:
+    return f"{ts!r}:{alert_id}"
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    ts, _, alert_id = cursor.rpartition(":")
+    return float(ts), int(alert_id)
+
+class AlertStore:
+    """
+    SQLite (WAL) alert store. Also a bulk-writer sink: write() inserts a whole
+    batch of serialized alerts in one transaction. Reads use one connection per
+    thread so queries never wait on the writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        db = self._conn()
+        db.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    # ---- writes ----
+    def write(self, docs: List[str]) -> List[int]:
+        rows, iocs, techs = [], [], []
+        for d in docs:
+            a = json.loads(d)
+            ts = _epoch(a["ts"])
+            rows.append((a["event_id"], ts, a.get("severity", "low"),
+                         a.get("detection", {}).get("label", ""), d))
+            # one row per distinct value, so an indicator pivot never sees an alert twice
+            iocs.append({i["value"].lower(): i["type"] for i in a.get("iocs", [])})
+            techs.append({m["technique_id"] for m in a.get("mitre", [])})
+        db = self._conn()
+        with self._write_lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                ioc_rows, tech_rows = [], []
+                for row, ioc_set, tech_set in zip(rows, iocs, techs):
+                    cur = db.execute("INSERT OR IGNORE INTO alerts (event_id, ts, severity, label, doc) "
+                                     "VALUES (?, ?, ?, ?, ?)", row)
+                    if not cur.rowcount:
+                        # already stored: a retried batch, or an aggregated alert's final count
+                        db.execute("UPDATE alerts SET severity = ?, label = ?, doc = ? WHERE event_id = ?",
+                                   (row[2], row[3], row[4], row[0]))
+                        continue
+                    aid, ts = cur.lastrowid, row[1]
+                    ioc_rows.extend((aid, ts, t, v) for v, t in ioc_set.items())
+                    tech_rows.extend((aid, ts, t) for t in tech_set)
+                db.executemany("INSERT INTO alert_iocs (alert_id, ts, type, value) VALUES (?, ?, ?, ?)",
+                               ioc_rows)
+                db.executemany("INSERT INTO alert_techniques (alert_id, ts, technique_id) VALUES (?, ?, ?)",
+                               tech_rows)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return []
+
+    # ---- reads ----
+    def query(
+        self,
+        since: Any = None,
+        until: Any = None,
+        severity: Optional[str] = None,
+        technique: Optional[str] = None,
+        indicator: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Newest-first page of alerts matching every given filter, plus the cursor
+        for the next page (None on the last one). The most selective filter
+        drives the scan; the others are checked per row.
+        """
+        if indicator is not None:
+            src, key_col, key = "alert_iocs", "value", indicator.lower()
+        elif technique is not None:
+            src, key_col, key = "alert_techniques", "technique_id", technique
+        elif severity is not None:
+            src, key_col, key = "alerts", "severity", severity
+        else:
+            src, key_col, key = "alerts", None, None
+        id_col = "id" if src == "alerts" else "alert_id"
+
+        where, args = [], []
+        if key_col:
+            where.append(f"d.{key_col} = ?")
+            args.append(key)
+        if since is not None:
+            where.append("d.ts >= ?")
+            args.append(_epoch(since))
+        if until is not None:
+            where.append("d.ts < ?")
+            args.append(_epoch(until))
+        if cursor:
+            where.append(f"(d.ts, d.{id_col}) < (?, ?)")
+            args.extend(_decode_cursor(cursor))
+        if technique is not None and src != "alert_techniques":
+            where.append("EXISTS (SELECT 1 FROM alert_techniques t WHERE t.technique_id = ? "
+                         f"AND t.alert_id = d.{id_col})")
+            args.append(technique)
+        if severity is not None and src != "alerts":
+            where.append("a.severity = ?")
+            args.append(severity)
+
+        join = "" if src == "alerts" else " JOIN alerts a ON a.id = d.alert_id"
+        sql = (f"SELECT d.ts, d.{id_col}, {'d' if src == 'alerts' else 'a'}.doc FROM {src} d{join}"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY d.ts DESC, d.{id_col} DESC LIMIT ?")
+        args.append(limit + 1)
+        rows = self._conn().execute(sql, args).fetchall()
+        page = rows[:limit]
+        nxt = _encode_cursor(page[-1][0], page[-1][1]) if len(rows) > limit else None
+        return [json.loads(r[2]) for r in page], nxt
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+_store: AlertStore | None = None
+_store_lock = threading.Lock()
+
+def get_store() -> AlertStore | None:
+    """The process-wide store at ALERT_DB; None when ALERT_DB is unset or empty (opt-in)."""
+    global _store
+    path = os.getenv("ALERT_DB", "")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = AlertStore(path)
+    return _store